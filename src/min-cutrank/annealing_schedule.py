@@ -0,0 +1,211 @@
+import numpy as np
+import random
+from graph_partition import GraphPartition
+from swap_rank_calculator import row_swap_cut_ranks
+
+
+class SweepStatistics:
+
+    """
+    Counts from one temperature sweep of the annealing algorithm, given to the schedule to select the next temperature.
+    """
+
+    temperature : float
+    """The temperature of the sweep."""
+
+    cut_rank : int
+    """The cut-rank after the sweep."""
+
+    best_cut_rank : int
+    """The lowest cut-rank reached since the annealing started."""
+
+    evaluated : int
+    """The number of swaps whose cut-rank was evaluated."""
+
+    accepted : int
+    """The number of evaluated swaps that were accepted."""
+
+    uphill_evaluated : int
+    """The number of evaluated swaps that would increase the cut-rank."""
+
+    uphill_accepted : int
+    """The number of accepted swaps that increased the cut-rank."""
+
+    def __init__(self, temperature : float, cut_rank : int, best_cut_rank : int, evaluated : int, accepted : int, uphill_evaluated : int, uphill_accepted : int):
+        self.temperature = temperature
+        self.cut_rank = cut_rank
+        self.best_cut_rank = best_cut_rank
+        self.evaluated = evaluated
+        self.accepted = accepted
+        self.uphill_evaluated = uphill_evaluated
+        self.uphill_accepted = uphill_accepted
+
+
+class AnnealingSchedule:
+
+    """
+    Selects the temperature of each sweep of the annealing algorithm. The annealing stops when no temperature is returned.
+    A schedule may be used for several annealing runs, as 'first_temperature' starts it over.
+    """
+
+    def first_temperature(self, partition : GraphPartition) -> float | None:
+        """Returns the temperature of the first sweep on the given start partition, or None for no sweeps."""
+        return None
+
+    def next_temperature(self, statistics : SweepStatistics) -> float | None:
+        """Returns the temperature of the next sweep given the statistics of the last one, or None to stop."""
+        return None
+
+
+class FixedSchedule(AnnealingSchedule):
+
+    """
+    A given sequence of temperatures, one for each sweep.
+    """
+
+    temperatures : list[float]
+    """The temperatures of the sweeps."""
+
+    sweep : int
+    """The number of the current sweep."""
+
+    def __init__(self, temperatures):
+        self.temperatures = [float(temp) for temp in temperatures]
+        self.sweep = 0
+
+    def first_temperature(self, partition : GraphPartition) -> float | None:
+        self.sweep = 0
+        return self.temperatures[0] if len(self.temperatures) > 0 else None
+
+    def next_temperature(self, statistics : SweepStatistics) -> float | None:
+        self.sweep += 1
+        return self.temperatures[self.sweep] if self.sweep < len(self.temperatures) else None
+
+
+class AdaptiveSchedule(AnnealingSchedule):
+
+    """
+    A schedule that calibrates the start temperature and the cooling from the observed swap cut-rank changes.
+
+    The start temperature is set such that the expected acceptance probability of the swaps that increase the cut-rank, sampled from the swaps of some
+    random rows of the start partition, equals 'initial_acceptance'. After each sweep the temperature is multiplied by 'slow_cooling' if the acceptance rate
+    of these swaps was in the range from 'low_acceptance' to 'high_acceptance', where the cut-rank is usually improved, and by 'fast_cooling' otherwise.
+    The annealing stops when a sweep accepts no swap that increases the cut-rank and the lowest cut-rank has not improved for 'patience' sweeps,
+    or after 'max_sweeps' sweeps, or below 'min_temperature'.
+    """
+
+    initial_acceptance : float
+    """The acceptance probability of swaps that increase the cut-rank at the start temperature."""
+
+    slow_cooling : float
+    """The cooling factor while the acceptance rate is in the productive range."""
+
+    fast_cooling : float
+    """The cooling factor while the acceptance rate is outside the productive range."""
+
+    low_acceptance : float
+    """The lower limit of the productive range of the acceptance rate."""
+
+    high_acceptance : float
+    """The upper limit of the productive range of the acceptance rate."""
+
+    patience : int
+    """The number of sweeps without improvement of the lowest cut-rank before a frozen annealing is stopped."""
+
+    min_temperature : float
+    """The annealing stops when the temperature falls below this."""
+
+    max_sweeps : int
+    """The maximum number of sweeps."""
+
+    calibration_rows : int
+    """The number of random rows whose swaps are sampled for the start temperature."""
+
+    temperature : float
+    """The current temperature."""
+
+    sweeps : int
+    """The number of sweeps done in the current annealing."""
+
+    sweeps_without_improvement : int
+    """The number of sweeps since the lowest cut-rank last improved."""
+
+    best_cut_rank : int
+    """The lowest cut-rank reached in the current annealing."""
+
+    def __init__(self, initial_acceptance : float = 0.5, slow_cooling : float = 0.8, fast_cooling : float = 0.5, low_acceptance : float = 0.01, high_acceptance : float = 0.3,
+                 patience : int = 2, min_temperature : float = 0.05, max_sweeps : int = 50, calibration_rows : int = 10):
+        if not 0.0 < initial_acceptance < 1.0:
+            raise Exception("Initial acceptance must be between 0 and 1, exclusive")
+        if not 0.0 < fast_cooling <= slow_cooling < 1.0:
+            raise Exception("Cooling factors must satisfy 0 < fast_cooling <= slow_cooling < 1")
+        if low_acceptance > high_acceptance:
+            raise Exception("Low acceptance can not be greater than high acceptance")
+        self.initial_acceptance = initial_acceptance
+        self.slow_cooling = slow_cooling
+        self.fast_cooling = fast_cooling
+        self.low_acceptance = low_acceptance
+        self.high_acceptance = high_acceptance
+        self.patience = patience
+        self.min_temperature = min_temperature
+        self.max_sweeps = max_sweeps
+        self.calibration_rows = calibration_rows
+        self.temperature = 0.0
+        self.sweeps = 0
+        self.sweeps_without_improvement = 0
+        self.best_cut_rank = -1
+
+    def first_temperature(self, partition : GraphPartition) -> float | None:
+        self.sweeps = 0
+        self.sweeps_without_improvement = 0
+        self.best_cut_rank = partition.cut_rank
+        self.temperature = self.calibrated_temperature(partition)
+        return self.temperature
+
+    def calibrated_temperature(self, partition : GraphPartition) -> float:
+        """Returns the temperature where the expected acceptance probability of the sampled swaps that increase the cut-rank is 'initial_acceptance'.
+        With n1 and n2 swaps increasing the cut-rank by 1 and 2, the acceptance probability x = exp(-1 / T) solves n2 * x^2 + n1 * x = initial_acceptance * (n1 + n2).
+
+        args:
+            - partition: 'GraphPartition' The start partition.
+        """
+
+        ranks = [-1] * partition.nmb_nodes
+        increases = [0, 0, 0]
+        for row in random.sample(partition.rows, min(self.calibration_rows, len(partition.rows))):
+            row_swap_cut_ranks(partition, row, ranks)
+            for column in partition.columns:
+                delta_rank = ranks[column] - partition.cut_rank
+                if delta_rank > 0:
+                    increases[delta_rank] += 1
+        (n1, n2) = (increases[1], increases[2])
+        if n1 + n2 == 0:
+            return 1.0
+        target = self.initial_acceptance * (n1 + n2)
+        x = target / n1 if n2 == 0 else (np.sqrt(n1 * n1 + 4.0 * n2 * target) - n1) / (2.0 * n2)
+        return -1.0 / np.log(min(x, 0.999))
+
+    def next_temperature(self, statistics : SweepStatistics) -> float | None:
+        self.sweeps += 1
+        if statistics.best_cut_rank < self.best_cut_rank:
+            self.best_cut_rank = statistics.best_cut_rank
+            self.sweeps_without_improvement = 0
+        else:
+            self.sweeps_without_improvement += 1
+        if statistics.uphill_accepted == 0 and self.sweeps_without_improvement >= self.patience:
+            return None
+
+        acceptance = statistics.uphill_accepted / statistics.uphill_evaluated if statistics.uphill_evaluated > 0 else 0.0
+        if self.low_acceptance <= acceptance <= self.high_acceptance:
+            self.temperature *= self.slow_cooling
+        else:
+            self.temperature *= self.fast_cooling
+        if self.sweeps >= self.max_sweeps or self.temperature < self.min_temperature:
+            return None
+        return self.temperature
+
+
+def as_schedule(temperatures : AnnealingSchedule | list[float]) -> AnnealingSchedule:
+    """Returns the given schedule, or a FixedSchedule if a sequence of temperatures is given."""
+
+    return temperatures if isinstance(temperatures, AnnealingSchedule) else FixedSchedule(temperatures)
@@ -1,58 +1,211 @@
 import numpy as np
 import random
-from matrix_tools import copy_matrix, rank_matrix_positions
+import time
+from matrix_tools import rank_matrix_positions
 from swap_rank_calculator import row_swap_cut_ranks
+from annealing_schedule import AnnealingSchedule, SweepStatistics, as_schedule
+from fm_refinement import SwapGainTable
 
 from graph_partition import GraphPartition
 
 
-def cut_rank_annealing_direct(partition : GraphPartition, temperatures, log: bool) -> None:
+class AnnealingResult:
+
+    """
+    The outcome of 'cut_rank_annealing_row_formula', with the best partition seen during the annealing.
+    """
+
+    best_cut_rank : int
+    """The lowest cut-rank reached, checked after each row of a sweep, or each swap of a rejection-free sweep."""
+
+    best_row_flag : list[bool]
+    """The partition with the lowest cut-rank, see 'row_flag' in GraphPartition. The first reached if several have it."""
+
+    best_seconds : float
+    """The time from the start of the annealing until the lowest cut-rank was reached."""
+
+    best_evaluated : int
+    """The number of swaps evaluated until the lowest cut-rank was reached."""
+
+    evaluated : int
+    """The number of swaps evaluated in total."""
+
+    seconds : float
+    """The total time of the annealing."""
+
+    stopped_by_budget : bool
+    """Whether the annealing was stopped by the time or swap limit before the schedule ended."""
+
+    def __init__(self, cut_rank : int, row_flag : list[bool]):
+        self.best_cut_rank = cut_rank
+        self.best_row_flag = row_flag[:]
+        self.best_seconds = 0.0
+        self.best_evaluated = 0
+        self.evaluated = 0
+        self.seconds = 0.0
+        self.stopped_by_budget = False
+
+
+def cut_rank_annealing_direct(partition : GraphPartition, temperatures : AnnealingSchedule | list[float], log: bool) -> None:
 
     rows = partition.rows[:]
     cols = partition.columns[:]
     cut_rank = partition.cut_rank
+    best_cut_rank = cut_rank
     nmb_rows = len(rows)
     nmb_cols = len(cols)
+    schedule = as_schedule(temperatures)
     if log:
         print(f"Starting with cut-rank {cut_rank}")
 
-    for temp in temperatures:
+    temp = schedule.first_temperature(partition)
+    while temp is not None:
         limits = [np.exp(-1.0 / temp), np.exp(-2.0 / temp)]
+        accepted = 0
+        uphill_evaluated = 0
+        uphill_accepted = 0
 
         for i in range(nmb_rows):
             for j in range(nmb_cols):
 
                 rows[i], cols[j] = cols[j], rows[i]
 
-                copy_matrix(partition.adjacencies, partition.buffer, rows, cols)
-                base_rows, _ = rank_matrix_positions(partition.buffer, rows, cols)
+                base_rows, _ = rank_matrix_positions(partition.adjacencies, rows, cols)
                 new_cut_rank = len(base_rows)
                 delta_rank = new_cut_rank - cut_rank
+                if delta_rank > 0:
+                    uphill_evaluated += 1
 
                 if delta_rank <= 0 or random.random() < limits[delta_rank - 1]:
                     cut_rank = new_cut_rank
+                    accepted += 1
+                    if delta_rank > 0:
+                        uphill_accepted += 1
                 else:
                     rows[i], cols[j] = cols[j], rows[i]
+            best_cut_rank = min(best_cut_rank, cut_rank)
 
         if log:
             print(f"Cut-rank is {cut_rank} after sweep with temperature {temp}")
-
-
-def cut_rank_annealing_row_formula(partition : GraphPartition, temperatures, log: bool) -> None:
-
+        temp = schedule.next_temperature(SweepStatistics(temp, cut_rank, best_cut_rank, nmb_rows * nmb_cols, accepted, uphill_evaluated, uphill_accepted))
+
+
+def _rejection_free_sweep(table : SwapGainTable, temp : float, cut_rank : int, evaluated : int, deadline : float | None, swap_limit : int | None,
+                          result : AnnealingResult, start : float) -> tuple[int, int, int, int, int]:
+
+    # One sweep of as many uniformly random swap proposals as there are swaps, with Metropolis acceptance, run rejection-free (n-fold way): the next
+    # accepted swap is drawn from the gain buckets of the table by its acceptance probability, and the rejected proposals before it, which all increase
+    # the cut-rank, are skipped by a geometrically distributed step of the simulated clock. Each accepted swap refreshes the table incrementally.
+    # Returns the cut-rank, the simulated proposals and the accepted, uphill evaluated and uphill accepted swaps of the sweep
+    partition = table.partition
+    nmb_swaps = len(partition.rows) * len(partition.columns)
+    acceptances = np.array([1.0, 1.0, 1.0, np.exp(-1.0 / temp), np.exp(-2.0 / temp)])
+    columns = np.array(partition.columns)
+    clock = 0
+    accepted = 0
+    uphill_evaluated = 0
+    uphill_accepted = 0
+    while True:
+        if (deadline is not None and time.time() >= deadline) or (swap_limit is not None and evaluated + clock >= swap_limit):
+            result.stopped_by_budget = True
+            break
+        class_rates = np.cumsum(table.bucket_sizes() * acceptances)
+        acceptance_rate = class_rates[-1] / nmb_swaps
+        if acceptance_rate <= 0.0:
+            proposals = nmb_swaps + 1
+        elif acceptance_rate >= 1.0:
+            proposals = 1
+        else:
+            proposals = 1 + int(np.log(1.0 - random.random()) / np.log1p(-acceptance_rate))
+        if clock + proposals > nmb_swaps:
+            uphill_evaluated += nmb_swaps - clock
+            clock = nmb_swaps
+            break
+        clock += proposals
+        uphill_evaluated += proposals - 1
+
+        # The class by its weight, the row by its number of swaps in the class, and a column of the row in the class
+        delta_class = int(np.searchsorted(class_rates, random.random() * class_rates[-1], side="right"))
+        row_counts = np.cumsum(table.row_buckets[:, delta_class])
+        row = int(np.searchsorted(row_counts, random.randrange(int(row_counts[-1])), side="right"))
+        candidates = columns[table.deltas[row, columns] == delta_class - 2]
+        column = int(candidates[random.randrange(len(candidates))])
+        table.apply_swap(row, column)
+        columns[columns == column] = row
+        cut_rank += delta_class - 2
+        if partition.cut_rank != cut_rank:
+            raise Exception("Partition cut-rank does not fit with the cut-rank change of the swap")
+        accepted += 1
+        if delta_class > 2:
+            uphill_evaluated += 1
+            uphill_accepted += 1
+        if cut_rank < result.best_cut_rank:
+            result.best_cut_rank = cut_rank
+            result.best_row_flag = partition.row_flag[:]
+            result.best_seconds = time.time() - start
+            result.best_evaluated = evaluated + clock
+    return (cut_rank, clock, accepted, uphill_evaluated, uphill_accepted)
+
+
+def cut_rank_annealing_row_formula(partition : GraphPartition, temperatures : AnnealingSchedule | list[float], log: bool,
+                                   time_limit : float | None = None, swap_limit : int | None = None, rejection_free_limit : int | None = None) -> AnnealingResult:
+
+    # The temperatures are either a sequence with one temperature per sweep, or a schedule that selects them from the statistics of each sweep.
+    # The time limit in seconds and the limit on the number of evaluated swaps are checked before each row, so they make the annealing stop at the
+    # latest one row after the limit. The partition is left in its last state, the best one seen is returned in the result.
+    # With a rejection-free limit, the cold phase is run by '_rejection_free_sweep' on a 'SwapGainTable' instead of by row sweeps: from the sweep after
+    # one that accepted at most that many swaps, as long as the buckets give at most that many expected accepted swaps at the temperature of the sweep.
+    # These sweeps follow another chain, with uniformly random proposals, count their simulated proposals as evaluated swaps, and check the limits
+    # before each accepted swap. They only pay off when a few swaps are accepted per sweep, since each costs one refresh of the table
+    start = time.time()
+    deadline = None if time_limit is None else start + time_limit
+    result = AnnealingResult(partition.cut_rank, partition.row_flag)
+    evaluated = 0
     rows = partition.rows[:]
     cols = partition.columns[:]
     row_ranks = [-1] * partition.nmb_nodes
     cut_rank = partition.cut_rank
+    best_cut_rank = cut_rank
     nmb_rows = len(rows)
     nmb_cols = len(cols)
+    table = None
+    accepted = nmb_rows * nmb_cols
+    schedule = as_schedule(temperatures)
     if log:
         print(f"Starting with cut-rank {cut_rank}")
 
-    for temp in temperatures:
+    temp = schedule.first_temperature(partition)
+    while temp is not None:
         limits = [np.exp(-1.0 / temp), np.exp(-2.0 / temp)]
 
+        # The cold phase, see above
+        if rejection_free_limit is not None and table is None and accepted <= rejection_free_limit and nmb_rows * nmb_cols > 0:
+            table = SwapGainTable(partition)
+        if table is not None and (table.bucket_sizes() * [1.0, 1.0, 1.0, limits[0], limits[1]]).sum() > rejection_free_limit:
+            table = None
+        if table is not None:
+            (cut_rank, proposals, accepted, uphill_evaluated, uphill_accepted) = _rejection_free_sweep(table, temp, cut_rank, evaluated, deadline, swap_limit, result, start)
+            evaluated += proposals
+            best_cut_rank = result.best_cut_rank
+            rows = partition.rows[:]
+            cols = partition.columns[:]
+            if result.stopped_by_budget:
+                if log:
+                    print(f"Stopped by the limit at cut-rank {cut_rank} in sweep with temperature {temp}")
+                break
+            if log:
+                print(f"Cut-rank is {cut_rank} after rejection-free sweep with temperature {temp}, {accepted} swaps accepted")
+            temp = schedule.next_temperature(SweepStatistics(temp, cut_rank, best_cut_rank, nmb_rows * nmb_cols, accepted, uphill_evaluated, uphill_accepted))
+            continue
+
+        accepted = 0
+        uphill_evaluated = 0
+        uphill_accepted = 0
+
         for i in range(nmb_rows):
+            if (deadline is not None and time.time() >= deadline) or (swap_limit is not None and evaluated >= swap_limit):
+                result.stopped_by_budget = True
+                break
             row = rows[i]
             for n in partition.nodes:
                 row_ranks[n] = -1
@@ -64,15 +217,36 @@ def cut_rank_annealing_row_formula(partition : GraphPartition, temperatures, log
                 if new_cut_rank < 0:
                     raise Exception("Cut-rank not calculated")
                 delta_rank = new_cut_rank - cut_rank
+                if delta_rank > 0:
+                    uphill_evaluated += 1
                 if delta_rank <= 0 or random.random() < limits[delta_rank - 1]:
                     swap_col = cols[j]
                     rows[i], cols[j] = cols[j], rows[i]
                     cut_rank = new_cut_rank
+                    accepted += 1
+                    if delta_rank > 0:
+                        uphill_accepted += 1
 
             if swap_col >= 0:
                 partition.apply_swap(row, swap_col)
             if partition.cut_rank != cut_rank:
                 raise Exception("Partition cut-rank does not fit with directly calculated rank")
-
+            evaluated += nmb_cols
+            if cut_rank < best_cut_rank:
+                best_cut_rank = cut_rank
+                result.best_cut_rank = cut_rank
+                result.best_row_flag = partition.row_flag[:]
+                result.best_seconds = time.time() - start
+                result.best_evaluated = evaluated
+
+        if result.stopped_by_budget:
+            if log:
+                print(f"Stopped by the limit at cut-rank {cut_rank} in sweep with temperature {temp}")
+            break
         if log:
             print(f"Cut-rank is {cut_rank} after sweep with temperature {temp}")
+        temp = schedule.next_temperature(SweepStatistics(temp, cut_rank, best_cut_rank, nmb_rows * nmb_cols, accepted, uphill_evaluated, uphill_accepted))
+
+    result.evaluated = evaluated
+    result.seconds = time.time() - start
+    return result
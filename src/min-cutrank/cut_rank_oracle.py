@@ -0,0 +1,91 @@
+from collections import OrderedDict
+from matrix_tools import as_bit_matrix, bit_positions, position_mask, matrix_rank
+
+
+class CutRankOracle:
+
+    """
+    Answers cut-rank queries of vertex subsets of one graph, with the results kept in a bounded cache with least recently used eviction.
+    Since the cut-rank of a subset equals the cut-rank of its complement, results are keyed by the bit mask of the smaller side, or of the side
+    with the lower mask if both have the same size, so a subset and its complement share one cache entry.
+    """
+
+    adjacencies : list[int]
+    """The adjacency matrix of the graph as a bit matrix."""
+
+    nmb_nodes : int
+    """The number of nodes in the graph."""
+
+    capacity : int
+    """The maximum number of cached cut-ranks."""
+
+    hits : int
+    """The number of queries answered from the cache."""
+
+    misses : int
+    """The number of queries where the cut-rank was calculated."""
+
+    cache : OrderedDict[int, int]
+    """The cached cut-ranks by canonical subset mask, from the least to the most recently used."""
+
+    def __init__(self, adjacencies : list[list[int]] | list[int] | tuple[list[int], list[int]], capacity : int = 1 << 16):
+        self.adjacencies = as_bit_matrix(adjacencies)
+        self.nmb_nodes = len(self.adjacencies)
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.cache = OrderedDict()
+
+
+    def canonical_mask(self, subset : int | list[int]) -> int:
+        """Returns the key of a subset in the cache: the bit mask of the subset or of its complement, whichever has fewer nodes, or the lower mask at ties.
+        Bits of a mask above the nodes of the graph are ignored.
+
+        args:
+            - subset: The subset, as a bit mask of nodes or as a list of nodes.
+        """
+
+        all_nodes = (1 << self.nmb_nodes) - 1
+        mask = (subset if isinstance(subset, int) else position_mask(subset)) & all_nodes
+        complement = all_nodes & ~mask
+        (size, complement_size) = (mask.bit_count(), complement.bit_count())
+        if complement_size < size or (complement_size == size and complement < mask):
+            return complement
+        return mask
+
+
+    def cut_rank(self, subset : int | list[int]) -> int:
+        """Returns the cut-rank of a subset, i.e. the rank of the adjacency submatrix between the subset and the other nodes.
+
+        args:
+            - subset: The subset, as a bit mask of nodes or as a list of nodes.
+        """
+
+        key = self.canonical_mask(subset)
+        rank = self.cache.get(key)
+        if rank is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return rank
+        self.misses += 1
+        rows = bit_positions(key)
+        columns = bit_positions(((1 << self.nmb_nodes) - 1) & ~key)
+        rank = matrix_rank(self.adjacencies, rows, columns)
+        self.cache[key] = rank
+        if len(self.cache) > self.capacity:
+            self.cache.popitem(last=False)
+        return rank
+
+
+    def partition_cut_rank(self, row_flag : list[bool]) -> int:
+        """Returns the cut-rank of a partition, given like 'row_flag' in GraphPartition."""
+
+        return self.cut_rank([node for node, flag in enumerate(row_flag) if flag])
+
+
+    def clear(self) -> None:
+        """Empties the cache and resets the counters."""
+
+        self.cache.clear()
+        self.hits = 0
+        self.misses = 0
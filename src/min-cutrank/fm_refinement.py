@@ -0,0 +1,416 @@
+import numpy as np
+import random
+import time
+from graph_partition import GraphPartition
+from matrix_tools import bit_submatrix
+from swap_rank_calculator import swap_row_features, swap_column_features, swap_rank_delta_blocks, single_swap_cut_rank
+
+
+# Node classes used to find the nodes that changed subset
+_FREE_ROW = 0
+_BASE_ROW = 1
+_FREE_COLUMN = 2
+_BASE_COLUMN = 3
+
+
+def _node_classes(partition : GraphPartition) -> np.ndarray:
+
+    return 2 * (~np.array(partition.row_flag, dtype=bool)).astype(np.int8) + np.array(partition.base_flag, dtype=np.int8)
+
+
+class SwapGainTable:
+
+    """
+    The cut-rank changes of all swaps of a GraphPartition, kept up to date through 'apply_swap' and 'rollback' without evaluating all swaps again.
+
+    The swap cut-rank formulas for row i and column j only depend on column i of F and D over the free rows, row j of F and E over the free columns,
+    the elements (j, i) of F, D, E and C^(-1), and the subsets of the nodes. The journal of the partition gives the matrix rows changed by a swap. Only the
+    rows and columns whose formula inputs changed get new quantities from 'swap_row_features' and 'swap_column_features', and only their swaps, and single
+    swaps whose elements (j, i) changed, are evaluated again.
+
+    The matrices are mirrored as unpacked bool arrays, where only the changed rows are unpacked again, so the formula inputs of a few rows or columns are
+    found by NumPy indexing. Together with the cut-rank changes, the table takes about 5 x nmb_nodes^2 bytes.
+
+    The swaps between active nodes are counted in gain buckets by cut-rank change -2..2, per row, so the best swap is found in O(n) time.
+    """
+
+    partition : GraphPartition
+    """The graph partition, changed by 'apply_swap' and 'rollback'."""
+
+    deltas : np.ndarray
+    """The nmb_nodes x nmb_nodes int8 array where position [i][j] holds the cut-rank change of swapping row i and column j, see 'all_swap_rank_deltas'."""
+
+    matrix_bits : list[np.ndarray]
+    """The matrices F, D, E and C^(-1) of the partition as nmb_nodes x nmb_nodes bool arrays."""
+
+    row_features : np.ndarray
+    """The 5 x nmb_nodes array with the quantities s2, s1, f_k1, q4_0 and q4_1 from 'swap_row_features' of each row. The last four are only used for base rows."""
+
+    column_features : np.ndarray
+    """The 5 x nmb_nodes array with the quantities t2, t1, f_l1, q5_0 and q5_1 from 'swap_column_features' of each column. The last four are only used for base columns."""
+
+    active : np.ndarray
+    """Flag telling which nodes are active. Only swaps between active nodes are counted in the buckets, see 'lock'."""
+
+    row_buckets : np.ndarray
+    """The nmb_nodes x 5 array where position [i][d + 2] holds the number of active columns j where swapping active row i and j changes the cut-rank by d. 0 for other nodes."""
+
+    evaluated : int
+    """The number of swap cut-ranks evaluated, including the first evaluation of all swaps."""
+
+    def __init__(self, partition : GraphPartition):
+        self.partition = partition
+        self.deltas = np.zeros((partition.nmb_nodes, partition.nmb_nodes), dtype=np.int8)
+        self.matrix_bits = [bit_submatrix(matrix, partition.nodes, partition.nodes).copy() for matrix in self._matrices()]
+        self.row_features = np.zeros((5, partition.nmb_nodes), dtype=bool)
+        self.column_features = np.zeros((5, partition.nmb_nodes), dtype=bool)
+        self._evaluate_features(partition.rows, partition.columns)
+        self._evaluate_swaps(partition.rows, partition.columns)
+        self.active = np.ones(partition.nmb_nodes, dtype=bool)
+        self.row_buckets = np.zeros((partition.nmb_nodes, 5), dtype=np.int64)
+        self._count_rows(partition.rows)
+        self.evaluated = len(partition.rows) * len(partition.columns)
+
+    def _matrices(self) -> tuple[list[int], list[int], list[int], list[int]]:
+
+        partition = self.partition
+        return (partition.adj_b_inv_adj, partition.adj_b_inverse, partition.b_inverse_adj, partition.base_inverse)
+
+    def _evaluate_features(self, rows : list[int], columns : list[int]) -> None:
+
+        partition = self.partition
+        (f_bits, d_bits, e_bits, _) = self.matrix_bits
+        if len(rows) > 0:
+            x_d = [i for i in rows if not partition.base_flag[i]]
+            x_b = [i for i in rows if partition.base_flag[i]]
+            f_kx = f_bits[np.ix_(partition.free_rows, x_d + x_b)]
+            f_kx[[partition.subset_position[i] for i in x_d], range(len(x_d))] = False
+            d_kb = d_bits[np.ix_(partition.free_rows, [partition.base_index[i] for i in x_b])]
+            (s2, s1, f_k1, q4_0, q4_1) = swap_row_features(f_kx, d_kb, len(x_d))
+            self.row_features[0, x_d + x_b] = s2
+            self.row_features[1 :, x_b] = [s1, f_k1, q4_0, q4_1]
+        if len(columns) > 0:
+            y_d = [j for j in columns if not partition.base_flag[j]]
+            y_b = [j for j in columns if partition.base_flag[j]]
+            f_yl = f_bits[np.ix_(y_d + y_b, partition.free_columns)]
+            f_yl[range(len(y_d)), [partition.subset_position[j] for j in y_d]] = False
+            e_bl = e_bits[np.ix_([partition.base_index[j] for j in y_b], partition.free_columns)]
+            (t2, t1, f_l1, q5_0, q5_1) = swap_column_features(f_yl, e_bl, len(y_d))
+            self.column_features[0, y_d + y_b] = t2[:, 0]
+            self.column_features[1 :, y_b] = [t1[:, 0], f_l1[:, 0], q5_0[:, 0], q5_1[:, 0]]
+
+    def _evaluate_swaps(self, rows : list[int], columns : list[int]) -> None:
+
+        # Evaluates the swaps of the given rows and columns from the kept quantities
+        partition = self.partition
+        (f_bits, d_bits, e_bits, c_bits) = self.matrix_bits
+        x_d = [i for i in rows if not partition.base_flag[i]]
+        x_b = [i for i in rows if partition.base_flag[i]]
+        y_d = [j for j in columns if not partition.base_flag[j]]
+        y_b = [j for j in columns if partition.base_flag[j]]
+        x_b_index = [partition.base_index[i] for i in x_b]
+        y_b_index = [partition.base_index[j] for j in y_b]
+        row_features = (self.row_features[0, x_d + x_b],) + tuple(self.row_features[1 :, x_b])
+        column_features = (self.column_features[0, y_d + y_b][:, None],) + tuple(feature[:, None] for feature in self.column_features[1 :, y_b])
+        blocks = swap_rank_delta_blocks(f_bits[np.ix_(y_d + y_b, x_d + x_b)], d_bits[np.ix_(y_d + y_b, x_b_index)], e_bits[np.ix_(y_b_index, x_d + x_b)],
+                                        c_bits[np.ix_(y_b_index, x_b_index)], len(x_d), len(y_d), row_features, column_features)
+        self.deltas[np.ix_(x_d + x_b, y_d + y_b)] = blocks
+
+    def _count_rows(self, rows : list[int]) -> None:
+
+        # Sets the buckets of the given rows from scratch
+        active_rows = [i for i in rows if self.active[i]]
+        active_columns = [j for j in self.partition.columns if self.active[j]]
+        self.row_buckets[rows] = 0
+        if len(active_rows) > 0 and len(active_columns) > 0:
+            block = self.deltas[np.ix_(active_rows, active_columns)].astype(np.int64) + 2
+            self.row_buckets[active_rows] = (block[:, :, None] == np.arange(5)).sum(axis=1)
+
+    def _count_column(self, rows : np.ndarray, column : int, sign : int) -> None:
+
+        # Adds or removes the swaps of the column with the given rows
+        if len(rows) > 0:
+            np.add.at(self.row_buckets, (rows, self.deltas[rows, column].astype(np.int64) + 2), sign)
+
+    def bucket_sizes(self) -> np.ndarray:
+        """Returns the number of swaps between active nodes with each cut-rank change -2..2."""
+
+        return self.row_buckets.sum(axis=0)
+
+    def best_swap(self) -> tuple[int, int, int] | None:
+        """Returns a swap between active nodes with the lowest cut-rank change, as (row, column, change), chosen at random among the rows that have one.
+        None if there is no swap between active nodes."""
+
+        nonempty = np.flatnonzero(self.bucket_sizes())
+        if len(nonempty) == 0:
+            return None
+        bucket = int(nonempty[0])
+        candidate_rows = np.flatnonzero(self.row_buckets[:, bucket])
+        row = int(candidate_rows[random.randrange(len(candidate_rows))])
+        for column in self.partition.columns:
+            if self.active[column] and self.deltas[row, column] == bucket - 2:
+                return (row, column, bucket - 2)
+        raise Exception("Gain bucket does not fit with the swap cut-rank changes")
+
+    def lock(self, node : int) -> None:
+        """Makes the node inactive, so that its swaps are no longer counted in the buckets. Its cut-rank changes are still kept up to date."""
+
+        if not self.active[node]:
+            return
+        if self.partition.row_flag[node]:
+            self.row_buckets[node] = 0
+        else:
+            self._count_column(np.array([i for i in self.partition.rows if self.active[i]], dtype=np.int64), node, -1)
+        self.active[node] = False
+
+    def unlock_all(self) -> None:
+        """Makes all nodes active."""
+
+        self.active[:] = True
+        self._count_rows(self.partition.rows)
+
+    def apply_swap(self, row : int, column : int) -> None:
+        """Applies the swap to the partition, and updates the cut-rank changes that the swap invalidated.
+
+        args:
+            - row: 'int' The row to be swapped.
+            - column: 'int' The column to be swapped.
+        """
+
+        partition = self.partition
+        before = self._state()
+        journaled = partition.journal is not None
+        if not journaled:
+            partition.start_journal()
+        partition.apply_swap(row, column)
+        changes = partition.journal[-1][1]
+        if not journaled:
+            partition.stop_journal()
+        self._update(before, changes)
+
+    def rollback(self, nmb_swaps : int) -> None:
+        """Reverts the last journaled swaps of the partition, see 'rollback' in GraphPartition, and updates the cut-rank changes that it invalidated.
+
+        args:
+            - nmb_swaps: 'int' The number of swaps to revert.
+        """
+
+        partition = self.partition
+        if nmb_swaps <= 0:
+            return
+        before = self._state()
+        changes = []
+        for (_, swap_changes) in partition.journal[len(partition.journal) - nmb_swaps :]:
+            changes += swap_changes
+        partition.rollback(nmb_swaps)
+        self._update(before, changes)
+
+    def _state(self) -> tuple[np.ndarray, list[int], list[int]]:
+
+        partition = self.partition
+        return (_node_classes(partition), partition.base_index[:], partition.columns[:])
+
+    def _update(self, before : tuple[np.ndarray, list[int], list[int]], changes : list[tuple]) -> None:
+
+        # The changes are the journal records of the changed list elements, of which only the matrix rows are used
+        partition = self.partition
+        nodes = partition.nodes
+        (old_class, old_base_index, old_columns) = before
+        new_class = _node_classes(partition)
+        is_row = new_class <= _BASE_ROW
+
+        # Unpack the changed matrix rows again, and keep the old and new bits of them
+        matrices = self._matrices()
+        indices = [set() for _ in matrices]
+        for change in changes:
+            if len(change) == 3:
+                for (n, matrix) in enumerate(matrices):
+                    if change[0] is matrix:
+                        indices[n].add(change[1])
+        old_bits = []
+        for (n, matrix) in enumerate(matrices):
+            indices[n] = sorted(indices[n])
+            old_bits.append(self.matrix_bits[n][indices[n]])
+            self.matrix_bits[n][indices[n]] = bit_submatrix(matrix, indices[n], nodes)
+        (f_bits, d_bits, e_bits, c_bits) = self.matrix_bits
+        (f_changed, d_changed, e_changed, c_changed) = indices
+        f_diff = old_bits[0] != f_bits[f_changed]
+        d_diff = old_bits[1] != d_bits[d_changed]
+        e_diff = old_bits[2] != e_bits[e_changed]
+        c_diff = old_bits[3] != c_bits[c_changed]
+
+        # Local index to node, for the base rows and columns, where unused indices give the extra last element
+        row_of_index = np.full(partition.nmb_nodes + 1, partition.nmb_nodes, dtype=np.int64)
+        row_of_index[[partition.base_index[i] for i in partition.base_rows]] = partition.base_rows
+        column_of_index = np.full(partition.nmb_nodes + 1, partition.nmb_nodes, dtype=np.int64)
+        column_of_index[[partition.base_index[j] for j in partition.base_columns]] = partition.base_columns
+
+        # Nodes that changed subset or local index are evaluated again in full
+        moved = old_class != new_class
+        moved |= (new_class % 2 == 1) & (old_class == new_class) & (np.array(partition.base_index) != np.array(old_base_index))
+        dirty_rows = np.append(moved & is_row, False)
+        dirty_columns = np.append(moved & ~is_row, False)
+
+        # Rows whose column of F or D over the free rows changed, including by free rows entering or leaving
+        free_rows = (old_class == _FREE_ROW) | (new_class == _FREE_ROW)
+        changed_free_rows = (old_class == _FREE_ROW) != (new_class == _FREE_ROW)
+        row_f = f_bits[changed_free_rows].any(axis=0) | f_diff[free_rows[f_changed]].any(axis=0) | old_bits[0][changed_free_rows[f_changed]].any(axis=0)
+        row_d = d_bits[changed_free_rows].any(axis=0) | d_diff[free_rows[d_changed]].any(axis=0) | old_bits[1][changed_free_rows[d_changed]].any(axis=0)
+        dirty_rows[: -1] |= row_f
+        dirty_rows[row_of_index[np.flatnonzero(row_d)]] = True
+        dirty_rows = dirty_rows[: -1] & is_row
+
+        # Columns whose row of F or E over the free columns changed, including by free columns entering or leaving
+        free_columns = (old_class == _FREE_COLUMN) | (new_class == _FREE_COLUMN)
+        changed_free_columns = (old_class == _FREE_COLUMN) != (new_class == _FREE_COLUMN)
+        column_f = f_bits[:, changed_free_columns].any(axis=1)
+        column_f[f_changed] |= (f_diff & free_columns).any(axis=1) | old_bits[0][:, changed_free_columns].any(axis=1)
+        column_e = e_bits[:, changed_free_columns].any(axis=1)
+        column_e[e_changed] |= (e_diff & free_columns).any(axis=1) | old_bits[2][:, changed_free_columns].any(axis=1)
+        dirty_columns[: -1] |= column_f
+        dirty_columns[column_of_index[np.flatnonzero(column_e)]] = True
+        dirty_columns = dirty_columns[: -1] & ~is_row
+
+        # Single elements (j, i) of F, D, E and C^(-1) that changed, for rows and columns that are not evaluated in full
+        clean_rows = is_row & ~dirty_rows
+        clean_columns = np.append(~is_row & ~dirty_columns, False)
+        clean_index_rows = np.append(clean_rows, False)
+        pairs = set()
+        for (n, j) in enumerate(f_changed):
+            if clean_columns[j]:
+                pairs.update((i, j) for i in np.flatnonzero(f_diff[n] & clean_rows).tolist())
+        for (n, j) in enumerate(d_changed):
+            if clean_columns[j]:
+                rows = row_of_index[np.flatnonzero(d_diff[n])]
+                pairs.update((i, j) for i in rows[clean_index_rows[rows]].tolist())
+        for (n, index) in enumerate(e_changed):
+            j = int(column_of_index[index])
+            if clean_columns[j]:
+                pairs.update((i, j) for i in np.flatnonzero(e_diff[n] & clean_rows).tolist())
+        for (n, index) in enumerate(c_changed):
+            j = int(column_of_index[index])
+            if clean_columns[j]:
+                rows = row_of_index[np.flatnonzero(c_diff[n])]
+                pairs.update((i, j) for i in rows[clean_index_rows[rows]].tolist())
+
+        # Remove the old bucket counts of the changed swaps, with the columns before the swap
+        rows = np.flatnonzero(dirty_rows).tolist()
+        columns = np.flatnonzero(dirty_columns).tolist()
+        self.row_buckets[~clean_rows] = 0
+        kept_rows = np.flatnonzero(clean_rows & self.active)
+        for j in old_columns:
+            if self.active[j] and (is_row[j] or dirty_columns[j]):
+                self._count_column(kept_rows, j, -1)
+        active_pairs = [(i, j) for (i, j) in pairs if self.active[i] and self.active[j]]
+        for (i, j) in active_pairs:
+            self.row_buckets[i, self.deltas[i, j] + 2] -= 1
+
+        # Evaluate the changed swaps
+        self._evaluate_features(rows, columns)
+        if len(rows) > 0:
+            self._evaluate_swaps(rows, partition.columns)
+        if len(columns) > 0:
+            self._evaluate_swaps(partition.rows, columns)
+        for (i, j) in pairs:
+            self.deltas[i, j] = single_swap_cut_rank(partition, i, j) - partition.cut_rank
+        self.evaluated += len(rows) * len(partition.columns) + len(columns) * len(partition.rows) + len(pairs)
+
+        # Add the new bucket counts
+        self._count_rows(rows)
+        for j in columns:
+            if self.active[j]:
+                self._count_column(kept_rows, j, 1)
+        for (i, j) in active_pairs:
+            self.row_buckets[i, self.deltas[i, j] + 2] += 1
+
+
+class RefinementResult:
+
+    """
+    Statistics from 'fm_refinement'.
+    """
+
+    initial_cut_rank : int
+    """The cut-rank of the start partition."""
+
+    cut_rank : int
+    """The cut-rank of the refined partition."""
+
+    passes : int
+    """The number of passes run."""
+
+    swaps : int
+    """The number of tentative swaps applied in all passes, including the ones that were reverted."""
+
+    evaluated : int
+    """The number of swap cut-ranks evaluated, see 'evaluated' in SwapGainTable."""
+
+    seconds : float
+    """The total time of the refinement."""
+
+    def __init__(self, cut_rank : int):
+        self.initial_cut_rank = cut_rank
+        self.cut_rank = cut_rank
+        self.passes = 0
+        self.swaps = 0
+        self.evaluated = 0
+        self.seconds = 0.0
+
+
+def fm_refinement(partition : GraphPartition, max_passes : int | None = None, max_swaps_per_pass : int | None = None, log : bool = False) -> RefinementResult:
+    """Refines the partition by Fiduccia-Mattheyses style passes. In each pass, the best swap between unlocked nodes is applied and its two nodes are locked,
+    also if it increases the cut-rank, until no swap is left. Then the swaps after the lowest cut-rank of the pass are reverted. The passes are repeated until
+    one does not decrease the cut-rank. The cut-rank changes are kept by a SwapGainTable, so all swaps are only evaluated once.
+    The passes are journaled, so swaps journaled before are forgotten.
+
+    args:
+        - partition: 'GraphPartition' The start partition, which is left in the refined state.
+        - max_passes: 'int' The maximum number of passes. No limit if None.
+        - max_swaps_per_pass: 'int' The maximum number of tentative swaps in a pass. No limit if None, i.e. until all nodes of the smaller set are locked.
+        - log: 'bool' Whether the cut-rank after each pass should be logged to the console.
+    """
+
+    start = time.time()
+    result = RefinementResult(partition.cut_rank)
+    table = SwapGainTable(partition)
+    journaled = partition.journal is not None
+    if log:
+        print(f"Starting with cut-rank {partition.cut_rank}")
+
+    while max_passes is None or result.passes < max_passes:
+        result.passes += 1
+        pass_start_cut_rank = partition.cut_rank
+        best_cut_rank = partition.cut_rank
+        best_swaps = 0
+        swaps = 0
+        partition.start_journal()
+        table.unlock_all()
+
+        while max_swaps_per_pass is None or swaps < max_swaps_per_pass:
+            swap = table.best_swap()
+            if swap is None:
+                break
+            (row, column, _) = swap
+            table.lock(row)
+            table.lock(column)
+            table.apply_swap(row, column)
+            swaps += 1
+            if partition.cut_rank < best_cut_rank:
+                best_cut_rank = partition.cut_rank
+                best_swaps = swaps
+
+        table.rollback(swaps - best_swaps)
+        result.swaps += swaps
+        if log:
+            print(f"Cut-rank is {partition.cut_rank} after pass {result.passes}, keeping {best_swaps} of {swaps} swaps")
+        if partition.cut_rank >= pass_start_cut_rank:
+            break
+
+    if journaled:
+        partition.start_journal()
+    else:
+        partition.stop_journal()
+    result.cut_rank = partition.cut_rank
+    result.evaluated = table.evaluated
+    result.seconds = time.time() - start
+    return result
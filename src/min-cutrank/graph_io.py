@@ -0,0 +1,357 @@
+import numpy as np
+from matrix_tools import bit_positions
+from partition_builder import csr_from_edges, edges_from_pair_numbers
+
+
+# The number of text lines, or of graph6 bytes, handled at a time when streaming a file
+_CHUNK_SIZE = 1 << 16
+
+
+def _compact_adjacency(nodes : int, edges : np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+
+    # The adjacency matrix in compressed sparse row format, without self-loops and repeated edges
+    edges = np.sort(np.asarray(edges, dtype=np.int64).reshape(-1, 2), axis=1)
+    if len(edges) > 0 and (edges[:, 0].min() < 0 or edges[:, 1].max() >= nodes):
+        raise Exception(f"Edge with node outside 0 to {nodes - 1}")
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    return csr_from_edges(nodes, np.unique(edges, axis=0))
+
+
+def _edge_array(adjacencies : list[list[int]] | list[int] | tuple[list[int], list[int]]) -> tuple[int, np.ndarray]:
+
+    # The number of nodes and the edges (i, j), i < j, of an adjacency matrix, where sparse matrices are never expanded
+    if isinstance(adjacencies, tuple) or hasattr(adjacencies, "indptr"):
+        (indptr, indices) = (adjacencies[0], adjacencies[1]) if isinstance(adjacencies, tuple) else (adjacencies.indptr, adjacencies.indices)
+        indptr = np.asarray(indptr, dtype=np.int64)
+        indices = np.asarray(indices, dtype=np.int64)
+        nodes = len(indptr) - 1
+        sources = np.repeat(np.arange(nodes, dtype=np.int64), np.diff(indptr))
+        edges = np.stack((sources, indices), axis=1)
+        return (nodes, np.unique(edges[sources < indices], axis=0))
+    nodes = len(adjacencies)
+    if nodes > 0 and isinstance(adjacencies[0], list):
+        matrix = np.triu(np.asarray(adjacencies), 1)
+        return (nodes, np.argwhere(matrix != 0).astype(np.int64))
+    edges = [(node, neighbour + node + 1) for node in range(nodes) for neighbour in bit_positions(adjacencies[node] >> (node + 1))]
+    return (nodes, np.array(edges, dtype=np.int64).reshape(-1, 2))
+
+
+def _text_rows(file, comment_prefixes : tuple[bytes, ...]):
+
+    # Yields the numbers of the data lines of a text file as 2-D float arrays, one chunk of lines at a time. All data lines must have the same
+    # number of numbers as the first one
+    nmb_columns = 0
+    while True:
+        lines = file.readlines(_CHUNK_SIZE * 16)
+        if not lines:
+            return
+        lines = [line for line in lines if line.strip() and not line.lstrip().startswith(comment_prefixes)]
+        if not lines:
+            continue
+        if nmb_columns == 0:
+            nmb_columns = len(lines[0].split())
+        values = np.fromstring(b" ".join(lines), sep=" ")
+        if values.size != nmb_columns * len(lines):
+            raise Exception(f"Expected {nmb_columns} numbers on each line")
+        yield values.reshape(len(lines), nmb_columns)
+
+
+def read_edge_list(path : str, nodes : int | None = None, first_node : int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """Reads a graph from a text file with one edge per line, given by the two node numbers separated by white space. Further numbers on a line,
+    like weights, are ignored, and so are empty lines and lines starting with '#' or '%'. The file is parsed by NumPy in chunks of lines, so no Python
+    object is created per edge. Self-loops and repeated edges are dropped.
+
+    args:
+        - path: 'str' The path of the file.
+        - nodes: 'int' The number of nodes. If None, it is one more than the highest node number.
+        - first_node: 'int' The number of the first node in the file, like 1 for one-based numbering.
+
+    returns:
+        - The adjacency matrix in compressed sparse row format, as the tuple (indptr, indices) accepted by GraphPartition.
+    """
+
+    with open(path, "rb") as file:
+        chunks = [rows[:, : 2].astype(np.int64) for rows in _text_rows(file, (b"#", b"%"))]
+    edges = np.concatenate(chunks) - first_node if chunks else np.zeros((0, 2), dtype=np.int64)
+    if nodes is None:
+        nodes = int(edges.max()) + 1 if len(edges) > 0 else 0
+    return _compact_adjacency(nodes, edges)
+
+
+def read_matrix_market(path : str) -> tuple[np.ndarray, np.ndarray]:
+    """Reads a graph from a Matrix Market file in coordinate format, where each entry with a non-zero value is an edge. Both general and symmetric
+    matrices are read as symmetric adjacency matrices. The entries are parsed by NumPy in chunks of lines.
+
+    args:
+        - path: 'str' The path of the file.
+
+    returns:
+        - The adjacency matrix in compressed sparse row format, as the tuple (indptr, indices) accepted by GraphPartition.
+    """
+
+    with open(path, "rb") as file:
+        header = file.readline().split()
+        if len(header) < 5 or header[0].lower() != b"%%matrixmarket" or header[1].lower() != b"matrix":
+            raise Exception(f"No Matrix Market header in {path}")
+        if header[2].lower() != b"coordinate":
+            raise Exception(f"Only the coordinate format is supported, not {header[2].decode()}")
+        field = header[3].lower()
+        line = file.readline()
+        while line.lstrip().startswith(b"%") or (line and not line.strip()):
+            line = file.readline()
+        (rows, columns, nmb_entries) = (int(value) for value in line.split())
+        if rows != columns:
+            raise Exception(f"Adjacency matrix must be square, not {rows} x {columns}")
+        chunks = []
+        for values in _text_rows(file, (b"%",)):
+            nmb_entries -= len(values)
+            if field != b"pattern":
+                values = values[np.any(values[:, 2 :] != 0, axis=1)]
+            chunks.append(values[:, : 2].astype(np.int64) - 1)
+    edges = np.concatenate(chunks) if chunks else np.zeros((0, 2), dtype=np.int64)
+    if nmb_entries != 0:
+        raise Exception(f"Number of entries does not match the size line of {path}")
+    return _compact_adjacency(rows, edges)
+
+
+def _decode_size(data : np.ndarray, start : int) -> tuple[int, int]:
+
+    # The number of nodes in the graph6 and sparse6 formats, as one, four or eight bytes, and the position after it
+    if data[start] < 63:
+        raise Exception("Invalid graph6 or sparse6 data")
+    if data[start] != 126:
+        return (int(data[start]) - 63, start + 1)
+    (width, start) = (3, start + 1) if data[start + 1] != 126 else (6, start + 2)
+    nodes = 0
+    for value in data[start : start + width]:
+        nodes = (nodes << 6) | (int(value) - 63)
+    return (nodes, start + width)
+
+
+def _encode_size(nodes : int) -> bytes:
+
+    if nodes < 63:
+        return bytes([nodes + 63])
+    width = 3 if nodes < 258048 else 6
+    return b"~" * (width // 3) + bytes(((nodes >> (6 * n)) & 63) + 63 for n in range(width - 1, -1, -1))
+
+
+def _six_bit_values(data : np.ndarray) -> np.ndarray:
+
+    # The bits of graph6 or sparse6 data bytes, six per byte with the highest bit first
+    values = data - np.uint8(63)
+    if np.any(values > 63):
+        raise Exception("Invalid graph6 or sparse6 data")
+    return np.unpackbits(values[:, None], axis=1)[:, 2 :].ravel()
+
+
+def _pack_six_bits(bits : np.ndarray) -> bytes:
+
+    return (bits.reshape(-1, 6) @ np.array([32, 16, 8, 4, 2, 1], dtype=np.uint8) + np.uint8(63)).astype(np.uint8).tobytes()
+
+
+def _line_data(path : str, header : bytes) -> tuple[np.ndarray, int, int]:
+
+    # The file memory-mapped as bytes, and the start and end of the data of its first graph, after an optional header
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    start = len(header) if bytes(data[: len(header)]) == header else 0
+    line_ends = np.flatnonzero(data[start :] == ord("\n"))
+    end = start + int(line_ends[0]) if len(line_ends) > 0 else len(data)
+    if end > start and data[end - 1] == ord("\r"):
+        end -= 1
+    return (data, start, end)
+
+
+def read_graph6(path : str) -> tuple[np.ndarray, np.ndarray]:
+    """Reads the first graph of a graph6 file. The file is memory-mapped and the bits of the upper triangle of the adjacency matrix are unpacked
+    by NumPy in chunks, so only the edges are kept in memory.
+
+    args:
+        - path: 'str' The path of the file.
+
+    returns:
+        - The adjacency matrix in compressed sparse row format, as the tuple (indptr, indices) accepted by GraphPartition.
+    """
+
+    (data, start, end) = _line_data(path, b">>graph6<<")
+    (nodes, start) = _decode_size(data, start)
+    nmb_pairs = nodes * (nodes - 1) // 2
+    nmb_bytes = -(-nmb_pairs // 6)
+    if end - start < nmb_bytes:
+        raise Exception(f"Graph6 data of {path} is too short for {nodes} nodes")
+    pair_numbers = [np.flatnonzero(_six_bit_values(data[start + first : start + min(first + _CHUNK_SIZE, nmb_bytes)])) + 6 * first
+                    for first in range(0, nmb_bytes, _CHUNK_SIZE)]
+    pair_numbers = np.concatenate(pair_numbers) if pair_numbers else np.zeros(0, dtype=np.int64)
+    return _compact_adjacency(nodes, edges_from_pair_numbers(pair_numbers[pair_numbers < nmb_pairs]))
+
+
+def read_sparse6(path : str) -> tuple[np.ndarray, np.ndarray]:
+    """Reads the first graph of a sparse6 file. The file is memory-mapped and decoded by NumPy: each unit of the data is a bit b and a node x,
+    and the current node v after a unit is max(v + b, x), so all units are decoded at once by a cumulative maximum instead of one at a time.
+
+    args:
+        - path: 'str' The path of the file.
+
+    returns:
+        - The adjacency matrix in compressed sparse row format, as the tuple (indptr, indices) accepted by GraphPartition.
+    """
+
+    (data, start, end) = _line_data(path, b">>sparse6<<")
+    if start >= end or data[start] != ord(":"):
+        raise Exception(f"No sparse6 data in {path}")
+    (nodes, start) = _decode_size(data, start + 1)
+    width = max(1, (nodes - 1).bit_length())
+    bits = _six_bit_values(data[start : end])
+    units = bits[: len(bits) // (width + 1) * (width + 1)].reshape(-1, width + 1).astype(np.int64)
+    increments = np.cumsum(units[:, 0])
+    targets = units[:, 1 :] @ (np.int64(1) << np.arange(width - 1, -1, -1, dtype=np.int64))
+
+    # The current node before each unit is read, increased by its bit, and the first unit with a node out of range ends the data
+    offsets = np.maximum.accumulate(np.maximum(targets - increments, 0))
+    current = np.concatenate(([0], offsets[: -1])) + increments
+    ends = np.flatnonzero((targets >= nodes) | (current >= nodes))
+    is_edge = targets <= current
+    if len(ends) > 0:
+        is_edge[ends[0] :] = False
+    return _compact_adjacency(nodes, np.stack((targets[is_edge], current[is_edge]), axis=1))
+
+
+def read_graph(path : str) -> tuple[np.ndarray, np.ndarray]:
+    """Reads a graph by 'read_graph6' for files ending with '.g6', 'read_sparse6' for '.s6', 'read_matrix_market' for '.mtx', and otherwise by
+    'read_edge_list' with zero-based node numbers.
+
+    args:
+        - path: 'str' The path of the file.
+    """
+
+    if path.endswith(".g6"):
+        return read_graph6(path)
+    if path.endswith(".s6"):
+        return read_sparse6(path)
+    if path.endswith(".mtx"):
+        return read_matrix_market(path)
+    return read_edge_list(path)
+
+
+def _write_rows(file, rows : np.ndarray) -> None:
+
+    for first in range(0, len(rows), _CHUNK_SIZE):
+        np.savetxt(file, rows[first : first + _CHUNK_SIZE], fmt="%d")
+
+
+def write_edge_list(path : str, adjacencies : list[list[int]] | list[int] | tuple[list[int], list[int]], first_node : int = 0) -> None:
+    """Writes a graph as a text file with one edge per line, see 'read_edge_list'. The lines are written in chunks.
+
+    args:
+        - path: 'str' The path of the file.
+        - adjacencies: The adjacency matrix of the graph, in any format accepted by GraphPartition.
+        - first_node: 'int' The number of the first node in the file, like 1 for one-based numbering.
+    """
+
+    (_, edges) = _edge_array(adjacencies)
+    with open(path, "wb") as file:
+        _write_rows(file, edges + first_node)
+
+
+def write_matrix_market(path : str, adjacencies : list[list[int]] | list[int] | tuple[list[int], list[int]]) -> None:
+    """Writes a graph as a symmetric pattern matrix in the Matrix Market coordinate format, with one entry per edge in the lower triangle.
+
+    args:
+        - path: 'str' The path of the file.
+        - adjacencies: The adjacency matrix of the graph, in any format accepted by GraphPartition.
+    """
+
+    (nodes, edges) = _edge_array(adjacencies)
+    with open(path, "wb") as file:
+        file.write(f"%%MatrixMarket matrix coordinate pattern symmetric\n{nodes} {nodes} {len(edges)}\n".encode())
+        _write_rows(file, edges[:, ::-1] + 1)
+
+
+def write_graph6(path : str, adjacencies : list[list[int]] | list[int] | tuple[list[int], list[int]]) -> None:
+    """Writes a graph in the graph6 format, without header. The bytes are packed by NumPy and written in chunks.
+
+    args:
+        - path: 'str' The path of the file.
+        - adjacencies: The adjacency matrix of the graph, in any format accepted by GraphPartition.
+    """
+
+    (nodes, edges) = _edge_array(adjacencies)
+    pair_numbers = np.sort(edges[:, 1] * (edges[:, 1] - 1) // 2 + edges[:, 0])
+    nmb_bytes = -(-(nodes * (nodes - 1) // 2) // 6)
+    with open(path, "wb") as file:
+        file.write(_encode_size(nodes))
+        for first in range(0, nmb_bytes, _CHUNK_SIZE):
+            last = min(first + _CHUNK_SIZE, nmb_bytes)
+            numbers = pair_numbers[np.searchsorted(pair_numbers, 6 * first) : np.searchsorted(pair_numbers, 6 * last)] - 6 * first
+            bits = np.zeros(6 * (last - first), dtype=np.uint8)
+            bits[numbers] = 1
+            file.write(_pack_six_bits(bits))
+        file.write(b"\n")
+
+
+def write_sparse6(path : str, adjacencies : list[list[int]] | list[int] | tuple[list[int], list[int]]) -> None:
+    """Writes a graph in the sparse6 format, without header. The edges (u, v), u < v, are sorted by v and then u, and each edge takes one unit
+    (b, u), where b tells whether v is one more than in the previous edge, or two units (1, v), (0, u) if v increases by more.
+
+    args:
+        - path: 'str' The path of the file.
+        - adjacencies: The adjacency matrix of the graph, in any format accepted by GraphPartition.
+    """
+
+    (nodes, edges) = _edge_array(adjacencies)
+    width = max(1, (nodes - 1).bit_length())
+    edges = edges[np.lexsort((edges[:, 0], edges[:, 1]))]
+    steps = np.diff(edges[:, 1], prepend=0)
+    last_units = np.cumsum(1 + (steps > 1)) - 1
+    increments = np.ones(len(edges) + int(np.count_nonzero(steps > 1)), dtype=np.int64)
+    targets = np.zeros(len(increments), dtype=np.int64)
+    increments[last_units] = np.where(steps > 1, 0, steps)
+    targets[last_units] = edges[:, 0]
+    targets[last_units[steps > 1] - 1] = edges[steps > 1, 1]
+    bits = np.concatenate((increments[:, None], (targets[:, None] >> np.arange(width - 1, -1, -1)) & 1), axis=1).ravel().astype(np.uint8)
+
+    # Padding with ones, after one zero if the ones could otherwise be read as an edge to node n - 1
+    padding = -len(bits) % 6
+    last_node = int(edges[-1, 1]) if len(edges) > 0 else 0
+    if width < 6 and nodes == 1 << width and padding >= width and last_node < nodes - 1:
+        bits = np.append(bits, np.uint8(0))
+        padding = -len(bits) % 6
+    bits = np.append(bits, np.ones(padding, dtype=np.uint8))
+    with open(path, "wb") as file:
+        file.write(b":" + _encode_size(nodes) + _pack_six_bits(bits) + b"\n")
+
+
+def write_partition(path : str, parts : list[bool] | list[int]) -> None:
+    """Writes a partition as a text file with one line per node, holding the node number and its part, in chunks of lines. A bipartition given as a
+    'row_flag' of GraphPartition is written with part 1 for the first and part 0 for the second partition set.
+
+    args:
+        - path: 'str' The path of the file.
+        - parts: 'list[bool]' or 'list[int]' The part of each node, like 'row_flag' of GraphPartition or 'part_of' of 'KwayResult'.
+    """
+
+    parts = np.asarray(parts, dtype=np.int64)
+    with open(path, "wb") as file:
+        _write_rows(file, np.stack((np.arange(len(parts), dtype=np.int64), parts), axis=1))
+
+
+def read_partition(path : str) -> list[int]:
+    """Reads a partition written by 'write_partition'. Every node from 0 to the highest node number must have a line.
+
+    args:
+        - path: 'str' The path of the file.
+
+    returns:
+        - The part of each node. For a bipartition, the 'row_flag' of GraphPartition is the list of parts converted to bool.
+    """
+
+    with open(path, "rb") as file:
+        chunks = [rows[:, : 2].astype(np.int64) for rows in _text_rows(file, (b"#", b"%"))]
+    if not chunks:
+        return []
+    rows = np.concatenate(chunks)
+    parts = np.full(int(rows[:, 0].max()) + 1, -1, dtype=np.int64)
+    parts[rows[:, 0]] = rows[:, 1]
+    if np.any(parts < 0):
+        raise Exception(f"Partition in {path} does not cover all nodes")
+    return parts.tolist()
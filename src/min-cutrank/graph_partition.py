@@ -1,9 +1,13 @@
-from matrix_tools import create_zero_matrix, insert_zero_matrix, copy_matrix, rank_matrix_positions, matrix_inverse, add_product_matrix
+from matrix_tools import create_zero_bit_matrix, as_bit_matrix, position_mask, lowest_bit_position, scatter_bits, insert_zero_matrix, add_matrix, rank_matrix_positions, compact_matrix_inverse, add_product_matrix
 
 class GraphPartition:
 
     """
     A representation of a simple graph and a partition of the nodes of the graph into two sets, identified as the rows and columns.
+
+    All matrices are bit matrices, stored as one Python int per row where bit 'col' of matrix[row] is the element in position (row, col), see matrix_tools.
+    The matrices involving the inverse of the cut-rank submatrix are stored compactly, where each base node has a local index instead of its node index,
+    see 'base_index'. With cut-rank r, they take about n^2 + 2nr + r^2 bits besides the adjacency matrix, instead of 4n^2.
     """
 
     nmb_nodes : int
@@ -39,59 +43,216 @@ class GraphPartition:
     free_columns : list[int]
     """The nodes from second partition set that represent columns outside the invertible cut-rank submatrix of the adjacency matrix. Same as nodes n where row_flag[n] = True and base_falg[n] is False."""
 
-    adjacencies : list[list[int]]
-    """The adjacency matrix of the grap. Should be a square symetric matrix with a row and column for each graph node, 0 on main diagonal, 1 in position (i,j) if (i,j) is an edge in the graph, 0 if not."""
+    position : list[int]
+    """The position of each node in rows or columns, whichever the node belongs to."""
+
+    subset_position : list[int]
+    """The position of each node in base_rows, base_columns, free_rows or free_columns, whichever the node belongs to. These four lists are updated by swap-remove, so their order is not the order of the nodes."""
+
+    free_rows_mask : int
+    """Bit mask of the nodes in free_rows, for selecting them from a row of a bit matrix."""
+
+    free_columns_mask : int
+    """Bit mask of the nodes in free_columns, for selecting them from a row of a bit matrix."""
+
+    adjacencies : list[int]
+    """The adjacency matrix of the grap as a bit matrix. Should be a square symetric matrix with a row and column for each graph node, 0 on main diagonal, 1 in position (i,j) if (i,j) is an edge in the graph, 0 if not."""
+
+    base_index : list[int]
+    """The local index of each base node in the compact matrices. For a base row it is its column in base_inverse and adj_b_inverse, for a base column its row in base_inverse and b_inverse_adj. Not used for free nodes."""
+
+    free_row_indices : list[int]
+    """The local indices not used by any base row, as a stack. Indices released when the base is reduced are reused first when it is extended."""
+
+    free_column_indices : list[int]
+    """The local indices not used by any base column, as a stack. Indices released when the base is reduced are reused first when it is extended."""
 
-    base_inverse : list[list[int]]
-    """A square nmb_nodes x nmb_nodes matrix where the base_columns x base_rows submatrix is the inverse of the base_rows x base_columns submatrix of the adjacency matrix that defines the selected cut-rank sub-matrix of the current partition."""
+    base_inverse : list[int]
+    """The inverse 'C^(-1)' of the base_rows x base_columns submatrix 'C' of the adjacency matrix that defines the selected cut-rank sub-matrix of the current partition.
+    Row base_index[c] holds base column c, and bit base_index[r] in it holds base row r. All other elements are 0, so it takes about cut_rank x cut_rank bits."""
 
-    adj_b_inverse: list[list[int]]
-    """A square nmb_nodes x nmb_nodes matrix where the nodes x base_rows submatrix represents 'D = A^{base_columns} * C^(-1)' used in the cut-rank calculations."""
+    adj_b_inverse: list[int]
+    """The nodes x base_rows matrix 'D = A^{base_columns} * C^(-1)' used in the cut-rank calculations, with a row for each node where bit base_index[r] holds base row r.
+    All other elements are 0, so it takes about nmb_nodes x cut_rank bits."""
 
-    b_inverse_adj: list[list[int]]
-    """A square nmb_nodes x nmb_nodes matrix where the base_columns x nodes submatrix represents 'E = C^(-1) * A_{base_rows}' used in the cut-rank calculations."""
+    b_inverse_adj: list[int]
+    """The base_columns x nodes matrix 'E = C^(-1) * A_{base_rows}' used in the cut-rank calculations, where row base_index[c] holds base column c.
+    All other elements are 0, so it takes about cut_rank x nmb_nodes bits."""
 
-    adj_b_inv_adj: list[list[int]]
+    adj_b_inv_adj: list[int]
     """The square nmb_nodes x nmb_nodes matrix 'F = A^{base_columns} * C^(-1) * A_{base_rows} + A' used in the cut-rank calculations."""
 
-    buffer : list[list[int]]
-    """A square nmb_nodes x nmb_nodes used for caching intermediate calculations when updating the variables after the partition has been changed."""
+    journal : list[tuple[tuple, list[tuple]]] | None
+    """Undo records of the swaps and moves applied since 'start_journal', one (state, changes) entry per swap or move, where changes are the old values of the changed list elements and matrix rows. None if swaps are not journaled, see 'rollback'."""
 
+    row_swap_cache : list[tuple[int, bool, bool, bool] | None]
+    """Cache of the row-side quantities of the swap cut-rank formulas for each row, see 'row_swap_data'. None where not calculated since the last swap."""
 
-    def __init__(self, adjacencies : list[list[int]], partition_flags : list[bool]):
-        self.adjacencies = adjacencies
-        self.nmb_nodes = len(adjacencies)
+    column_swap_cache : list[tuple[int, bool, bool, bool] | None]
+    """Cache of the column-side quantities of the swap cut-rank formulas for each column, see 'column_swap_data'. None where not calculated since the last swap."""
+
+
+    def __init__(self, adjacencies : list[list[int]] | list[int] | tuple[list[int], list[int]], partition_flags : list[bool]):
+        self.adjacencies = as_bit_matrix(adjacencies)
+        self.nmb_nodes = len(self.adjacencies)
         self.nodes = list(range(self.nmb_nodes))
 
         self.row_flag = partition_flags[:]
         self.rows = [n for n in self.nodes if self.row_flag[n]]
         self.columns = [n for n in self.nodes if not self.row_flag[n]]
+        self.journal = None
+        self._changes = None
 
         self._build_matrices()
 
 
-    def _empty_matrix(self) -> list[list[int]]:
+    def copy(self) -> "GraphPartition":
+        """Returns an independent copy of the partition, including all maintained matrices, without rebuilding them.
+        The rows of the bit matrices are immutable ints, so copying a matrix only copies the list of row references, i.e. O(n) per matrix.
+        The adjacency matrix is never changed, and is shared with the copy.
+        """
+
+        partition = GraphPartition.__new__(GraphPartition)
+        partition._copy_state(self)
+        partition.journal = None
+        return partition
+
+
+    def snapshot(self) -> "GraphPartition":
+        """Returns a snapshot of the current state, that can be given to 'restore' to return to this state, for instance after trying some swaps."""
+
+        return self.copy()
+
 
-        return create_zero_matrix(self.nmb_nodes, self.nmb_nodes)
+    def restore(self, snapshot : "GraphPartition") -> None:
+        """Restores the state from a snapshot of this partition. The snapshot is not changed, and can be restored again later.
+        If swaps are journaled, the journal is cleared.
+
+        args:
+            - snapshot: 'GraphPartition' A snapshot returned by 'snapshot' or 'copy' on this partition.
+        """
+
+        self._copy_state(snapshot)
+        if self.journal is not None:
+            self.journal = []
+
+
+    def _copy_state(self, other : "GraphPartition") -> None:
+
+        self.nmb_nodes = other.nmb_nodes
+        self.nodes = other.nodes
+        self.adjacencies = other.adjacencies
+        self.row_flag = other.row_flag[:]
+        self.rows = other.rows[:]
+        self.columns = other.columns[:]
+        self.base_flag = other.base_flag[:]
+        self.cut_rank = other.cut_rank
+        self.base_rows = other.base_rows[:]
+        self.base_columns = other.base_columns[:]
+        self.free_rows = other.free_rows[:]
+        self.free_columns = other.free_columns[:]
+        self.position = other.position[:]
+        self.subset_position = other.subset_position[:]
+        self.free_rows_mask = other.free_rows_mask
+        self.free_columns_mask = other.free_columns_mask
+        self.base_index = other.base_index[:]
+        self.free_row_indices = other.free_row_indices[:]
+        self.free_column_indices = other.free_column_indices[:]
+        self.base_inverse = other.base_inverse[:]
+        self.adj_b_inverse = other.adj_b_inverse[:]
+        self.b_inverse_adj = other.b_inverse_adj[:]
+        self.adj_b_inv_adj = other.adj_b_inv_adj[:]
+        self.row_swap_cache = other.row_swap_cache[:]
+        self.column_swap_cache = other.column_swap_cache[:]
+        self._changes = None
+
+
+    def start_journal(self) -> None:
+        """Starts journaling the swaps and moves, so that they can be reverted by 'rollback'. An already started journal is cleared."""
+
+        self.journal = []
+
+
+    def stop_journal(self) -> None:
+        """Stops journaling the swaps, and keeps the current state."""
+
+        self.journal = None
+
+
+    def rollback(self, nmb_swaps : int | None = None) -> None:
+        """Reverts journaled swaps and moves, in reverse order, by writing back the old values of the list elements and matrix rows they changed.
+        The cost is proportional to the number of changed values, not to the size of the matrices.
+
+        args:
+            - nmb_swaps: 'int' The number of swaps or moves to revert. All journaled swaps and moves if None.
+        """
+
+        if self.journal is None:
+            raise Exception("Swaps are not journaled")
+        if nmb_swaps is None:
+            nmb_swaps = len(self.journal)
+        for _ in range(nmb_swaps):
+            (state, changes) = self.journal.pop()
+            for change in reversed(changes):
+                if len(change) == 3:
+                    change[0][change[1]] = change[2]
+                elif change[1] is None:
+                    change[0].pop()
+                else:
+                    change[0].append(change[1])
+            (self.cut_rank, self.free_rows_mask, self.free_columns_mask, self.row_swap_cache, self.column_swap_cache) = state
+
+
+    def _write(self, values : list, index : int, value) -> None:
+
+        if self._changes is not None:
+            self._changes.append((values, index, values[index]))
+        values[index] = value
+
+
+    def _pop(self, values : list):
+
+        # The journal records the removal of the last element as (list, last), and an append as (list, None)
+        last = values.pop()
+        if self._changes is not None:
+            self._changes.append((values, last))
+        return last
+
+
+    def _append(self, values : list, value) -> None:
+
+        values.append(value)
+        if self._changes is not None:
+            self._changes.append((values, None))
+
+
+    def _empty_matrix(self) -> list[int]:
+
+        return create_zero_bit_matrix(self.nmb_nodes)
 
 
     def _build_matrices(self) -> None:
 
-        self.base_inverse = self._empty_matrix()
-        copy_matrix(self.adjacencies, self.base_inverse, self.rows, self.columns)
-        (self.base_rows, self.base_columns) = rank_matrix_positions(self.base_inverse, self.rows, self.columns)
+        (self.base_rows, self.base_columns) = rank_matrix_positions(self.adjacencies, self.rows, self.columns)
         self.cut_rank = len(self.base_rows)
-        copy_matrix(self.adjacencies, self.base_inverse, self.base_rows, self.base_columns)
-        matrix_inverse(self.base_inverse, self.base_inverse, self.base_rows, self.base_columns)
 
+        # Base row and base column n get local index n
+        indices = list(range(self.cut_rank))
+        self.base_index = [-1] * self.nmb_nodes
+        for n in indices:
+            self.base_index[self.base_rows[n]] = n
+            self.base_index[self.base_columns[n]] = n
+        self.free_row_indices = list(range(self.nmb_nodes - 1, self.cut_rank - 1, -1))
+        self.free_column_indices = self.free_row_indices[:]
+
+        self.base_inverse = self._empty_matrix()
+        self.base_inverse[: self.cut_rank] = compact_matrix_inverse(self.adjacencies, self.base_rows, self.base_columns)
         self.adj_b_inverse = self._empty_matrix()
-        add_product_matrix(self.adjacencies, self.base_inverse, self.adj_b_inverse, self.nodes, self.base_columns, self.base_rows)
+        add_product_matrix(self.adjacencies, self.base_inverse, self.adj_b_inverse, self.nodes, self.base_columns, indices, fac2_rows=indices)
         self.b_inverse_adj = self._empty_matrix()
-        add_product_matrix(self.base_inverse, self.adjacencies, self.b_inverse_adj, self.base_columns, self.base_rows, self.nodes)
-        self.adj_b_inv_adj = self._empty_matrix()
-        copy_matrix(self.adjacencies, self.adj_b_inv_adj, self.nodes, self.nodes)
-        add_product_matrix(self.adj_b_inverse, self.adjacencies, self.adj_b_inv_adj, self.nodes, self.base_rows, self.nodes)
-        self.buffer = self._empty_matrix()
+        add_product_matrix(self.base_inverse, self.adjacencies, self.b_inverse_adj, indices, indices, self.nodes, fac2_rows=self.base_rows)
+        self.adj_b_inv_adj = self.adjacencies[:]
+        add_product_matrix(self.adj_b_inverse, self.adjacencies, self.adj_b_inv_adj, self.nodes, indices, self.nodes, fac2_rows=self.base_rows)
 
         self.base_flag = [False] * self.nmb_nodes
         for r in self.base_rows:
@@ -99,12 +260,129 @@ class GraphPartition:
         for c in self.base_columns:
             self.base_flag[c] = True
         self._build_free_nodes()
+        self._build_positions()
+        self._clear_swap_cache()
 
 
     def _build_free_nodes(self) -> None:
 
         self.free_rows = [row for row in self.rows if not self.base_flag[row]]
         self.free_columns = [col for col in self.columns if not self.base_flag[col]]
+        self.free_rows_mask = position_mask(self.free_rows)
+        self.free_columns_mask = position_mask(self.free_columns)
+
+
+    def _build_positions(self) -> None:
+
+        self.position = [0] * self.nmb_nodes
+        self.subset_position = [0] * self.nmb_nodes
+        for nodes in (self.rows, self.columns):
+            for pos, node in enumerate(nodes):
+                self.position[node] = pos
+        for subset in (self.base_rows, self.base_columns, self.free_rows, self.free_columns):
+            for pos, node in enumerate(subset):
+                self.subset_position[node] = pos
+
+
+    def _subset(self, node : int) -> list[int]:
+
+        if self.row_flag[node]:
+            return self.base_rows if self.base_flag[node] else self.free_rows
+        else:
+            return self.base_columns if self.base_flag[node] else self.free_columns
+
+
+    def _detach_node(self, node : int) -> None:
+
+        # Swap-remove from the subset given by the current row and base flags of the node
+        subset = self._subset(node)
+        last = self._pop(subset)
+        if last != node:
+            pos = self.subset_position[node]
+            self._write(subset, pos, last)
+            self._write(self.subset_position, last, pos)
+        if subset is self.free_rows:
+            self.free_rows_mask ^= 1 << node
+        elif subset is self.free_columns:
+            self.free_columns_mask ^= 1 << node
+
+
+    def _attach_node(self, node : int) -> None:
+
+        # Append to the subset given by the current row and base flags of the node
+        subset = self._subset(node)
+        self._write(self.subset_position, node, len(subset))
+        self._append(subset, node)
+        if subset is self.free_rows:
+            self.free_rows_mask ^= 1 << node
+        elif subset is self.free_columns:
+            self.free_columns_mask ^= 1 << node
+
+
+    def _clear_swap_cache(self) -> None:
+
+        self.row_swap_cache = [None] * self.nmb_nodes
+        self.column_swap_cache = [None] * self.nmb_nodes
+
+
+    def row_swap_data(self, row : int) -> tuple[int, bool, bool, bool]:
+        """Returns the quantities (k1, s2, q4_0, q4_1) of the swap cut-rank formulas that only depend on the given row and the current partition.
+        They are calculated at the first request after a swap, and are cached until the next swap.
+
+        args:
+            - row: 'int' A node in the first partition set.
+
+        returns:
+            - k1: The first free row k in free_rows with D[k][row] = 1 if row is a base row, -1 if there is none or row is a free row.
+            - s2: If row is a free row, whether F[k][row] = 1 for some other free row k. If row is a base row, q4_1 if k1 >= 0 and F[k1][row] = 1, otherwise q4_0.
+            - q4_0: Whether F[k][row] = 1 for some free row k. Only set for base rows.
+            - q4_1: Whether F[k][row] != D[k][row] for some free row k. Only set for base rows.
+        """
+
+        data = self.row_swap_cache[row]
+        if data is None:
+            if not self.base_flag[row]:
+                s2 = any(k2 != row and (self.adj_b_inv_adj[k2] >> row & 1) == 1 for k2 in self.free_rows)
+                data = (-1, s2, False, False)
+            else:
+                index = self.base_index[row]
+                k1 = next((k1 for k1 in self.free_rows if (self.adj_b_inverse[k1] >> index & 1) == 1), -1)
+                q4_0 = any((self.adj_b_inv_adj[k] >> row & 1) == 1 for k in self.free_rows)
+                q4_1 = any((self.adj_b_inv_adj[k] >> row & 1) != (self.adj_b_inverse[k] >> index & 1) for k in self.free_rows)
+                s2 = q4_1 if k1 >= 0 and (self.adj_b_inv_adj[k1] >> row & 1) == 1 else q4_0
+                data = (k1, s2, q4_0, q4_1)
+            self.row_swap_cache[row] = data
+        return data
+
+
+    def column_swap_data(self, column : int) -> tuple[int, bool, bool, bool]:
+        """Returns the quantities (l1, t2, q5_0, q5_1) of the swap cut-rank formulas that only depend on the given column and the current partition.
+        They are calculated at the first request after a swap, and are cached until the next swap.
+
+        args:
+            - column: 'int' A node in the second partition set.
+
+        returns:
+            - l1: The free column l with E[column][l] = 1 of lowest node index if column is a base column, -1 if there is none or column is a free column.
+            - t2: If column is a free column, whether F[column][l] = 1 for some other free column l. If column is a base column, q5_1 if l1 >= 0 and F[column][l1] = 1, otherwise q5_0.
+            - q5_0: Whether F[column][l] = 1 for some free column l. Only set for base columns.
+            - q5_1: Whether F[column][l] != E[column][l] for some free column l. Only set for base columns.
+        """
+
+        data = self.column_swap_cache[column]
+        if data is None:
+            if not self.base_flag[column]:
+                t2 = (self.adj_b_inv_adj[column] & ~(1 << column) & self.free_columns_mask) != 0
+                data = (-1, t2, False, False)
+            else:
+                e_row = self.b_inverse_adj[self.base_index[column]]
+                l1 = lowest_bit_position(e_row & self.free_columns_mask)
+                q5_0 = (self.adj_b_inv_adj[column] & self.free_columns_mask) != 0
+                q5_1 = ((self.adj_b_inv_adj[column] ^ e_row) & self.free_columns_mask) != 0
+                t2 = q5_1 if l1 >= 0 and (self.adj_b_inv_adj[column] >> l1 & 1) == 1 else q5_0
+                data = (l1, t2, q5_0, q5_1)
+            self.column_swap_cache[column] = data
+        return data
 
 
     def _reduce_base(self, removed_rows : list[int], removed_cols : list[int]) -> None:
@@ -113,30 +391,43 @@ class GraphPartition:
             return
         else:
 
-            # Set base nodes
-            for row in removed_rows:
-                self.base_flag[row] = False
-            for col in removed_cols:
-                self.base_flag[col] = False
-            self.base_rows = [row for row in self.rows if self.base_flag[row]]
-            self.base_columns = [col for col in self.columns if self.base_flag[col]]
+            # Set base nodes, the local indices are released at the end
+            removed_row_indices = [self.base_index[row] for row in removed_rows]
+            removed_col_indices = [self.base_index[col] for col in removed_cols]
+            for node in removed_rows + removed_cols:
+                self._detach_node(node)
+                self._write(self.base_flag, node, False)
+                self._attach_node(node)
             self.cut_rank = len(self.base_rows)
-
-            # Get Z
-            copy_matrix(self.base_inverse, self.buffer, removed_cols, removed_rows)
-            matrix_inverse(self.buffer, self.buffer, removed_cols, removed_rows)
-
-            # Store D^(Delta X) * Z in D^(Delta Y), update D and F
-            insert_zero_matrix(self.adj_b_inverse, self.nodes, removed_cols)
-            add_product_matrix(self.adj_b_inverse, self.buffer, self.adj_b_inverse, self.nodes, removed_rows, removed_cols)
-            add_product_matrix(self.adj_b_inverse, self.b_inverse_adj, self.adj_b_inv_adj, self.nodes, removed_cols, self.nodes)
-            add_product_matrix(self.adj_b_inverse, self.base_inverse, self.adj_b_inverse, self.nodes, removed_cols, self.base_rows)
-
-            # Store (C^-1)_YN^(Delta X) * Z in D^(Delta Y), update C^-1 and E
-            insert_zero_matrix(self.adj_b_inverse, self.nodes, removed_cols)
-            add_product_matrix(self.base_inverse, self.buffer, self.adj_b_inverse, self.base_columns, removed_rows, removed_cols)
-            add_product_matrix(self.adj_b_inverse, self.b_inverse_adj, self.b_inverse_adj, self.base_columns, removed_cols, self.nodes)
-            add_product_matrix(self.adj_b_inverse, self.base_inverse, self.base_inverse, self.base_columns, removed_cols, self.base_rows)
+            row_indices = [self.base_index[row] for row in self.base_rows]
+            col_indices = [self.base_index[col] for col in self.base_columns]
+            positions = list(range(len(removed_rows)))
+
+            # Get Z, with rows for Delta X and bits for Delta Y by their positions
+            z = compact_matrix_inverse(self.base_inverse, removed_col_indices, removed_row_indices)
+
+            # Get D^(Delta X) * Z, update D and F
+            product = self._empty_matrix()
+            add_product_matrix(self.adj_b_inverse, z, product, self.nodes, removed_row_indices, positions, fac2_rows=positions)
+            add_product_matrix(product, self.b_inverse_adj, self.adj_b_inv_adj, self.nodes, positions, self.nodes, self._changes, fac2_rows=removed_col_indices)
+            add_product_matrix(product, self.base_inverse, self.adj_b_inverse, self.nodes, positions, row_indices, self._changes, fac2_rows=removed_col_indices)
+
+            # Get (C^-1)_YN^(Delta X) * Z, update C^-1 and E
+            product = self._empty_matrix()
+            add_product_matrix(self.base_inverse, z, product, col_indices, removed_row_indices, positions, fac2_rows=positions)
+            add_product_matrix(product, self.b_inverse_adj, self.b_inverse_adj, col_indices, positions, self.nodes, self._changes, fac2_rows=removed_col_indices)
+            add_product_matrix(product, self.base_inverse, self.base_inverse, col_indices, positions, row_indices, self._changes, fac2_rows=removed_col_indices)
+
+            # Clear and release the local indices of the removed nodes
+            insert_zero_matrix(self.adj_b_inverse, self.nodes, removed_row_indices, self._changes)
+            insert_zero_matrix(self.base_inverse, col_indices, removed_row_indices, self._changes)
+            for index in removed_col_indices:
+                self._write(self.base_inverse, index, 0)
+                self._write(self.b_inverse_adj, index, 0)
+            for index in removed_row_indices:
+                self._append(self.free_row_indices, index)
+            for index in removed_col_indices:
+                self._append(self.free_column_indices, index)
 
 
     def _extend_base(self, added_rows : list[int], added_cols : list[int]) -> None:
@@ -145,48 +436,56 @@ class GraphPartition:
             return
         else:
 
-            # Determine new base
+            # Get local indices for the new base nodes, the base nodes are updated at the end
+            row_indices = [self.base_index[row] for row in self.base_rows]
+            col_indices = [self.base_index[col] for col in self.base_columns]
             for row in added_rows:
-                self.base_flag[row] = True
+                self._write(self.base_index, row, self._pop(self.free_row_indices))
             for col in added_cols:
-                self.base_flag[col] = True
-            new_base_rows = [row for row in self.rows if self.base_flag[row]]
-            new_base_columns = [col for col in self.columns if self.base_flag[col]]
-
-			# Store Z in (C^-1)_(Delta Y)^(Delta X)
-            copy_matrix(self.adjacencies, self.buffer, added_rows, added_cols)  # Stores (C_N)_(Delta X)^(Delta Y) in position for Z-inverse
-            insert_zero_matrix(self.buffer, added_rows, self.base_rows)
-            add_product_matrix(self.adjacencies, self.base_inverse, self.buffer, added_rows, self.base_columns, self.base_rows)
-            add_product_matrix(self.buffer, self.adjacencies, self.buffer, added_rows, self.base_rows, added_cols)  # Gives Z-inverse
-            insert_zero_matrix(self.base_inverse, added_cols, new_base_rows)
-            insert_zero_matrix(self.base_inverse, self.base_columns, added_rows)
-            matrix_inverse(self.buffer, self.base_inverse, added_rows, added_cols)
-
-			# Get new C^1
-            insert_zero_matrix(self.buffer, self.base_columns, added_cols)
-            add_product_matrix(self.base_inverse, self.adjacencies, self.buffer, self.base_columns, self.base_rows, added_cols)
-            add_product_matrix(self.base_inverse, self.buffer, self.base_inverse, added_cols, added_rows, self.base_rows)
-            add_product_matrix(self.buffer, self.base_inverse, self.base_inverse, self.base_columns, added_cols, new_base_rows)
-
-			# Get new D
-            copy_matrix(self.adjacencies, self.adj_b_inverse, self.nodes, added_cols)
-            add_product_matrix(self.adj_b_inverse, self.adjacencies, self.adj_b_inverse, self.nodes, self.base_rows, added_cols)  # D_O * C_XO^(Delta Y) + A^(Delta Y) stored in (Delta Y)-column of D
-            insert_zero_matrix(self.adj_b_inverse, self.nodes, added_rows)
-            add_product_matrix(self.adj_b_inverse, self.base_inverse, self.adj_b_inverse, self.nodes, added_cols, new_base_rows)
-
-			# Get new E
-            copy_matrix(self.adjacencies, self.b_inverse_adj, added_rows, self.nodes)
-            add_product_matrix(self.adjacencies, self.b_inverse_adj, self.b_inverse_adj, added_rows, self.base_columns, self.nodes)  # C_(Delta X)^YO * E_0 + A_(Delta X) stored in (Delta X)-row of E
-            insert_zero_matrix(self.b_inverse_adj, added_cols, self.nodes)
-            add_product_matrix(self.base_inverse, self.b_inverse_adj, self.b_inverse_adj, new_base_columns, added_rows, self.nodes)
-
-			# Get new F
-            insert_zero_matrix(self.buffer, added_cols, self.nodes)
-            add_product_matrix(self.base_inverse, self.b_inverse_adj, self.buffer, added_cols, added_rows, self.nodes)
-            add_product_matrix(self.adj_b_inverse, self.buffer, self.adj_b_inv_adj, self.nodes, added_cols, self.nodes)
-
-            self.base_rows = new_base_rows
-            self.base_columns = new_base_columns
+                self._write(self.base_index, col, self._pop(self.free_column_indices))
+            added_row_indices = [self.base_index[row] for row in added_rows]
+            added_col_indices = [self.base_index[col] for col in added_cols]
+            positions = list(range(len(added_rows)))
+
+            # Z is the inverse of F_(Delta X)^(Delta Y), with rows for Delta Y by their positions and bits for the local indices of Delta X.
+            # The (Delta X)-rows of D and F are kept with their values before the update.
+            z = scatter_bits(compact_matrix_inverse(self.adj_b_inv_adj, added_rows, added_cols), added_row_indices)
+            d_rows = [self.adj_b_inverse[row] for row in added_rows]
+            f_rows = [self.adj_b_inv_adj[row] for row in added_rows]
+
+            # Get E^(Delta Y) * Z and F^(Delta Y) * Z, which give the (Delta X)-columns of the new C^-1 and D
+            e_z = self._empty_matrix()
+            add_product_matrix(self.b_inverse_adj, z, e_z, col_indices, added_cols, added_row_indices, fac2_rows=positions)
+            f_z = self._empty_matrix()
+            add_product_matrix(self.adj_b_inv_adj, z, f_z, self.nodes, added_cols, added_row_indices, fac2_rows=positions)
+
+            # Get new C^-1
+            z_d = [0] * len(added_rows)
+            add_product_matrix(z, d_rows, z_d, positions, added_row_indices, row_indices, fac2_rows=positions)
+            for n, index in enumerate(added_col_indices):
+                self._write(self.base_inverse, index, z[n] | z_d[n])
+            add_matrix(e_z, self.base_inverse, col_indices, added_row_indices, self._changes)
+            add_product_matrix(e_z, d_rows, self.base_inverse, col_indices, added_row_indices, row_indices, self._changes, fac2_rows=positions)
+
+            # Get new D
+            add_matrix(f_z, self.adj_b_inverse, self.nodes, added_row_indices, self._changes)
+            add_product_matrix(f_z, d_rows, self.adj_b_inverse, self.nodes, added_row_indices, row_indices, self._changes, fac2_rows=positions)
+
+            # Get new E
+            z_f = [0] * len(added_rows)
+            add_product_matrix(z, f_rows, z_f, positions, added_row_indices, self.nodes, fac2_rows=positions)
+            add_product_matrix(e_z, f_rows, self.b_inverse_adj, col_indices, added_row_indices, self.nodes, self._changes, fac2_rows=positions)
+            for n, index in enumerate(added_col_indices):
+                self._write(self.b_inverse_adj, index, z_f[n])
+
+            # Get new F
+            add_product_matrix(f_z, f_rows, self.adj_b_inv_adj, self.nodes, added_row_indices, self.nodes, self._changes, fac2_rows=positions)
+
+            # Set base nodes
+            for node in added_rows + added_cols:
+                self._detach_node(node)
+                self._write(self.base_flag, node, True)
+                self._attach_node(node)
             self.cut_rank = len(self.base_rows)
 
 
@@ -197,6 +496,10 @@ class GraphPartition:
         add_rows : list[int]
         add_columns : list[int]
 
+        # Local indices in the compact matrices, only used for base nodes
+        row_index = self.base_index[row]
+        column_index = self.base_index[column]
+
         if (not self.base_flag[column]):
 
             if (not self.base_flag[row]):
@@ -205,8 +508,8 @@ class GraphPartition:
                 remove_rows = []
                 remove_columns = []
 
-                k2 = next((k2 for k2 in self.free_rows if k2 != row and self.adj_b_inv_adj[k2][row] == 1), -1)
-                l2 = next((l2 for l2 in self.free_columns if l2 != column and self.adj_b_inv_adj[column][l2] == 1), -1)
+                k2 = next((k2 for k2 in self.free_rows if k2 != row and (self.adj_b_inv_adj[k2] >> row & 1) == 1), -1)
+                l2 = lowest_bit_position(self.adj_b_inv_adj[column] & ~(1 << column) & self.free_columns_mask)
                 if k2 >= 0:
                     if l2 >= 0:
                         add_rows = [column, k2]
@@ -219,7 +522,7 @@ class GraphPartition:
                         add_rows = [column]
                         add_columns = [l2]
                     else:
-                        if self.adj_b_inv_adj[column][row] == 1:
+                        if (self.adj_b_inv_adj[column] >> row & 1) == 1:
                             add_rows = [column]
                             add_columns = [row]
                         else:
@@ -229,17 +532,17 @@ class GraphPartition:
             else:
 
                 # row in X^B, column in Y^D
-                alpha = next(a for a in self.base_columns if self.base_inverse[a][row] == 1)
+                alpha = next(a for a in self.base_columns if (self.base_inverse[self.base_index[a]] >> row_index & 1) == 1)
                 remove_rows = [row]
                 remove_columns = [alpha]
 
-                k1 = next((k1 for k1 in self.free_rows if self.adj_b_inverse[k1][row] == 1), -1)
+                k1 = next((k1 for k1 in self.free_rows if (self.adj_b_inverse[k1] >> row_index & 1) == 1), -1)
                 if k1 >= 0:
-                    if self.adj_b_inv_adj[k1][row] == 1:
-                        k2 = next((k2 for k2 in self.free_rows if k2 != k1 and self.adj_b_inv_adj[k2][row] != self.adj_b_inverse[k2][row]), -1)
+                    if (self.adj_b_inv_adj[k1] >> row & 1) == 1:
+                        k2 = next((k2 for k2 in self.free_rows if k2 != k1 and (self.adj_b_inv_adj[k2] >> row & 1) != (self.adj_b_inverse[k2] >> row_index & 1)), -1)
                     else:
-                        k2 = next((k2 for k2 in self.free_rows if k2 != k1 and self.adj_b_inv_adj[k2][row] == 1), -1)
-                    l2 = next((l2 for l2 in self.free_columns if l2 != column and self.adj_b_inv_adj[column][l2] == 1), -1)
+                        k2 = next((k2 for k2 in self.free_rows if k2 != k1 and (self.adj_b_inv_adj[k2] >> row & 1) == 1), -1)
+                    l2 = lowest_bit_position(self.adj_b_inv_adj[column] & ~(1 << column) & self.free_columns_mask)
                     if k2 >= 0:
                         if l2 >= 0:
                             add_rows = [column, k1, k2]
@@ -252,15 +555,15 @@ class GraphPartition:
                             add_rows = [column, k1]
                             add_columns = [l2, alpha]
                         else:
-                            if self.adj_b_inv_adj[column][row] != (self.adj_b_inverse[column][row] & self.adj_b_inv_adj[k1][row]):
+                            if (self.adj_b_inv_adj[column] >> row & 1) != ((self.adj_b_inverse[column] >> row_index & 1) & (self.adj_b_inv_adj[k1] >> row & 1)):
                                 add_rows = [column, k1]
                                 add_columns = [row, alpha]
                             else:
                                 add_rows = [k1]
                                 add_columns = [alpha]
                 else:
-                    k2 = next((k2 for k2 in self.free_rows if self.adj_b_inv_adj[k2][row] == 1), -1)
-                    if self.adj_b_inverse[column][row] == 1:
+                    k2 = next((k2 for k2 in self.free_rows if (self.adj_b_inv_adj[k2] >> row & 1) == 1), -1)
+                    if (self.adj_b_inverse[column] >> row_index & 1) == 1:
                         if k2 >= 0:
                             add_rows = [column, k2]
                             add_columns = [row, alpha]
@@ -268,7 +571,7 @@ class GraphPartition:
                             add_rows = [column]
                             add_columns = [alpha]
                     else:
-                        l2 = next((l2 for l2 in self.free_columns if l2 != column and self.adj_b_inv_adj[column][l2] == 1), -1)
+                        l2 = lowest_bit_position(self.adj_b_inv_adj[column] & ~(1 << column) & self.free_columns_mask)
                         if k2 >= 0:
                             if l2 >= 0:
                                 add_rows = [column, k2]
@@ -281,7 +584,7 @@ class GraphPartition:
                                 add_rows = [column]
                                 add_columns = [l2]
                             else:
-                                if self.adj_b_inv_adj[column][row] == 1:
+                                if (self.adj_b_inv_adj[column] >> row & 1) == 1:
                                     add_rows = [column]
                                     add_columns = [row]
                                 else:
@@ -293,17 +596,17 @@ class GraphPartition:
             if (not self.base_flag[row]):
 
                 # row in X^D, column in Y^B
-                beta = next(b for b in self.base_rows if self.base_inverse[column][b] == 1)
+                beta = next(b for b in self.base_rows if (self.base_inverse[column_index] >> self.base_index[b] & 1) == 1)
                 remove_rows = [beta]
                 remove_columns = [column]
 
-                l1 = next((l1 for l1 in self.free_columns if self.b_inverse_adj[column][l1] == 1), -1)
+                l1 = lowest_bit_position(self.b_inverse_adj[column_index] & self.free_columns_mask)
                 if l1 >= 0:
-                    if self.adj_b_inv_adj[column][l1] == 1:
-                        l2 = next((l2 for l2 in self.free_columns if l2 != l1 and self.adj_b_inv_adj[column][l2] != self.b_inverse_adj[column][l2]), -1)
+                    if (self.adj_b_inv_adj[column] >> l1 & 1) == 1:
+                        l2 = lowest_bit_position((self.adj_b_inv_adj[column] ^ self.b_inverse_adj[column_index]) & ~(1 << l1) & self.free_columns_mask)
                     else:
-                        l2 = next((l2 for l2 in self.free_columns if l2 != l1 and self.adj_b_inv_adj[column][l2] == 1), -1)
-                    k2 = next((k2 for k2 in self.free_rows if k2 != row and self.adj_b_inv_adj[k2][row] == 1), -1)
+                        l2 = lowest_bit_position(self.adj_b_inv_adj[column] & ~(1 << l1) & self.free_columns_mask)
+                    k2 = next((k2 for k2 in self.free_rows if k2 != row and (self.adj_b_inv_adj[k2] >> row & 1) == 1), -1)
                     if l2 >= 0:
                         if k2 >= 0:
                             add_rows = [column, k2, beta]
@@ -316,15 +619,15 @@ class GraphPartition:
                             add_rows = [k2, beta]
                             add_columns = [row, l1]
                         else:
-                            if self.adj_b_inv_adj[column][row] != (self.b_inverse_adj[column][row] & self.adj_b_inv_adj[column][l1]):
+                            if (self.adj_b_inv_adj[column] >> row & 1) != ((self.b_inverse_adj[column_index] >> row & 1) & (self.adj_b_inv_adj[column] >> l1 & 1)):
                                 add_rows = [column, beta]
                                 add_columns = [row, l1]
                             else:
                                 add_rows = [beta]
                                 add_columns = [l1]
                 else:
-                    l2 = next((l2 for l2 in self.free_columns if self.adj_b_inv_adj[column][l2] == 1), -1)
-                    if self.b_inverse_adj[column][row] == 1:
+                    l2 = lowest_bit_position(self.adj_b_inv_adj[column] & self.free_columns_mask)
+                    if (self.b_inverse_adj[column_index] >> row & 1) == 1:
                         if l2 >= 0:
                             add_rows = [column, beta]
                             add_columns = [row, l2]
@@ -332,7 +635,7 @@ class GraphPartition:
                             add_rows = [beta]
                             add_columns = [row]
                     else:
-                        k2 = next((k2 for k2 in self.free_rows if k2 != row and self.adj_b_inv_adj[k2][row] == 1), -1)
+                        k2 = next((k2 for k2 in self.free_rows if k2 != row and (self.adj_b_inv_adj[k2] >> row & 1) == 1), -1)
                         if l2 >= 0:
                             if k2 >= 0:
                                 add_rows = [column, k2]
@@ -345,7 +648,7 @@ class GraphPartition:
                                 add_rows = [k2]
                                 add_columns = [row]
                             else:
-                                if self.adj_b_inv_adj[column][row] == 1:
+                                if (self.adj_b_inv_adj[column] >> row & 1) == 1:
                                     add_rows = [column]
                                     add_columns = [row]
                                 else:
@@ -355,23 +658,23 @@ class GraphPartition:
             else:
 
                 # row in X^B, column in Y^B
-                k1 = next((k1 for k1 in self.free_rows if self.adj_b_inverse[k1][row] == 1), -1)
-                l1 = next((l1 for l1 in self.free_columns if self.b_inverse_adj[column][l1] == 1), -1)
-                if (self.base_inverse[column][row] == 1):
+                k1 = next((k1 for k1 in self.free_rows if (self.adj_b_inverse[k1] >> row_index & 1) == 1), -1)
+                l1 = lowest_bit_position(self.b_inverse_adj[column_index] & self.free_columns_mask)
+                if ((self.base_inverse[column_index] >> row_index & 1) == 1):
 
                     # Full rank matrix with row and column removed is invertible
                     remove_rows = [row]
                     remove_columns = [column]
 
                     if k1 >= 0 and l1 >= 0:
-                        if self.adj_b_inv_adj[k1][row] == 1:
-                            k2 = next((k2 for k2 in self.free_rows if k2 != k1 and self.adj_b_inv_adj[k2][row] != self.adj_b_inverse[k2][row]), -1)
+                        if (self.adj_b_inv_adj[k1] >> row & 1) == 1:
+                            k2 = next((k2 for k2 in self.free_rows if k2 != k1 and (self.adj_b_inv_adj[k2] >> row & 1) != (self.adj_b_inverse[k2] >> row_index & 1)), -1)
                         else:
-                            k2 = next((k2 for k2 in self.free_rows if k2 != k1 and self.adj_b_inv_adj[k2][row] == 1), -1)
-                        if self.adj_b_inv_adj[column][l1] == 1:
-                            l2 = next((l2 for l2 in self.free_columns if l2 != l1 and self.adj_b_inv_adj[column][l2] != self.b_inverse_adj[column][l2]), -1)
+                            k2 = next((k2 for k2 in self.free_rows if k2 != k1 and (self.adj_b_inv_adj[k2] >> row & 1) == 1), -1)
+                        if (self.adj_b_inv_adj[column] >> l1 & 1) == 1:
+                            l2 = lowest_bit_position((self.adj_b_inv_adj[column] ^ self.b_inverse_adj[column_index]) & ~(1 << l1) & self.free_columns_mask)
                         else:
-                            l2 = next((l2 for l2 in self.free_columns if l2 != l1 and self.adj_b_inv_adj[column][l2] == 1), -1)
+                            l2 = lowest_bit_position(self.adj_b_inv_adj[column] & ~(1 << l1) & self.free_columns_mask)
                         if k2 >= 0:
                             if l2 >= 0:
                                 add_rows = [column, k1, k2]
@@ -384,7 +687,7 @@ class GraphPartition:
                                 add_rows = [column, k1]
                                 add_columns = [l1, l2]
                             else:
-                                if ((self.adj_b_inv_adj[k1][row] & self.adj_b_inv_adj[column][l1]) ^ (self.adj_b_inv_adj[k1][row] & self.adj_b_inverse[column][row]) ^ (self.adj_b_inv_adj[column][l1] & self.b_inverse_adj[column][row])) != self.adj_b_inv_adj[column][row]:
+                                if (((self.adj_b_inv_adj[k1] >> row & 1) & (self.adj_b_inv_adj[column] >> l1 & 1)) ^ ((self.adj_b_inv_adj[k1] >> row & 1) & (self.adj_b_inverse[column] >> row_index & 1)) ^ ((self.adj_b_inv_adj[column] >> l1 & 1) & (self.b_inverse_adj[column_index] >> row & 1))) != (self.adj_b_inv_adj[column] >> row & 1):
                                     add_rows = [column, k1]
                                     add_columns = [row, l1]
                                 else:
@@ -392,8 +695,8 @@ class GraphPartition:
                                     add_columns = [l1]
 
                     else:
-                        k = next((k for k in self.free_rows if self.adj_b_inv_adj[k][row] != (self.adj_b_inverse[k][row] & self.b_inverse_adj[column][row])), -1)
-                        l = next((l for l in self.free_columns if self.adj_b_inv_adj[column][l] != (self.adj_b_inverse[column][row] & self.b_inverse_adj[column][l])), -1)
+                        k = next((k for k in self.free_rows if (self.adj_b_inv_adj[k] >> row & 1) != ((self.adj_b_inverse[k] >> row_index & 1) & (self.b_inverse_adj[column_index] >> row & 1))), -1)
+                        l = lowest_bit_position((self.adj_b_inv_adj[column] ^ (self.b_inverse_adj[column_index] if self.adj_b_inverse[column] >> row_index & 1 else 0)) & self.free_columns_mask)
                         if k >= 0:
                             if l >= 0:
                                 add_rows = [column, k]
@@ -406,7 +709,7 @@ class GraphPartition:
                                 add_rows = [column]
                                 add_columns = [l]
                             else:
-                                if self.adj_b_inv_adj[column][row] != (self.adj_b_inverse[column][row] & self.b_inverse_adj[column][row]):
+                                if (self.adj_b_inv_adj[column] >> row & 1) != ((self.adj_b_inverse[column] >> row_index & 1) & (self.b_inverse_adj[column_index] >> row & 1)):
                                     add_rows = [column]
                                     add_columns = [row]
                                 else:
@@ -416,8 +719,8 @@ class GraphPartition:
                 else:
 
                     # Full rank matrix with row and column removed is singular
-                    alpha = next(a for a in self.base_columns if self.base_inverse[a][row] == 1)
-                    beta = next(b for b in self.base_rows if self.base_inverse[column][b] == 1)
+                    alpha = next(a for a in self.base_columns if (self.base_inverse[self.base_index[a]] >> row_index & 1) == 1)
+                    beta = next(b for b in self.base_rows if (self.base_inverse[column_index] >> self.base_index[b] & 1) == 1)
                     remove_rows = [row, beta]
                     remove_columns = [column, alpha]
 
@@ -426,14 +729,14 @@ class GraphPartition:
                         if l1 >= 0:
 
                             # Case k1 >= 0 and l1 >= 0
-                            if self.adj_b_inv_adj[k1][row] == 1:
-                                k2 = next((k2 for k2 in self.free_rows if k2 != k1 and self.adj_b_inv_adj[k2][row] != self.adj_b_inverse[k2][row]), -1)
+                            if (self.adj_b_inv_adj[k1] >> row & 1) == 1:
+                                k2 = next((k2 for k2 in self.free_rows if k2 != k1 and (self.adj_b_inv_adj[k2] >> row & 1) != (self.adj_b_inverse[k2] >> row_index & 1)), -1)
                             else:
-                                k2 = next((k2 for k2 in self.free_rows if k2 != k1 and self.adj_b_inv_adj[k2][row] == 1), -1)
-                            if self.adj_b_inv_adj[column][l1] == 1:
-                                l2 = next((l2 for l2 in self.free_columns if l2 != l1 and self.adj_b_inv_adj[column][l2] != self.b_inverse_adj[column][l2]), -1)
+                                k2 = next((k2 for k2 in self.free_rows if k2 != k1 and (self.adj_b_inv_adj[k2] >> row & 1) == 1), -1)
+                            if (self.adj_b_inv_adj[column] >> l1 & 1) == 1:
+                                l2 = lowest_bit_position((self.adj_b_inv_adj[column] ^ self.b_inverse_adj[column_index]) & ~(1 << l1) & self.free_columns_mask)
                             else:
-                                l2 = next((l2 for l2 in self.free_columns if l2 != l1 and self.adj_b_inv_adj[column][l2] == 1), -1)
+                                l2 = lowest_bit_position(self.adj_b_inv_adj[column] & ~(1 << l1) & self.free_columns_mask)
                             if k2 >= 0:
                                 if l2 >= 0:
                                     add_rows = [column, k1, k2, beta]
@@ -446,7 +749,7 @@ class GraphPartition:
                                     add_rows = [column, k1, beta]
                                     add_columns = [l1, l2, alpha]
                                 else:
-                                    if ((self.adj_b_inv_adj[k1][row] & self.adj_b_inverse[column][row]) ^ (self.adj_b_inv_adj[column][l1] & self.b_inverse_adj[column][row])) != self.adj_b_inv_adj[column][row]:
+                                    if (((self.adj_b_inv_adj[k1] >> row & 1) & (self.adj_b_inverse[column] >> row_index & 1)) ^ ((self.adj_b_inv_adj[column] >> l1 & 1) & (self.b_inverse_adj[column_index] >> row & 1))) != (self.adj_b_inv_adj[column] >> row & 1):
                                         add_rows = [column, k1, beta]
                                         add_columns = [row, l1, alpha]
                                     else:
@@ -456,16 +759,16 @@ class GraphPartition:
                         else:
 
                             # Case k1 >= 0 and l1 < 0
-                            l2 = next((l2 for l2 in self.free_columns if self.adj_b_inv_adj[column][l2] == 1), -1)
+                            l2 = lowest_bit_position(self.adj_b_inv_adj[column] & self.free_columns_mask)
                             if l2 >= 0:
-                                if self.b_inverse_adj[column][row] == 1:
+                                if (self.b_inverse_adj[column_index] >> row & 1) == 1:
                                     add_rows = [column, k1, beta]
                                     add_columns = [row, l2, alpha]
                                 else:
-                                    if self.adj_b_inv_adj[k1][row] == 1:
-                                        k2 = next((k2 for k2 in self.free_rows if k2 != k1 and self.adj_b_inv_adj[k2][row] != self.adj_b_inverse[k2][row]), -1)
+                                    if (self.adj_b_inv_adj[k1] >> row & 1) == 1:
+                                        k2 = next((k2 for k2 in self.free_rows if k2 != k1 and (self.adj_b_inv_adj[k2] >> row & 1) != (self.adj_b_inverse[k2] >> row_index & 1)), -1)
                                     else:
-                                        k2 = next((k2 for k2 in self.free_rows if k2 != k1 and self.adj_b_inv_adj[k2][row] == 1), -1)
+                                        k2 = next((k2 for k2 in self.free_rows if k2 != k1 and (self.adj_b_inv_adj[k2] >> row & 1) == 1), -1)
                                     if k2 >= 0:
                                         add_rows = [column, k1, k2]
                                         add_columns = [row, l2, alpha]
@@ -473,19 +776,19 @@ class GraphPartition:
                                         add_rows = [column, k1]
                                         add_columns = [l2, alpha]
                             else:
-                                if self.b_inverse_adj[column][row] == 1:
+                                if (self.b_inverse_adj[column_index] >> row & 1) == 1:
                                     add_rows = [k1, beta]
                                     add_columns = [row, alpha]
                                 else:
-                                    if self.adj_b_inv_adj[k1][row] == 1:
-                                        k2 = next((k2 for k2 in self.free_rows if k2 != k1 and self.adj_b_inv_adj[k2][row] != self.adj_b_inverse[k2][row]), -1)
+                                    if (self.adj_b_inv_adj[k1] >> row & 1) == 1:
+                                        k2 = next((k2 for k2 in self.free_rows if k2 != k1 and (self.adj_b_inv_adj[k2] >> row & 1) != (self.adj_b_inverse[k2] >> row_index & 1)), -1)
                                     else:
-                                        k2 = next((k2 for k2 in self.free_rows if k2 != k1 and self.adj_b_inv_adj[k2][row] == 1), -1)
+                                        k2 = next((k2 for k2 in self.free_rows if k2 != k1 and (self.adj_b_inv_adj[k2] >> row & 1) == 1), -1)
                                     if k2 >= 0:
                                         add_rows = [k1, k2]
                                         add_columns = [row, alpha]
                                     else:
-                                        if (self.adj_b_inv_adj[k1][row] & self.adj_b_inverse[column][row]) != self.adj_b_inv_adj[column][row]:
+                                        if ((self.adj_b_inv_adj[k1] >> row & 1) & (self.adj_b_inverse[column] >> row_index & 1)) != (self.adj_b_inv_adj[column] >> row & 1):
                                             add_rows = [column, k1]
                                             add_columns = [row, alpha]
                                         else:
@@ -497,16 +800,16 @@ class GraphPartition:
                         if l1 >= 0:
 
                             # Case k1 < 0 and l1 >= 0
-                            k2 = next((k2 for k2 in self.free_rows if self.adj_b_inv_adj[k2][row] == 1), -1)
+                            k2 = next((k2 for k2 in self.free_rows if (self.adj_b_inv_adj[k2] >> row & 1) == 1), -1)
                             if k2 >= 0:
-                                if self.adj_b_inverse[column][row] == 1:
+                                if (self.adj_b_inverse[column] >> row_index & 1) == 1:
                                     add_rows = [column, k2, beta]
                                     add_columns = [row, l1, alpha]
                                 else:
-                                    if self.adj_b_inv_adj[column][l1] == 1:
-                                        l2 = next((l2 for l2 in self.free_columns if l2 != l1 and self.adj_b_inv_adj[column][l2] != self.b_inverse_adj[column][l2]), -1)
+                                    if (self.adj_b_inv_adj[column] >> l1 & 1) == 1:
+                                        l2 = lowest_bit_position((self.adj_b_inv_adj[column] ^ self.b_inverse_adj[column_index]) & ~(1 << l1) & self.free_columns_mask)
                                     else:
-                                        l2 = next((l2 for l2 in self.free_columns if l2 != l1 and self.adj_b_inv_adj[column][l2] == 1), -1)
+                                        l2 = lowest_bit_position(self.adj_b_inv_adj[column] & ~(1 << l1) & self.free_columns_mask)
                                     if l2 >= 0:
                                         add_rows = [column, k2, beta]
                                         add_columns = [row, l1, l2]
@@ -514,19 +817,19 @@ class GraphPartition:
                                         add_rows = [k2, beta]
                                         add_columns = [row, l1]
                             else:
-                                if self.adj_b_inverse[column][row] == 1:
+                                if (self.adj_b_inverse[column] >> row_index & 1) == 1:
                                     add_rows = [column, beta]
                                     add_columns = [l1, alpha]
                                 else:
-                                    if self.adj_b_inv_adj[column][l1] == 1:
-                                        l2 = next((l2 for l2 in self.free_columns if l2 != l1 and self.adj_b_inv_adj[column][l2] != self.b_inverse_adj[column][l2]), -1)
+                                    if (self.adj_b_inv_adj[column] >> l1 & 1) == 1:
+                                        l2 = lowest_bit_position((self.adj_b_inv_adj[column] ^ self.b_inverse_adj[column_index]) & ~(1 << l1) & self.free_columns_mask)
                                     else:
-                                        l2 = next((l2 for l2 in self.free_columns if l2 != l1 and self.adj_b_inv_adj[column][l2] == 1), -1)
+                                        l2 = lowest_bit_position(self.adj_b_inv_adj[column] & ~(1 << l1) & self.free_columns_mask)
                                     if l2 >= 0:
                                         add_rows = [column, beta]
                                         add_columns = [l1, l2]
                                     else:
-                                        if (self.adj_b_inv_adj[column][l1] & self.b_inverse_adj[column][row]) != self.adj_b_inv_adj[column][row]:
+                                        if ((self.adj_b_inv_adj[column] >> l1 & 1) & (self.b_inverse_adj[column_index] >> row & 1)) != (self.adj_b_inv_adj[column] >> row & 1):
                                             add_rows = [column, beta]
                                             add_columns = [row, l1]
                                         else:
@@ -536,12 +839,12 @@ class GraphPartition:
                         else:
 
                             # Case k1 < 0 and l1 < 0
-                            if self.adj_b_inverse[column][row] == 1:
-                                if self.b_inverse_adj[column][row] == 1:
+                            if (self.adj_b_inverse[column] >> row_index & 1) == 1:
+                                if (self.b_inverse_adj[column_index] >> row & 1) == 1:
                                     add_rows = [column, beta]
                                     add_columns = [row, alpha]
                                 else:
-                                    k2 = next((k2 for k2 in self.free_rows if self.adj_b_inv_adj[k2][row] == 1), -1)
+                                    k2 = next((k2 for k2 in self.free_rows if (self.adj_b_inv_adj[k2] >> row & 1) == 1), -1)
                                     if k2 >= 0:
                                         add_rows = [column, k2]
                                         add_columns = [row, alpha]
@@ -549,8 +852,8 @@ class GraphPartition:
                                         add_rows = [column]
                                         add_columns = [alpha]
                             else:
-                                if self.b_inverse_adj[column][row] == 1:
-                                    l2 = next((l2 for l2 in self.free_columns if self.adj_b_inv_adj[column][l2] == 1), -1)
+                                if (self.b_inverse_adj[column_index] >> row & 1) == 1:
+                                    l2 = lowest_bit_position(self.adj_b_inv_adj[column] & self.free_columns_mask)
                                     if l2 >= 0:
                                         add_rows = [column, beta]
                                         add_columns = [row, l2]
@@ -558,8 +861,8 @@ class GraphPartition:
                                         add_rows = [beta]
                                         add_columns = [row]
                                 else:
-                                    k2 = next((k2 for k2 in self.free_rows if self.adj_b_inv_adj[k2][row] == 1), -1)
-                                    l2 = next((l2 for l2 in self.free_columns if self.adj_b_inv_adj[column][l2] == 1), -1)
+                                    k2 = next((k2 for k2 in self.free_rows if (self.adj_b_inv_adj[k2] >> row & 1) == 1), -1)
+                                    l2 = lowest_bit_position(self.adj_b_inv_adj[column] & self.free_columns_mask)
                                     if k2 >= 0:
                                         if l2 >= 0:
                                             add_rows = [column, k2]
@@ -572,24 +875,134 @@ class GraphPartition:
                                             add_rows = [column]
                                             add_columns = [l2]
                                         else:
-                                            if self.adj_b_inv_adj[column][row] == 1:
+                                            if (self.adj_b_inv_adj[column] >> row & 1) == 1:
                                                 add_rows = [column]
                                                 add_columns = [row]
                                             else:
                                                 add_rows = []
                                                 add_columns = []
 
-        # Set new set of rows and columns
-        self.row_flag[row] = False
-        self.row_flag[column] = True
-        row_idx = next(i for i in range(len(self.rows)) if self.rows[i] == row)
-        col_idx = next(i for i in range(len(self.columns)) if self.columns[i] == column)
-        self.rows[row_idx] = column
-        self.columns[col_idx] = row
-
-        # Apply reduction and extension
+        # Set new set of rows and columns. A swapped base node is moved to the base subset of its new partition set until the base is reduced
+        if self.journal is not None:
+            state = (self.cut_rank, self.free_rows_mask, self.free_columns_mask, self.row_swap_cache, self.column_swap_cache)
+            self._changes = []
+        self._detach_node(row)
+        self._detach_node(column)
+        self._write(self.row_flag, row, False)
+        self._write(self.row_flag, column, True)
+        row_idx = self.position[row]
+        col_idx = self.position[column]
+        self._write(self.rows, row_idx, column)
+        self._write(self.columns, col_idx, row)
+        self._write(self.position, column, row_idx)
+        self._write(self.position, row, col_idx)
+        self._attach_node(row)
+        self._attach_node(column)
+
+        # Apply reduction and extension, and forget the swap data of the old partition
         self._reduce_base(remove_rows, remove_columns)
         self._extend_base(add_rows, add_columns)
+        self._clear_swap_cache()
+        if self.journal is not None:
+            self.journal.append((state, self._changes))
+            self._changes = None
 
-        # Update set of fre rows and free columns
-        self._build_free_nodes()
+
+    def move_node(self, node : int) -> None:
+        """Moves one node to the other partition set, and updates all matrices like 'apply_swap'. The node is removed from rows or columns by
+        swap-remove, i.e. the last node of its old set takes its position, and it is appended to its new set.
+        The cut-rank changes by -1, 0 or 1, see 'single_move_cut_rank' in swap_rank_calculator.py.
+
+        args:
+            - node: 'int' The node to move, either a row or a column.
+        """
+
+        remove_rows : list[int]
+        remove_columns : list[int]
+        add_rows : list[int]
+        add_columns : list[int]
+
+        node_index = self.base_index[node]
+
+        if self.row_flag[node]:
+
+            if not self.base_flag[node]:
+
+                # node in X^D, the cut-rank increases iff the moved column is independent
+                remove_rows = []
+                remove_columns = []
+                k2 = next((k2 for k2 in self.free_rows if k2 != node and (self.adj_b_inv_adj[k2] >> node & 1) == 1), -1)
+                add_rows = [k2] if k2 >= 0 else []
+                add_columns = [node] if k2 >= 0 else []
+
+            else:
+
+                # node in X^B, replaced by k1 in the base if possible
+                alpha = next(a for a in self.base_columns if (self.base_inverse[self.base_index[a]] >> node_index & 1) == 1)
+                remove_rows = [node]
+                remove_columns = [alpha]
+                k1 = next((k1 for k1 in self.free_rows if (self.adj_b_inverse[k1] >> node_index & 1) == 1), -1)
+                if k1 >= 0:
+                    if (self.adj_b_inv_adj[k1] >> node & 1) == 1:
+                        k2 = next((k2 for k2 in self.free_rows if k2 != k1 and (self.adj_b_inv_adj[k2] >> node & 1) != (self.adj_b_inverse[k2] >> node_index & 1)), -1)
+                    else:
+                        k2 = next((k2 for k2 in self.free_rows if k2 != k1 and (self.adj_b_inv_adj[k2] >> node & 1) == 1), -1)
+                    add_rows = [k1, k2] if k2 >= 0 else [k1]
+                    add_columns = [node, alpha] if k2 >= 0 else [alpha]
+                else:
+                    k2 = next((k2 for k2 in self.free_rows if (self.adj_b_inv_adj[k2] >> node & 1) == 1), -1)
+                    add_rows = [k2] if k2 >= 0 else []
+                    add_columns = [node] if k2 >= 0 else []
+
+        else:
+
+            if not self.base_flag[node]:
+
+                # node in Y^D, the cut-rank increases iff the moved row is independent
+                remove_rows = []
+                remove_columns = []
+                l2 = lowest_bit_position(self.adj_b_inv_adj[node] & ~(1 << node) & self.free_columns_mask)
+                add_rows = [node] if l2 >= 0 else []
+                add_columns = [l2] if l2 >= 0 else []
+
+            else:
+
+                # node in Y^B, replaced by l1 in the base if possible
+                beta = next(b for b in self.base_rows if (self.base_inverse[node_index] >> self.base_index[b] & 1) == 1)
+                remove_rows = [beta]
+                remove_columns = [node]
+                l1 = lowest_bit_position(self.b_inverse_adj[node_index] & self.free_columns_mask)
+                if l1 >= 0:
+                    if (self.adj_b_inv_adj[node] >> l1 & 1) == 1:
+                        l2 = lowest_bit_position((self.adj_b_inv_adj[node] ^ self.b_inverse_adj[node_index]) & ~(1 << l1) & self.free_columns_mask)
+                    else:
+                        l2 = lowest_bit_position(self.adj_b_inv_adj[node] & ~(1 << l1) & self.free_columns_mask)
+                    add_rows = [node, beta] if l2 >= 0 else [beta]
+                    add_columns = [l1, l2] if l2 >= 0 else [l1]
+                else:
+                    l2 = lowest_bit_position(self.adj_b_inv_adj[node] & self.free_columns_mask)
+                    add_rows = [node] if l2 >= 0 else []
+                    add_columns = [l2] if l2 >= 0 else []
+
+        # Move the node by swap-remove from its set. A moved base node is moved to the base subset of its new partition set until the base is reduced
+        if self.journal is not None:
+            state = (self.cut_rank, self.free_rows_mask, self.free_columns_mask, self.row_swap_cache, self.column_swap_cache)
+            self._changes = []
+        (old_set, new_set) = (self.rows, self.columns) if self.row_flag[node] else (self.columns, self.rows)
+        self._detach_node(node)
+        self._write(self.row_flag, node, not self.row_flag[node])
+        last = self._pop(old_set)
+        if last != node:
+            self._write(old_set, self.position[node], last)
+            self._write(self.position, last, self.position[node])
+        self._write(self.position, node, len(new_set))
+        self._append(new_set, node)
+        self._attach_node(node)
+
+        # Apply reduction and extension, and forget the swap data of the old partition
+        self._reduce_base(remove_rows, remove_columns)
+        self._extend_base(add_rows, add_columns)
+        self._clear_swap_cache()
+        if self.journal is not None:
+            self.journal.append((state, self._changes))
+            self._changes = None
@@ -6,6 +6,7 @@ import time
 from test_tools import parse_int, parse_float, temperatures_from_description
 from partition_builder import random_partition, grid_graph
 from cut_rank_annealing import cut_rank_annealing_row_formula
+from parallel_annealing import multi_start_annealing
 
 
 if __name__=="__main__":
@@ -23,6 +24,10 @@ if __name__=="__main__":
     -n Samples  The number of NxN grids to run the algorithm on for each N.
     -p P        The size of the first partition set as a portion of the number of all nodes. Default is 0.5.
     -t Temp     The temperature setup. See 'temperatures_from_description'. Default is '1e0.1s10', i.e. 10 temperatures on a linear range from 1.0 to 0.1
+    -k Chains   The number of independent annealing chains run from random partitions for each sample. Default is 1.
+                Each chain counts with the cut-rank of the partition it ends in, not the lowest one it reached, like in the published results, and the lowest of them counts for the sample.
+                With more than one chain, see 'multi_start_annealing' with 'final_state', the chain seeds are derived from the random function.
+    -j Procs    The number of worker processes for the chains. Default is the number of processors.
     -o Outfile  The path to the output file. If absent, not output is written to file.
     """
 
@@ -34,10 +39,12 @@ if __name__=="__main__":
     set_portion = 0.5
     temperatures = np.linspace(1.0, 0.1, 10)
     samples = -1
+    chains = 1
+    processes = None
     file_path_out = None
 
-    options = "s:r:n:p:t:o:"
-    long_options = ["seed=", "range=", "samples=", "partition_portion=", "temperatures=", "output_file="]
+    options = "s:r:n:p:t:k:j:o:"
+    long_options = ["seed=", "range=", "samples=", "partition_portion=", "temperatures=", "chains=", "processes=", "output_file="]
 
     try:
         arguments, values = getopt.getopt(opt_arguments, options, long_options)
@@ -54,6 +61,10 @@ if __name__=="__main__":
                 set_portion = parse_float(value, 0.5)
             elif argument in ("-t", "--temperatures"):
                 temperatures = temperatures_from_description(value)
+            elif argument in ("-k", "--chains"):
+                chains = parse_int(value, 1)
+            elif argument in ("-j", "--processes"):
+                processes = parse_int(value, None)
             elif argument in ("-o", "--output_file"):
                 file_path_out = value.replace("\\","/")
 
@@ -93,8 +104,11 @@ if __name__=="__main__":
                     start_time = time.time()
 
                     for _ in range(samples):
-                        partition = random_partition(adj_mat, set_portion)
-                        cut_rank_annealing_row_formula(partition, temperatures, False)
+                        if chains > 1:
+                            partition, _ = multi_start_annealing(adj_mat, set_portion, temperatures, chains, random.getrandbits(64), processes, final_state=True)
+                        else:
+                            partition = random_partition(adj_mat, set_portion)
+                            cut_rank_annealing_row_formula(partition, temperatures, False)
                         cut_rank = partition.cut_rank
 
                         if cut_rank < size:
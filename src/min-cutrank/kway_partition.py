@@ -0,0 +1,143 @@
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from matrix_tools import as_bit_matrix, gather_bits, rank_matrix_positions
+from partition_builder import random_partition
+from cut_rank_annealing import cut_rank_annealing_row_formula
+from parallel_annealing import chain_seeds, init_worker, worker_adjacencies
+
+
+class KwayResult:
+
+    """
+    The outcome of 'kway_partition'.
+    """
+
+    part_of : list[int]
+    """The part of each node, from 0 to the number of parts exclusive."""
+
+    part_cut_ranks : list[int]
+    """The cut-rank of each part against all other nodes, see 'kway_cut_ranks'."""
+
+    sum_cut_rank : int
+    """The sum of the cut-ranks of the parts."""
+
+    max_cut_rank : int
+    """The highest cut-rank of a part."""
+
+    bisection_seconds : list[float]
+    """The time of each bisection, in the order of the seeds, see 'kway_partition'."""
+
+    seconds : float
+    """The total time, including starting and stopping the worker processes."""
+
+    def __init__(self, nmb_nodes : int, nmb_parts : int):
+        self.part_of = [0] * nmb_nodes
+        self.part_cut_ranks = []
+        self.sum_cut_rank = 0
+        self.max_cut_rank = 0
+        self.bisection_seconds = [0.0] * (nmb_parts - 1)
+        self.seconds = 0.0
+
+
+def kway_cut_ranks(adjacencies : list[list[int]] | list[int] | tuple[list[int], list[int]], part_of : list[int], nmb_parts : int) -> list[int]:
+    """Returns the cut-rank of each part of a k-way partition against all other nodes, i.e. the rank of the adjacency submatrix between
+    the part and the rest of the graph.
+
+    args:
+        - adjacencies: The adjacency matrix of the graph, in any format accepted by GraphPartition.
+        - part_of: 'list[int]' The part of each node, from 0 to nmb_parts exclusive.
+        - nmb_parts: 'int' The number of parts.
+    """
+
+    adjacencies = as_bit_matrix(adjacencies)
+    parts = [[] for _ in range(nmb_parts)]
+    for node, part in enumerate(part_of):
+        parts[part].append(node)
+    nodes = range(len(adjacencies))
+    return [len(rank_matrix_positions(adjacencies, part, [node for node in nodes if part_of[node] != n])[0]) for n, part in enumerate(parts)]
+
+
+def _bisect(nodes : list[int], portion : float, temperatures, seed : int, time_limit : float | None) -> tuple[list[bool], float]:
+
+    # Anneals a random partition of the subgraph induced by the nodes, and returns the best partition seen and the time spent
+    start = time.time()
+    random.seed(seed)
+    adjacencies = worker_adjacencies()
+    subgraph = gather_bits([adjacencies[node] for node in nodes], nodes)
+    partition = random_partition(subgraph, portion)
+    result = cut_rank_annealing_row_formula(partition, temperatures, False, time_limit)
+    return (result.best_row_flag, time.time() - start)
+
+
+def kway_partition(adjacencies : list[list[int]] | list[int] | tuple[list[int], list[int]], nmb_parts : int, temperatures,
+                   master_seed : int | None = None, nmb_processes : int | None = None, time_limit : float | None = None) -> KwayResult:
+    """Partitions the nodes into k parts of low cut-rank by recursive bisection. A set of nodes that is to be split into c parts is bisected by
+    'cut_rank_annealing_row_formula' on its induced subgraph, with the first set getting the portion (c // 2) / c of the nodes, and the two sets
+    are then split further into c // 2 and c - c // 2 parts, so each part gets about n / k nodes.
+    Each bisection is submitted to a pool of worker processes as soon as the bisection it depends on has finished, so all bisections on one level
+    of the recursion run in parallel. Bisection n, the one splitting off part n + 1 as the first part of its second set, uses seed n from
+    'chain_seeds', so the result only depends on the master seed, not on the number of processes, unless a time limit is given.
+
+    args:
+        - adjacencies: The adjacency matrix of the graph, in any format accepted by GraphPartition.
+        - nmb_parts: 'int' The number of parts, at least 1.
+        - temperatures: The temperatures of the annealing of each bisection.
+        - master_seed: 'int' The seed from which the seeds of the bisections are derived. If None, the results are not reproducible.
+        - nmb_processes: 'int' The number of worker processes. If None, the number of processors is used. If 1, the bisections are run in this process,
+          and the state of the random function is restored afterwards.
+        - time_limit: 'float' The time limit in seconds for the annealing of each bisection, see 'cut_rank_annealing_row_formula'. No limit if None.
+    """
+
+    start = time.time()
+    if nmb_parts <= 0:
+        raise Exception("Number of parts must be positive")
+    adjacencies = as_bit_matrix(adjacencies)
+    result = KwayResult(len(adjacencies), nmb_parts)
+    seeds = chain_seeds(master_seed, max(1, nmb_parts - 1))
+
+    # Each pending bisection splits the nodes into 'count' parts, numbered from 'first'
+    pending = [(list(range(len(adjacencies))), 0, nmb_parts)]
+
+    def bisection_arguments(nodes : list[int], first : int, count : int) -> tuple:
+        return (nodes, (count // 2) / count, temperatures, seeds[first + count // 2 - 1], time_limit)
+
+    def split(nodes : list[int], first : int, count : int, row_flag : list[bool], seconds : float) -> None:
+        result.bisection_seconds[first + count // 2 - 1] = seconds
+        halves = [([node for node, flag in zip(nodes, row_flag) if flag], first, count // 2),
+                  ([node for node, flag in zip(nodes, row_flag) if not flag], first + count // 2, count - count // 2)]
+        for (half, half_first, half_count) in halves:
+            if half_count == 1:
+                for node in half:
+                    result.part_of[node] = half_first
+            else:
+                pending.append((half, half_first, half_count))
+
+    if nmb_parts == 1:
+        pending = []
+    if nmb_processes == 1:
+        # The bisections seed the random function, so the state of the caller is restored afterwards
+        init_worker(adjacencies)
+        random_state = random.getstate()
+        try:
+            while pending:
+                (nodes, first, count) = pending.pop()
+                split(nodes, first, count, *_bisect(*bisection_arguments(nodes, first, count)))
+        finally:
+            random.setstate(random_state)
+    else:
+        with ProcessPoolExecutor(max_workers=nmb_processes, initializer=init_worker, initargs=(adjacencies,)) as executor:
+            running = {}
+            while pending or running:
+                for (nodes, first, count) in pending:
+                    running[executor.submit(_bisect, *bisection_arguments(nodes, first, count))] = (nodes, first, count)
+                pending = []
+                (done, _) = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    split(*running.pop(future), *future.result())
+
+    result.part_cut_ranks = kway_cut_ranks(adjacencies, result.part_of, nmb_parts)
+    result.sum_cut_rank = sum(result.part_cut_ranks)
+    result.max_cut_rank = max(result.part_cut_ranks)
+    result.seconds = time.time() - start
+    return result
@@ -0,0 +1,215 @@
+import numpy as np
+import random
+import time
+from matrix_tools import as_bit_matrix
+from graph_partition import GraphPartition
+from partition_builder import pseudo_peripheral_node
+from swap_rank_calculator import all_move_rank_deltas
+
+
+class LinearOrderResult:
+
+    """
+    The outcome of 'linear_rank_width_search'.
+    """
+
+    order : list[int]
+    """The best vertex ordering found."""
+
+    profile : list[int]
+    """The cut-rank profile of the order, see 'cut_rank_profile'."""
+
+    width : int
+    """The linear rank-width of the order, i.e. the highest cut-rank in its profile."""
+
+    initial_width : int
+    """The linear rank-width of the start order."""
+
+    iterations : int
+    """The number of applied moves, each moving one vertex to another position in the order."""
+
+    seconds : float
+    """The total time of the search."""
+
+    def __init__(self, order : list[int], profile : list[int]):
+        self.order = order[:]
+        self.profile = profile[:]
+        self.width = max(profile)
+        self.initial_width = self.width
+        self.iterations = 0
+        self.seconds = 0.0
+
+
+def _empty_partition(adjacencies : list[int]) -> GraphPartition:
+
+    # All nodes in the second partition set, where all matrices are trivial to build since the cut-rank is 0
+    return GraphPartition(adjacencies, [False] * len(adjacencies))
+
+
+def cut_rank_profile(adjacencies : list[list[int]] | list[int] | tuple[list[int], list[int]], order : list[int]) -> list[int]:
+    """Returns the cut-rank profile of a vertex ordering: element m is the cut-rank of the first m vertices of the order against the other vertices,
+    for m from 0 to n. The vertices are moved one at a time from the second to the first partition set of one GraphPartition by 'move_node',
+    which updates the base and the matrices incrementally, so the whole profile takes about O(n^3) bit operations instead of one elimination per prefix.
+
+    args:
+        - adjacencies: The adjacency matrix of the graph, in any format accepted by GraphPartition.
+        - order: 'list[int]' The vertex ordering, a permutation of the nodes.
+    """
+
+    partition = _empty_partition(as_bit_matrix(adjacencies))
+    profile = [0]
+    for node in order:
+        partition.move_node(node)
+        profile.append(partition.cut_rank)
+    return profile
+
+
+def _profile_table(adjacencies : list[int], order : list[int]) -> tuple[np.ndarray, np.ndarray]:
+
+    # The profile, and the (n + 1) x n table where element [m][v] is the cut-rank of the first m vertices of the order with v moved to the other side,
+    # i.e. with v removed if it is among them and added otherwise, from 'all_move_rank_deltas' on each prefix
+    nmb_nodes = len(adjacencies)
+    partition = _empty_partition(adjacencies)
+    profile = np.zeros(nmb_nodes + 1, dtype=np.int64)
+    table = np.zeros((nmb_nodes + 1, nmb_nodes), dtype=np.int64)
+    deltas = None
+    for m in range(nmb_nodes + 1):
+        if m > 0:
+            partition.move_node(order[m - 1])
+        deltas = all_move_rank_deltas(partition, deltas)
+        profile[m] = partition.cut_rank
+        table[m] = deltas
+        table[m] += partition.cut_rank
+    return (profile, table)
+
+
+def greedy_linear_order(adjacencies : list[list[int]] | list[int] | tuple[list[int], list[int]]) -> list[int]:
+    """Returns a vertex ordering built by always appending the vertex that gives the lowest cut-rank of the new prefix, by 'all_move_rank_deltas'.
+    Ties are broken by the most neighbours in the prefix, then by the lowest node index. The order starts with a pseudo-peripheral node.
+
+    args:
+        - adjacencies: The adjacency matrix of the graph, in any format accepted by GraphPartition.
+    """
+
+    adjacencies = as_bit_matrix(adjacencies)
+    nmb_nodes = len(adjacencies)
+    if nmb_nodes == 0:
+        return []
+    partition = _empty_partition(adjacencies)
+    order = [pseudo_peripheral_node(adjacencies)]
+    partition.move_node(order[0])
+    prefix_mask = 1 << order[0]
+    deltas = None
+    while len(order) < nmb_nodes:
+        deltas = all_move_rank_deltas(partition, deltas)
+        lowest = min(int(deltas[column]) for column in partition.columns)
+        node = max((column for column in partition.columns if deltas[column] == lowest),
+                   key=lambda column: ((adjacencies[column] & prefix_mask).bit_count(), -column))
+        partition.move_node(node)
+        order.append(node)
+        prefix_mask |= 1 << node
+    return order
+
+
+def _best_insertion_move(order : list[int], profile : np.ndarray, table : np.ndarray) -> tuple[int, int, int, int]:
+
+    # The best move of a vertex to another position by width and then profile sum, from the profile and table of '_profile_table', as the node, its new position,
+    # and the width and profile sum of the new order. Ties are broken at random
+    nmb_nodes = len(order)
+    lengths = np.arange(nmb_nodes + 1)[:, None]
+    position = np.empty(nmb_nodes, dtype=np.int64)
+    position[order] = np.arange(nmb_nodes)
+    head_max = np.maximum.accumulate(profile)
+    tail_max = np.maximum.accumulate(profile[::-1])[::-1]
+
+    # Moves to a later position j, for j in rows 0..n-1: prefix k in (i, j] gets table[k + 1][v]
+    later = np.where(lengths[: nmb_nodes] > position, table[1 :], -1)
+    later_max = np.maximum(np.maximum.accumulate(later, axis=0), head_max[position][None, :])
+    later_max = np.maximum(later_max, tail_max[1 :, None])
+    later_sum = np.cumsum(np.where(later >= 0, later - profile[: nmb_nodes, None], 0), axis=0)
+    later_valid = lengths[: nmb_nodes] > position
+
+    # Moves to an earlier position j, for j in rows 0..n-1: prefix k in (j, i] gets table[k - 1][v]
+    earlier = np.where((lengths[1 :] <= position) & (lengths[1 :] >= 1), table[: nmb_nodes], -1)
+    earlier_max = np.maximum.accumulate(earlier[::-1], axis=0)[::-1]
+    earlier_max = np.maximum(np.maximum(earlier_max, head_max[: nmb_nodes, None]), tail_max[np.minimum(position + 1, nmb_nodes)][None, :])
+    earlier_sum = np.cumsum(np.where(earlier >= 0, earlier - profile[1 :, None], 0)[::-1], axis=0)[::-1]
+    earlier_valid = lengths[: nmb_nodes] < position
+
+    # The scores by width and then the change of the profile sum, which is less than n^2 in absolute value
+    scale = 2 * nmb_nodes * nmb_nodes + 1
+    scores = np.full((2, nmb_nodes, nmb_nodes), np.iinfo(np.int64).max)
+    scores[0][later_valid] = (later_max * scale + later_sum)[later_valid]
+    scores[1][earlier_valid] = (earlier_max * scale + earlier_sum)[earlier_valid]
+    candidates = np.flatnonzero(scores == scores.min())
+    (direction, target, node) = np.unravel_index(int(candidates[random.randrange(len(candidates))]), scores.shape)
+    (widths, sums) = (later_max, later_sum) if direction == 0 else (earlier_max, earlier_sum)
+    return (int(node), int(target), int(widths[target, node]), int(profile.sum()) + int(sums[target, node]))
+
+
+def best_insertion_move(adjacencies : list[list[int]] | list[int] | tuple[list[int], list[int]], order : list[int]) -> tuple[int, int, int, int]:
+    """Returns the move of one vertex to another position in the order that gives the lowest linear rank-width, and then the lowest sum of the cut-rank profile,
+    as evaluated by one sweep of 'all_move_rank_deltas' over the prefixes, see 'linear_rank_width_search'. Ties are broken at random.
+
+    args:
+        - adjacencies: The adjacency matrix of the graph, in any format accepted by GraphPartition.
+        - order: 'list[int]' The vertex ordering, a permutation of at least two nodes.
+
+    returns:
+        - The node to be moved, its position in the new order, and the linear rank-width and the sum of the cut-rank profile of the new order.
+    """
+
+    adjacencies = as_bit_matrix(adjacencies)
+    if len(adjacencies) < 2:
+        raise Exception("An order needs at least two vertices to move one")
+    (profile, table) = _profile_table(adjacencies, order)
+    return _best_insertion_move(order, profile, table)
+
+
+def linear_rank_width_search(adjacencies : list[list[int]] | list[int] | tuple[list[int], list[int]], order : list[int] | None = None,
+                             max_iterations : int = 100, time_limit : float | None = None, log : bool = False) -> LinearOrderResult:
+    """Searches for a vertex ordering of low linear rank-width by local search over insertion moves, i.e. moving one vertex to another position.
+    Moving vertex v from position i to a later position j changes the prefixes of length i + 1 to j into the prefixes of length i + 2 to j + 1 with v
+    removed, and moving it to an earlier position changes the prefixes of length j + 1 to i into the prefixes of length j to i - 1 with v added.
+    One sweep of 'move_node' and 'all_move_rank_deltas' over the prefixes thus gives the new profile of every move, and the move with the lowest
+    width, then the lowest sum of the profile, is applied if it improves the order. Ties are broken at random. Each iteration costs one sweep.
+
+    args:
+        - adjacencies: The adjacency matrix of the graph, in any format accepted by GraphPartition.
+        - order: 'list[int]' The start order. If None, 'greedy_linear_order' is used.
+        - max_iterations: 'int' The maximum number of applied moves.
+        - time_limit: 'float' The time limit in seconds, checked before each iteration. No limit if None.
+        - log: 'bool' Whether each improvement of the width should be logged to the console.
+    """
+
+    start = time.time()
+    deadline = None if time_limit is None else start + time_limit
+    adjacencies = as_bit_matrix(adjacencies)
+    nmb_nodes = len(adjacencies)
+    order = greedy_linear_order(adjacencies) if order is None else list(order)
+    (profile, table) = _profile_table(adjacencies, order)
+    result = LinearOrderResult(order, profile.tolist())
+    if log:
+        print(f"Starting with linear rank-width {result.width}")
+
+    while result.iterations < max_iterations and nmb_nodes > 1:
+        if deadline is not None and time.time() >= deadline:
+            break
+        (node, target, width, profile_sum) = _best_insertion_move(order, profile, table)
+        if (width, profile_sum) >= (result.width, sum(result.profile)):
+            break
+        order.remove(node)
+        order.insert(target, node)
+        result.iterations += 1
+
+        (profile, table) = _profile_table(adjacencies, order)
+        if int(profile.max()) != width or int(profile.sum()) != profile_sum:
+            raise Exception("Profile of the new order does not fit with the evaluated move")
+        if width < result.width and log:
+            print(f"Linear rank-width {width} reached in iteration {result.iterations}")
+        result.order = order[:]
+        result.profile = profile.tolist()
+        result.width = width
+
+    result.seconds = time.time() - start
+    return result
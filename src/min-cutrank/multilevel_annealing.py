@@ -0,0 +1,237 @@
+import random
+import time
+from matrix_tools import as_bit_matrix, bit_positions
+from graph_partition import GraphPartition
+from annealing_schedule import AnnealingSchedule
+from cut_rank_annealing import cut_rank_annealing_row_formula
+from fm_refinement import fm_refinement
+
+
+class CoarseLevel:
+
+    """
+    One level of the coarsening hierarchy of 'multilevel_annealing', where each node is a group of nodes of the level below.
+    """
+
+    adjacencies : list[int]
+    """The adjacency matrix of the level as a bit matrix. Two groups are adjacent if any of their nodes are adjacent."""
+
+    weights : list[int]
+    """The number of nodes of the original graph in each node of the level."""
+
+    group_of : list[int]
+    """The node of this level that each node of the level below belongs to."""
+
+    def __init__(self, adjacencies : list[int], weights : list[int], group_of : list[int]):
+        self.adjacencies = adjacencies
+        self.weights = weights
+        self.group_of = group_of
+
+
+class MultilevelResult:
+
+    """
+    Statistics from 'multilevel_annealing'.
+    """
+
+    level_sizes : list[int]
+    """The number of nodes on each level, from the original graph to the coarsest level."""
+
+    level_cut_ranks : list[int]
+    """The cut-rank on each level after annealing or refinement, from the original graph to the coarsest level."""
+
+    initial_cut_rank : int
+    """The cut-rank of the partition of the original graph projected from the level above, before its refinement."""
+
+    cut_rank : int
+    """The cut-rank of the final partition of the original graph."""
+
+    seconds : float
+    """The total time, including coarsening."""
+
+    def __init__(self):
+        self.level_sizes = []
+        self.level_cut_ranks = []
+        self.initial_cut_rank = -1
+        self.cut_rank = -1
+        self.seconds = 0.0
+
+
+def coarsen(adjacencies : list[int], weights : list[int], max_weight : int) -> CoarseLevel:
+    """Returns the next coarser level of a graph. First, twins, i.e. nodes with the same neighbours besides each other, are merged into groups, since
+    twins on the same side of a cut give identical rows or columns in the cut matrix. Then the remaining nodes are matched in random order with the
+    unmatched neighbour they have the most common neighbours with. No group gets a weight above 'max_weight'.
+
+    args:
+        - adjacencies: 'list[int]' The adjacency matrix of the graph as a bit matrix.
+        - weights: 'list[int]' The weight of each node.
+        - max_weight: 'int' The maximum weight of a merged node.
+    """
+
+    nmb_nodes = len(adjacencies)
+    singles = list(range(nmb_nodes))
+    groups = []
+
+    # Twins, by the open neighbourhood for non-adjacent and the closed neighbourhood for adjacent twins
+    for closed in (False, True):
+        twins = {}
+        for node in singles:
+            twins.setdefault(adjacencies[node] | (1 << node) if closed else adjacencies[node], []).append(node)
+        singles = []
+        for members in twins.values():
+            group = []
+            weight = 0
+            for node in members:
+                if group and weight + weights[node] > max_weight:
+                    groups.append(group)
+                    (group, weight) = ([], 0)
+                group.append(node)
+                weight += weights[node]
+            if len(group) == 1 and len(members) == 1:
+                singles.append(group[0])
+            else:
+                groups.append(group)
+
+    # Matching of the remaining nodes with neighbours
+    unmatched = [False] * nmb_nodes
+    for node in singles:
+        unmatched[node] = True
+    random.shuffle(singles)
+    for node in singles:
+        if not unmatched[node]:
+            continue
+        unmatched[node] = False
+        best_common = -1
+        mate = -1
+        for neighbour in bit_positions(adjacencies[node]):
+            if unmatched[neighbour] and weights[node] + weights[neighbour] <= max_weight:
+                common = (adjacencies[node] & adjacencies[neighbour]).bit_count()
+                if common > best_common:
+                    (best_common, mate) = (common, neighbour)
+        if mate >= 0:
+            unmatched[mate] = False
+            groups.append([node, mate])
+        else:
+            groups.append([node])
+
+    groups.sort()
+    group_of = [0] * nmb_nodes
+    group_weights = []
+    for group, members in enumerate(groups):
+        for node in members:
+            group_of[node] = group
+        group_weights.append(sum(weights[node] for node in members))
+    coarse_adjacencies = [0] * len(groups)
+    for node in range(nmb_nodes):
+        group = group_of[node]
+        for neighbour in bit_positions(adjacencies[node]):
+            coarse_adjacencies[group] |= 1 << group_of[neighbour]
+    for group in range(len(groups)):
+        coarse_adjacencies[group] &= ~(1 << group)
+    return CoarseLevel(coarse_adjacencies, group_weights, group_of)
+
+
+def rebalance(adjacencies : list[int], weights : list[int], row_flag : list[bool], target_weight : int) -> None:
+    """Moves nodes between the partition sets until the total weight of the first set is as close to the target as single moves can bring it.
+    The node moved from the heavier set is the one with the most neighbours in the other set, counted minus its neighbours in its own set,
+    among the nodes that do not overshoot the target.
+
+    args:
+        - adjacencies: 'list[int]' The adjacency matrix of the graph as a bit matrix.
+        - weights: 'list[int]' The weight of each node.
+        - row_flag: 'list[bool]' The partition, see 'row_flag' in GraphPartition. It is updated in place.
+        - target_weight: 'int' The target total weight of the first partition set.
+    """
+
+    nodes = range(len(adjacencies))
+    row_mask = sum(1 << node for node in nodes if row_flag[node])
+    excess = sum(weights[node] for node in nodes if row_flag[node]) - target_weight
+    while excess != 0:
+        from_rows = excess > 0
+        candidates = [node for node in nodes if row_flag[node] == from_rows and weights[node] <= abs(excess)]
+        if not candidates:
+            break
+        own_mask = row_mask if from_rows else ~row_mask
+        node = max(candidates, key=lambda node: (adjacencies[node] & ~own_mask).bit_count() - (adjacencies[node] & own_mask).bit_count())
+        row_flag[node] = not from_rows
+        row_mask ^= 1 << node
+        excess += -weights[node] if from_rows else weights[node]
+
+
+def multilevel_annealing(adjacencies : list[list[int]] | list[int] | tuple[list[int], list[int]], portion : float,
+                         temperatures : AnnealingSchedule | list[float], refine_swaps : int | None = 100, coarsest_size : int = 100,
+                         log : bool = False) -> tuple[GraphPartition, MultilevelResult]:
+    """Finds a partition of low cut-rank by the multilevel scheme. The graph is coarsened by 'coarsen' until it has at most 'coarsest_size' nodes,
+    or coarsening no longer reduces it by a tenth. A random partition of the coarsest level, balanced by node weight, is annealed by
+    'cut_rank_annealing_row_formula', and the best partition seen is kept. Then the partition is projected back one level at a time, rebalanced by
+    'rebalance' and refined by 'fm_refinement', which never increases the cut-rank of the projected partition. On the original graph all weights are 1,
+    so the rebalanced partition has exactly the size of 'random_partition' with the same portion.
+
+    args:
+        - adjacencies: The adjacency matrix of the graph, in any format accepted by GraphPartition.
+        - portion: 'float' The size of the first partition set as a portion of the number of all nodes.
+        - temperatures: The temperatures of the annealing on the coarsest level, see 'cut_rank_annealing_row_formula'.
+        - refine_swaps: 'int' The maximum number of swaps in each pass of 'fm_refinement' on the finer levels. No limit if None.
+        - coarsest_size: 'int' The number of nodes at which coarsening stops.
+        - log: 'bool' Whether the cut-rank on each level should be logged to the console.
+
+    returns:
+        - The partition of the original graph.
+        - The statistics of the run.
+    """
+
+    start = time.time()
+    adjacencies = as_bit_matrix(adjacencies)
+    nmb_nodes = len(adjacencies)
+    target_weight = round(nmb_nodes * portion)
+    result = MultilevelResult()
+
+    # Coarsening, where the group weight is limited to keep the coarse partitions balanceable
+    levels = [CoarseLevel(adjacencies, [1] * nmb_nodes, [])]
+    max_weight = max(2, min(target_weight, nmb_nodes - target_weight) // coarsest_size)
+    while len(levels[-1].adjacencies) > coarsest_size:
+        level = coarsen(levels[-1].adjacencies, levels[-1].weights, max_weight)
+        if len(level.adjacencies) > 0.9 * len(levels[-1].adjacencies):
+            break
+        levels.append(level)
+    result.level_sizes = [len(level.adjacencies) for level in levels]
+
+    # Annealing of a random weight balanced partition on the coarsest level
+    coarsest = levels[-1]
+    order = list(range(len(coarsest.adjacencies)))
+    random.shuffle(order)
+    row_flag = [False] * len(order)
+    weight = 0
+    for node in order:
+        if weight >= target_weight:
+            break
+        row_flag[node] = True
+        weight += coarsest.weights[node]
+    rebalance(coarsest.adjacencies, coarsest.weights, row_flag, target_weight)
+    partition = GraphPartition(coarsest.adjacencies, row_flag)
+    annealing = cut_rank_annealing_row_formula(partition, temperatures, False)
+    if annealing.best_cut_rank < partition.cut_rank:
+        partition = GraphPartition(coarsest.adjacencies, annealing.best_row_flag)
+    cut_ranks = [partition.cut_rank]
+    if log:
+        print(f"Cut-rank {partition.cut_rank} on coarsest level with {len(order)} nodes")
+
+    # Projection and refinement
+    for depth in range(len(levels) - 2, -1, -1):
+        group_of = levels[depth + 1].group_of
+        row_flag = [partition.row_flag[group] for group in group_of]
+        rebalance(levels[depth].adjacencies, levels[depth].weights, row_flag, target_weight)
+        partition = GraphPartition(levels[depth].adjacencies, row_flag)
+        if depth == 0:
+            result.initial_cut_rank = partition.cut_rank
+        fm_refinement(partition, max_swaps_per_pass=refine_swaps)
+        cut_ranks.append(partition.cut_rank)
+        if log:
+            print(f"Cut-rank {partition.cut_rank} on level with {len(row_flag)} nodes")
+
+    if len(levels) == 1:
+        result.initial_cut_rank = cut_ranks[0]
+    result.level_cut_ranks = cut_ranks[::-1]
+    result.cut_rank = partition.cut_rank
+    result.seconds = time.time() - start
+    return (partition, result)
@@ -0,0 +1,318 @@
+import numpy as np
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Pipe, Process
+from graph_partition import GraphPartition
+from matrix_tools import as_bit_matrix
+from partition_builder import random_partition
+from cut_rank_annealing import cut_rank_annealing_row_formula
+
+
+class ChainResult:
+
+    """
+    Statistics from one annealing chain of 'multi_start_annealing'.
+    """
+
+    chain : int
+    """The number of the chain, from 0 to the number of chains exclusive."""
+
+    seed : int
+    """The seed of the random function used by the chain, derived from the master seed."""
+
+    initial_cut_rank : int
+    """The cut-rank of the random start partition of the chain."""
+
+    cut_rank : int
+    """The lowest cut-rank reached by the chain, or its final cut-rank if 'multi_start_annealing' was asked for the final states."""
+
+    row_flag : list[bool]
+    """The partition with the cut-rank of the chain, see 'row_flag' in GraphPartition."""
+
+    best_seconds : float
+    """The time from the start of the annealing in the chain until the lowest cut-rank was reached."""
+
+    seconds : float
+    """The time spent on building the start partition and running the annealing in the chain."""
+
+    def __init__(self, chain : int, seed : int, initial_cut_rank : int, cut_rank : int, row_flag : list[bool], best_seconds : float, seconds : float):
+        self.chain = chain
+        self.seed = seed
+        self.initial_cut_rank = initial_cut_rank
+        self.cut_rank = cut_rank
+        self.row_flag = row_flag
+        self.best_seconds = best_seconds
+        self.seconds = seconds
+
+
+# The adjacency matrix of the graph in a worker process, set once per process by 'init_worker' instead of being sent with every task
+_worker_adjacencies : list[int] = []
+
+
+def init_worker(adjacencies : list[int]) -> None:
+    """Sets the adjacency matrix of the graph in this process, to be read by the tasks through 'worker_adjacencies'.
+    Used as the initializer of a worker pool, or called directly before running the tasks in this process.
+
+    args:
+        - adjacencies: 'list[int]' The adjacency matrix of the graph, as returned by 'as_bit_matrix'.
+    """
+
+    global _worker_adjacencies
+    _worker_adjacencies = adjacencies
+
+
+def worker_adjacencies() -> list[int]:
+    """Returns the adjacency matrix of the graph set in this process by 'init_worker'."""
+
+    return _worker_adjacencies
+
+
+def _run_chain(chain : int, seed : int, portion : float, temperatures, time_limit : float | None, final_state : bool) -> ChainResult:
+
+    start = time.time()
+    random.seed(seed)
+    partition = random_partition(worker_adjacencies(), portion)
+    initial_cut_rank = partition.cut_rank
+    result = cut_rank_annealing_row_formula(partition, temperatures, False, time_limit)
+    if final_state:
+        return ChainResult(chain, seed, initial_cut_rank, partition.cut_rank, partition.row_flag[:], result.best_seconds, time.time() - start)
+    return ChainResult(chain, seed, initial_cut_rank, result.best_cut_rank, result.best_row_flag, result.best_seconds, time.time() - start)
+
+
+def chain_seeds(master_seed : int | None, nmb_chains : int) -> list[int]:
+    """Returns a seed for each chain, derived from the master seed such that the chains get independent random streams.
+    The same master seed always gives the same seeds.
+
+    args:
+        - master_seed: 'int' The master seed. If None, fresh entropy from the operating system is used.
+        - nmb_chains: 'int' The number of chains.
+    """
+
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(master_seed).spawn(nmb_chains)]
+
+
+def multi_start_annealing(adjacencies : list[list[int]] | list[int] | tuple[list[int], list[int]], portion : float, temperatures, nmb_chains : int,
+                          master_seed : int | None = None, nmb_processes : int | None = None, time_limit : float | None = None,
+                          final_state : bool = False) -> tuple[GraphPartition, list[ChainResult]]:
+    """Runs 'cut_rank_annealing_row_formula' in independent chains from random start partitions, in a pool of worker processes, and returns the best result.
+    Each chain seeds the random function by its own seed from 'chain_seeds', so the results only depend on the master seed, not on the number of processes,
+    unless a time limit is given.
+
+    args:
+        - adjacencies: The adjacency matrix of the graph, in any format accepted by GraphPartition.
+        - portion: 'float' The size of the first partition set as a portion of the number of all nodes.
+        - temperatures: The temperatures of the annealing sweeps.
+        - nmb_chains: 'int' The number of chains.
+        - master_seed: 'int' The seed from which the seeds of the chains are derived. If None, the results are not reproducible.
+        - nmb_processes: 'int' The number of worker processes. If None, the number of processors is used. If 1, the chains are run in this process,
+          and the state of the random function is restored afterwards.
+        - time_limit: 'float' The time limit in seconds for the annealing in each chain, see 'cut_rank_annealing_row_formula'. No limit if None.
+        - final_state: 'bool' Whether each chain should report the partition it ends in instead of the best one it reached, as the annealing did
+          before it tracked the best partition.
+
+    returns:
+        - The partition with the lowest cut-rank reported by any chain, the first chain of them at ties.
+        - The statistics of each chain, ordered by chain number.
+    """
+
+    if nmb_chains <= 0:
+        raise Exception("Number of chains must be positive")
+    adjacencies = as_bit_matrix(adjacencies)
+    seeds = chain_seeds(master_seed, nmb_chains)
+
+    if nmb_processes == 1:
+        # The chains seed the random function, so the state of the caller is restored afterwards
+        init_worker(adjacencies)
+        random_state = random.getstate()
+        try:
+            results = [_run_chain(chain, seed, portion, temperatures, time_limit, final_state) for chain, seed in enumerate(seeds)]
+        finally:
+            random.setstate(random_state)
+    else:
+        with ProcessPoolExecutor(max_workers=nmb_processes, initializer=init_worker, initargs=(adjacencies,)) as executor:
+            futures = [executor.submit(_run_chain, chain, seed, portion, temperatures, time_limit, final_state) for chain, seed in enumerate(seeds)]
+            results = [future.result() for future in futures]
+
+    best = min(results, key=lambda result: (result.cut_rank, result.chain))
+    return (GraphPartition(adjacencies, best.row_flag), results)
+
+
+class TemperingResult:
+
+    """
+    Statistics from 'parallel_tempering'.
+    """
+
+    cut_rank : int
+    """The lowest cut-rank reached by any replica."""
+
+    row_flag : list[bool]
+    """The partition with the lowest cut-rank, see 'row_flag' in GraphPartition."""
+
+    rounds : int
+    """The number of rounds run, where each round is one sweep of every replica followed by temperature exchanges."""
+
+    best_round : int
+    """The round in which the lowest cut-rank was first reached, 0 if it was the cut-rank of a start partition."""
+
+    seconds_to_best : float
+    """The time from the start until the lowest cut-rank was first reached."""
+
+    seconds : float
+    """The total time, including starting and stopping the worker processes."""
+
+    exchange_attempts : list[int]
+    """The number of attempted exchanges between temperature n and n + 1, for each n."""
+
+    exchange_accepts : list[int]
+    """The number of accepted exchanges between temperature n and n + 1, for each n."""
+
+    def __init__(self, nmb_temperatures : int):
+        self.cut_rank = -1
+        self.row_flag = []
+        self.rounds = 0
+        self.best_round = 0
+        self.seconds_to_best = 0.0
+        self.seconds = 0.0
+        self.exchange_attempts = [0] * (nmb_temperatures - 1)
+        self.exchange_accepts = [0] * (nmb_temperatures - 1)
+
+
+class _Replica:
+
+    # A graph partition annealed by single sweeps at given temperatures, with its own state of the random function
+    def __init__(self, adjacencies : list[int], portion : float, seed : int):
+        random.seed(seed)
+        self.partition = random_partition(adjacencies, portion)
+        self.random_state = random.getstate()
+
+    def sweep(self, temperature : float) -> int:
+        random.setstate(self.random_state)
+        cut_rank_annealing_row_formula(self.partition, [temperature], False)
+        self.random_state = random.getstate()
+        return self.partition.cut_rank
+
+
+def _replica_process(connection, adjacencies : list[int], portion : float, seed : int) -> None:
+
+    # Serves requests from 'parallel_tempering': a temperature for a sweep, answered by the new cut-rank, None for the partition, or "stop"
+    replica = _Replica(adjacencies, portion, seed)
+    connection.send(replica.partition.cut_rank)
+    while True:
+        request = connection.recv()
+        if request is None:
+            connection.send(replica.partition.row_flag)
+        elif request == "stop":
+            break
+        else:
+            connection.send(replica.sweep(request))
+    connection.close()
+
+
+def parallel_tempering(adjacencies : list[list[int]] | list[int] | tuple[list[int], list[int]], portion : float, temperatures, nmb_rounds : int,
+                       master_seed : int | None = None, target_cut_rank : int = -1, in_process : bool = False) -> tuple[GraphPartition, TemperingResult]:
+    """Runs replica exchange annealing, with one replica per temperature, each in its own worker process.
+    In each round every replica runs one sweep of 'cut_rank_annealing_row_formula' at its current temperature. Then the replicas at neighbouring temperatures
+    exchange temperatures, from the lowest temperature and up, with the Metropolis probability min(1, exp((1 / T_n - 1 / T_(n+1)) * (rank_n - rank_(n+1)))).
+    The replica seeds and the exchange decisions are derived from the master seed, see 'chain_seeds'.
+
+    args:
+        - adjacencies: The adjacency matrix of the graph, in any format accepted by GraphPartition.
+        - portion: 'float' The size of the first partition set as a portion of the number of all nodes, for the random start partitions.
+        - temperatures: The temperatures, at least two. They are used in increasing order.
+        - nmb_rounds: 'int' The maximum number of rounds.
+        - master_seed: 'int' The seed from which all randomness is derived. If None, the results are not reproducible.
+        - target_cut_rank: 'int' Stop as soon as a replica reaches this cut-rank or lower. Not used if negative.
+        - in_process: 'bool' Whether all replicas should run in this process, one after the other, instead of in worker processes. Gives the same results,
+          and the state of the random function is restored afterwards.
+
+    returns:
+        - The partition with the lowest cut-rank reached by any replica.
+        - The statistics of the run.
+    """
+
+    start = time.time()
+    temperatures = sorted(float(temp) for temp in temperatures)
+    nmb_replicas = len(temperatures)
+    if nmb_replicas < 2:
+        raise Exception("Parallel tempering needs at least two temperatures")
+    adjacencies = as_bit_matrix(adjacencies)
+    seeds = chain_seeds(master_seed, nmb_replicas + 1)
+    exchange_random = random.Random(seeds[-1])
+    result = TemperingResult(nmb_replicas)
+
+    # Start the replicas, replica_at[n] is the replica currently at temperature n. Replicas in this process seed the random function,
+    # so the state of the caller is restored at the end
+    random_state = random.getstate()
+    replicas = []
+    connections = []
+    processes = []
+    replica_at = list(range(nmb_replicas))
+
+    def row_flag_of(replica : int) -> list[bool]:
+        if in_process:
+            return replicas[replica].partition.row_flag[:]
+        connections[replica].send(None)
+        return connections[replica].recv()
+
+    try:
+        if in_process:
+            replicas = [_Replica(adjacencies, portion, seed) for seed in seeds[: nmb_replicas]]
+            cut_ranks = [replica.partition.cut_rank for replica in replicas]
+        else:
+            for seed in seeds[: nmb_replicas]:
+                (connection, worker_connection) = Pipe()
+                process = Process(target=_replica_process, args=(worker_connection, adjacencies, portion, seed), daemon=True)
+                process.start()
+                connections.append(connection)
+                processes.append(process)
+            cut_ranks = [connection.recv() for connection in connections]
+        best_replica = min(range(nmb_replicas), key=lambda replica: cut_ranks[replica])
+        result.cut_rank = cut_ranks[best_replica]
+        result.row_flag = row_flag_of(best_replica)
+        result.seconds_to_best = time.time() - start
+
+        while result.rounds < nmb_rounds and result.cut_rank > target_cut_rank:
+
+            # One sweep of every replica, in parallel unless run in process
+            if in_process:
+                for n in range(nmb_replicas):
+                    cut_ranks[replica_at[n]] = replicas[replica_at[n]].sweep(temperatures[n])
+            else:
+                for n in range(nmb_replicas):
+                    connections[replica_at[n]].send(temperatures[n])
+                for n in range(nmb_replicas):
+                    cut_ranks[replica_at[n]] = connections[replica_at[n]].recv()
+            result.rounds += 1
+
+            best_replica = min(range(nmb_replicas), key=lambda replica: cut_ranks[replica])
+            if cut_ranks[best_replica] < result.cut_rank:
+                result.cut_rank = cut_ranks[best_replica]
+                result.row_flag = row_flag_of(best_replica)
+                result.best_round = result.rounds
+                result.seconds_to_best = time.time() - start
+
+            # Metropolis exchanges of neighbouring temperatures
+            for n in range(nmb_replicas - 1):
+                (lower, upper) = (replica_at[n], replica_at[n + 1])
+                exponent = (1.0 / temperatures[n] - 1.0 / temperatures[n + 1]) * (cut_ranks[lower] - cut_ranks[upper])
+                result.exchange_attempts[n] += 1
+                if exponent >= 0 or exchange_random.random() < np.exp(exponent):
+                    (replica_at[n], replica_at[n + 1]) = (upper, lower)
+                    result.exchange_accepts[n] += 1
+
+    finally:
+        # A worker that already died can not be stopped, and must not hide the exception that ended the run
+        for connection in connections:
+            try:
+                connection.send("stop")
+            except (BrokenPipeError, EOFError, OSError):
+                pass
+        for process in processes:
+            process.join()
+        if in_process:
+            random.setstate(random_state)
+
+    result.seconds = time.time() - start
+    return (GraphPartition(adjacencies, result.row_flag), result)
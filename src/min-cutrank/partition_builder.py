@@ -1,5 +1,6 @@
+import numpy as np
 import random
-from matrix_tools import create_zero_matrix
+from matrix_tools import create_zero_matrix, as_bit_matrix, bit_positions, lowest_bit_position, bit_submatrix
 from graph_partition import GraphPartition
 
 
@@ -12,15 +13,7 @@ def set_edge(adjacency_matrix : list[list[int]], n_from : int, n_to : int) -> No
 
 def grid_graph(rows : int, columns : int) -> list[list[int]]:
 
-    adj_matrix = create_zero_matrix(rows * columns, rows * columns)
-    for r in range(rows):
-        for c in range(columns):
-            pos = c + r * columns
-            if r > 0:
-                set_edge(adj_matrix, pos, pos - columns)
-            if c > 0:
-                set_edge(adj_matrix, pos, pos - 1)
-    return adj_matrix
+    return dense_from_edges(rows * columns, grid_edges(rows, columns))
 
 
 def random_graph(nodes : int, edge_probability : float) -> list[list[int]]:
@@ -33,8 +26,122 @@ def random_graph(nodes : int, edge_probability : float) -> list[list[int]]:
     return adj_mat
 
 
-def random_partition(adjacency_matrix : list[list[int]], portion : float) -> GraphPartition:
+def _numpy_generator() -> np.random.Generator:
 
+    # A NumPy generator seeded from the random function, so the graphs follow 'random.seed' like the rest of the programs
+    return np.random.default_rng(random.getrandbits(64))
+
+
+def grid_edges(rows : int, columns : int) -> np.ndarray:
+    """Returns the edges of a grid graph as an m x 2 int64 array, with one row (i, j), i < j, per edge. Node c + r * columns is in row r and column c,
+    as in 'grid_graph'.
+
+    args:
+        - rows: 'int' The number of rows of the grid.
+        - columns: 'int' The number of columns of the grid.
+    """
+
+    nodes = np.arange(rows * columns, dtype=np.int64).reshape(rows, columns)
+    horizontal = np.stack((nodes[:, : -1].ravel(), nodes[:, 1 :].ravel()), axis=1)
+    vertical = np.stack((nodes[: -1, :].ravel(), nodes[1 :, :].ravel()), axis=1)
+    return np.concatenate((horizontal, vertical))
+
+
+def random_edges(nodes : int, edge_probability : float) -> np.ndarray:
+    """Returns the edges of an Erdös-Rényi graph G(n, p) as an m x 2 int64 array, with one row (i, j), i < j, per edge, in O(n + m) expected time.
+    The node pairs are numbered, and the gaps between the numbers of consecutive edges are drawn from the geometric distribution, in batches by NumPy,
+    which gives each pair an independent edge probability p without visiting the pairs without edges. The numbers are seeded from the random function,
+    but differ from the edges of 'random_graph' with the same seed.
+
+    args:
+        - nodes: 'int' The number of nodes.
+        - edge_probability: 'float' The probability of each edge.
+    """
+
+    nmb_pairs = nodes * (nodes - 1) // 2
+    if edge_probability <= 0 or nmb_pairs == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+    if edge_probability >= 1:
+        pair_numbers = np.arange(nmb_pairs, dtype=np.int64)
+    else:
+        generator = _numpy_generator()
+        batch_size = int(nmb_pairs * edge_probability + 4 * np.sqrt(nmb_pairs * edge_probability)) + 16
+        batches = []
+        last = -1
+        while last < nmb_pairs:
+            batch = last + np.cumsum(generator.geometric(edge_probability, batch_size), dtype=np.int64)
+            batches.append(batch)
+            last = int(batch[-1])
+        pair_numbers = np.concatenate(batches)
+        pair_numbers = pair_numbers[: np.searchsorted(pair_numbers, nmb_pairs)]
+
+    return edges_from_pair_numbers(pair_numbers)
+
+
+def edges_from_pair_numbers(pair_numbers : np.ndarray) -> np.ndarray:
+    """Returns the node pairs of pair numbers as an m x 2 int64 array, where the pairs (i, j), i < j, are numbered column by column in the upper
+    triangle, i.e. pair (i, j) has number j * (j - 1) / 2 + i. This is the order of 'random_edges' and of the graph6 format.
+
+    args:
+        - pair_numbers: 'np.ndarray' The pair numbers.
+    """
+
+    # The float estimate of j is corrected by at most one
+    pair_numbers = np.asarray(pair_numbers, dtype=np.int64)
+    high = ((1 + np.sqrt(1 + 8 * pair_numbers.astype(np.float64))) // 2).astype(np.int64)
+    high -= high * (high - 1) // 2 > pair_numbers
+    high += (high + 1) * high // 2 <= pair_numbers
+    return np.stack((pair_numbers - high * (high - 1) // 2, high), axis=1)
+
+
+def csr_from_edges(nodes : int, edges : np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the symmetric adjacency matrix of a graph in compressed sparse row format, as the tuple (indptr, indices) accepted by GraphPartition,
+    with the neighbours of each node in increasing order.
+
+    args:
+        - nodes: 'int' The number of nodes.
+        - edges: 'np.ndarray' The edges as an m x 2 array of node pairs, see 'random_edges'.
+    """
+
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    sources = np.concatenate((edges[:, 0], edges[:, 1]))
+    targets = np.concatenate((edges[:, 1], edges[:, 0]))
+    order = np.lexsort((targets, sources))
+    indptr = np.zeros(nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=nodes), out=indptr[1 :])
+    return (indptr, targets[order])
+
+
+def dense_from_edges(nodes : int, edges : np.ndarray) -> list[list[int]]:
+    """Returns the symmetric adjacency matrix of a graph as a list of lists of int.
+
+    args:
+        - nodes: 'int' The number of nodes.
+        - edges: 'np.ndarray' The edges as an m x 2 array of node pairs, see 'random_edges'.
+    """
+
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    matrix = np.zeros((nodes, nodes), dtype=np.int64)
+    matrix[edges[:, 0], edges[:, 1]] = 1
+    matrix[edges[:, 1], edges[:, 0]] = 1
+    np.fill_diagonal(matrix, 0)
+    return matrix.tolist()
+
+
+def sparse_random_graph(nodes : int, edge_probability : float) -> tuple[np.ndarray, np.ndarray]:
+    """Returns an Erdös-Rényi graph G(n, p) from 'random_edges' in compressed sparse row format, see 'csr_from_edges'.
+
+    args:
+        - nodes: 'int' The number of nodes.
+        - edge_probability: 'float' The probability of each edge.
+    """
+
+    return csr_from_edges(nodes, random_edges(nodes, edge_probability))
+
+
+def random_partition(adjacency_matrix : list[list[int]] | list[int] | tuple[list[int], list[int]], portion : float) -> GraphPartition:
+
+    adjacency_matrix = as_bit_matrix(adjacency_matrix)
     nmb_nodes = len(adjacency_matrix)
     nmb_part1 = round(nmb_nodes * portion)
     partition_flags = [True] * nmb_part1 + [False] * (nmb_nodes - nmb_part1)
@@ -45,3 +152,131 @@ def random_partition(adjacency_matrix : list[list[int]], portion : float) -> Gra
 def random_partition_on_random_graph(nodes : int, edge_probability : float, portion : float) -> GraphPartition:
 
     return random_partition(random_graph(nodes, edge_probability), portion)
+
+
+def _partition_from_order(adjacency_matrix : list[int], order : list[int], portion : float) -> GraphPartition:
+
+    # The first nodes of the order form the first partition set, with the same size as in 'random_partition'
+    nmb_nodes = len(adjacency_matrix)
+    partition_flags = [False] * nmb_nodes
+    for node in order[: round(nmb_nodes * portion)]:
+        partition_flags[node] = True
+    return GraphPartition(adjacency_matrix, partition_flags)
+
+
+def _bfs_levels(adjacency_matrix : list[int], start_mask : int, allowed_mask : int) -> list[int]:
+
+    # The level structure from the start nodes, as bit masks of the nodes at each distance, within the allowed nodes
+    levels = []
+    visited = start_mask
+    level = start_mask
+    while level:
+        levels.append(level)
+        reached = 0
+        for node in bit_positions(level):
+            reached |= adjacency_matrix[node]
+        level = reached & allowed_mask & ~visited
+        visited |= level
+    return levels
+
+
+def pseudo_peripheral_node(adjacency_matrix : list[list[int]] | list[int] | tuple[list[int], list[int]], start : int = 0) -> int:
+    """Returns a node of approximately maximal eccentricity in the connected component of the start node, by the algorithm of Gibbs, Poole and Stockmeyer:
+    repeated breadth-first searches from a node of lowest degree in the last level, as long as the number of levels increases.
+
+    args:
+        - adjacency_matrix: The adjacency matrix of the graph, in any format accepted by GraphPartition.
+        - start: 'int' The node to start the search from.
+    """
+
+    adjacency_matrix = as_bit_matrix(adjacency_matrix)
+    all_nodes = (1 << len(adjacency_matrix)) - 1
+    node = start
+    levels = _bfs_levels(adjacency_matrix, 1 << node, all_nodes)
+    while True:
+        candidate = min(bit_positions(levels[-1]), key=lambda last: adjacency_matrix[last].bit_count())
+        candidate_levels = _bfs_levels(adjacency_matrix, 1 << candidate, all_nodes)
+        if len(candidate_levels) <= len(levels):
+            return node
+        (node, levels) = (candidate, candidate_levels)
+
+
+def bfs_order(adjacency_matrix : list[list[int]] | list[int] | tuple[list[int], list[int]]) -> list[int]:
+    """Returns the nodes level by level in the breadth-first level structures from pseudo-peripheral nodes, one connected component after the other,
+    starting with the component of node 0.
+
+    args:
+        - adjacency_matrix: The adjacency matrix of the graph, in any format accepted by GraphPartition.
+    """
+
+    adjacency_matrix = as_bit_matrix(adjacency_matrix)
+    remaining = (1 << len(adjacency_matrix)) - 1
+    order = []
+    while remaining:
+        start = pseudo_peripheral_node(adjacency_matrix, lowest_bit_position(remaining))
+        for level in _bfs_levels(adjacency_matrix, 1 << start, remaining):
+            order += bit_positions(level)
+            remaining &= ~level
+    return order
+
+
+def bfs_partition(adjacency_matrix : list[list[int]] | list[int] | tuple[list[int], list[int]], portion : float) -> GraphPartition:
+    """Returns a partition where the first set is the first nodes of 'bfs_order', i.e. a split of the level structure from a pseudo-peripheral node.
+    The set sizes are the same as in 'random_partition'.
+
+    args:
+        - adjacency_matrix: The adjacency matrix of the graph, in any format accepted by GraphPartition.
+        - portion: 'float' The size of the first partition set as a portion of the number of all nodes.
+    """
+
+    adjacency_matrix = as_bit_matrix(adjacency_matrix)
+    return _partition_from_order(adjacency_matrix, bfs_order(adjacency_matrix), portion)
+
+
+def spectral_partition(adjacency_matrix : list[list[int]] | list[int] | tuple[list[int], list[int]], portion : float) -> GraphPartition:
+    """Returns a partition where the first set is the nodes with the lowest values in the Fiedler vector, the eigenvector of the second smallest
+    eigenvalue of the graph Laplacian. The eigenvectors are found by a dense eigensolver, so the time complexity is O(n^3).
+    The set sizes are the same as in 'random_partition'.
+
+    args:
+        - adjacency_matrix: The adjacency matrix of the graph, in any format accepted by GraphPartition.
+        - portion: 'float' The size of the first partition set as a portion of the number of all nodes.
+    """
+
+    adjacency_matrix = as_bit_matrix(adjacency_matrix)
+    nmb_nodes = len(adjacency_matrix)
+    laplacian = -bit_submatrix(adjacency_matrix, list(range(nmb_nodes)), list(range(nmb_nodes))).astype(np.float64)
+    laplacian[np.diag_indices(nmb_nodes)] = -laplacian.sum(axis=1)
+    (_, eigenvectors) = np.linalg.eigh(laplacian)
+    fiedler = eigenvectors[:, 1] if nmb_nodes > 1 else np.zeros(nmb_nodes)
+    return _partition_from_order(adjacency_matrix, np.argsort(fiedler, kind="stable").tolist(), portion)
+
+
+def greedy_partition(adjacency_matrix : list[list[int]] | list[int] | tuple[list[int], list[int]], portion : float) -> GraphPartition:
+    """Returns a partition where the first set is grown from a pseudo-peripheral node, in each step adding the neighbour of the set that gives the
+    fewest nodes outside the set with a neighbour in it. The number of these boundary nodes is an upper bound of the cut-rank. Ties are broken by
+    the most neighbours in the set. If the set has no neighbours left, growth continues from a new pseudo-peripheral node.
+    The set sizes are the same as in 'random_partition'.
+
+    args:
+        - adjacency_matrix: The adjacency matrix of the graph, in any format accepted by GraphPartition.
+        - portion: 'float' The size of the first partition set as a portion of the number of all nodes.
+    """
+
+    adjacency_matrix = as_bit_matrix(adjacency_matrix)
+    nmb_nodes = len(adjacency_matrix)
+    nmb_part1 = round(nmb_nodes * portion)
+    order = []
+    in_set = 0
+    boundary = 0
+    while len(order) < nmb_part1:
+        if boundary:
+            outside = ~in_set & ~boundary
+            node = min(bit_positions(boundary), key=lambda candidate: ((adjacency_matrix[candidate] & outside).bit_count(),
+                                                               -(adjacency_matrix[candidate] & in_set).bit_count()))
+        else:
+            node = pseudo_peripheral_node(adjacency_matrix, lowest_bit_position(~in_set))
+        order.append(node)
+        in_set |= 1 << node
+        boundary = (boundary | adjacency_matrix[node]) & ~in_set
+    return _partition_from_order(adjacency_matrix, order, portion)
@@ -3,8 +3,8 @@ import sys
 import getopt
 import random
 import time
-from test_tools import parse_int, parse_float, temperatures_from_description
-from partition_builder import random_partition, random_graph
+from test_tools import parse_bool, parse_int, parse_float, temperatures_from_description
+from partition_builder import random_partition, random_graph, sparse_random_graph
 from cut_rank_annealing import cut_rank_annealing_row_formula
 
 
@@ -28,6 +28,8 @@ if __name__=="__main__":
     -p P        The size of the first partition set as a portion of the number of all nodes. Default is 0.5.
     -t Temp     The temperature setup. See 'temperatures_from_description'. Default is '1e0.1s10', i.e. 10 temperatures on a linear range from 1.0 to 0.1
     -o Outfile  The path to the output file. If absent, not output is written to file.
+    -f Bool     Whether the graphs should be generated in O(N) expected time by 'sparse_random_graph', in compressed sparse row format, instead of by 'random_graph'.
+                The graphs differ from the ones of 'random_graph' with the same seed, so the default False reproduces earlier results. Default is False.
     """
 
     opt_arguments = sys.argv[1:]
@@ -40,9 +42,10 @@ if __name__=="__main__":
     temperatures = np.linspace(1.0, 0.1, 10)
     samples = -1
     file_path_out = None
+    fast_graphs = False
 
-    options = "s:r:c:n:p:t:o:"
-    long_options = ["seed=", "range=", "edge_probability_denominator=", "samples=", "partition_portion=", "temperatures=", "output_file="]
+    options = "s:r:c:n:p:t:o:f:"
+    long_options = ["seed=", "range=", "edge_probability_denominator=", "samples=", "partition_portion=", "temperatures=", "output_file=", "fast_graphs="]
 
     try:
         arguments, values = getopt.getopt(opt_arguments, options, long_options)
@@ -63,6 +66,8 @@ if __name__=="__main__":
                 temperatures = temperatures_from_description(value)
             elif argument in ("-o", "--output_file"):
                 file_path_out = value.replace("\\","/")
+            elif argument in ("-f", "--fast_graphs"):
+                fast_graphs = parse_bool(value, False)
 
         if len(range_limits) != 2:
             print("Graph size range is missing")
@@ -103,7 +108,7 @@ if __name__=="__main__":
                     start_time = time.time()
 
                     for _ in range(samples):
-                        adj_mat = random_graph(size, edge_prob)
+                        adj_mat = sparse_random_graph(size, edge_prob) if fast_graphs else random_graph(size, edge_prob)
                         partition = random_partition(adj_mat, set_portion)
                         cut_rank_annealing_row_formula(partition, temperatures, False)
                         cut_rank = partition.cut_rank
@@ -1,4 +1,6 @@
+import numpy as np
 from graph_partition import GraphPartition
+from matrix_tools import bit_submatrix
 
 
 def all_swap_cut_ranks(partition : GraphPartition, ranks : list[list[int]]) -> None:
@@ -16,34 +18,16 @@ def all_swap_cut_ranks(partition : GraphPartition, ranks : list[list[int]]) -> N
     s2 = [False] * partition.nmb_nodes
     q4_952_0 = [False] * partition.nmb_nodes
     q4_952_1 = [False] * partition.nmb_nodes
-    for i in partition.base_rows:
-        k1 = next((k1 for k1 in partition.free_rows if partition.adj_b_inverse[k1][i] == 1), -1)
-        s1_k1[i] = k1
-        if k1 >= 0 and partition.adj_b_inv_adj[k1][i] == 1:
-            s2[i] = any(k2 != k1 and partition.adj_b_inv_adj[k2][i] != partition.adj_b_inverse[k2][i] for k2 in partition.free_rows)
-        else:
-            s2[i] = any(partition.adj_b_inv_adj[k2][i] == 1 for k2 in partition.free_rows)
-        q4_952_0[i] = any(partition.adj_b_inv_adj[k][i] == 1 for k in partition.free_rows)
-        q4_952_1[i] = any(partition.adj_b_inv_adj[k][i] != partition.adj_b_inverse[k][i] for k in partition.free_rows)
-    for i in partition.free_rows:
-        s2[i] = any(k2 != i and partition.adj_b_inv_adj[k2][i] == 1 for k2 in partition.free_rows)
+    for i in partition.rows:
+        s1_k1[i], s2[i], q4_952_0[i], q4_952_1[i] = partition.row_swap_data(i)
 
     # Preprocessing on columns
     t1_l1 = [-1] * partition.nmb_nodes
     t2 = [False] * partition.nmb_nodes
     q5_952_0 = [False] * partition.nmb_nodes
     q5_952_1 = [False] * partition.nmb_nodes
-    for j in partition.base_columns:
-        l1 = next((l1 for l1 in partition.free_columns if partition.b_inverse_adj[j][l1] == 1), -1)
-        t1_l1[j] = l1
-        if l1 >= 0 and partition.adj_b_inv_adj[j][l1] == 1:
-            t2[j] = any(l2 != l1 and partition.adj_b_inv_adj[j][l2] != partition.b_inverse_adj[j][l2] for l2 in partition.free_columns)
-        else:
-            t2[j] = any(partition.adj_b_inv_adj[j][l2] == 1 for l2 in partition.free_columns)
-        q5_952_0[j] = any(partition.adj_b_inv_adj[j][l] == 1 for l in partition.free_columns)
-        q5_952_1[j] = any(partition.adj_b_inv_adj[j][l] != partition.b_inverse_adj[j][l] for l in partition.free_columns)
-    for j in partition.free_columns:
-        t2[j] = any(l2 != j and partition.adj_b_inv_adj[j][l2] == 1 for l2 in partition.free_columns)
+    for j in partition.columns:
+        t1_l1[j], t2[j], q5_952_0[j], q5_952_1[j] = partition.column_swap_data(j)
 
     # Ranks for i in X^D and j in Y^D
     for i in partition.free_rows:
@@ -57,13 +41,14 @@ def all_swap_cut_ranks(partition : GraphPartition, ranks : list[list[int]]) -> N
                 if t2[j]:
                     ranks[i][j] = old_rank + 1
                 else:
-                    if partition.adj_b_inv_adj[j][i] == 1:
+                    if (partition.adj_b_inv_adj[j] >> i & 1) == 1:
                         ranks[i][j] = old_rank + 1
                     else:
                         ranks[i][j] = old_rank
 
     # Ranks for i in X^B and j in Y^D
     for i in partition.base_rows:
+        i_index = partition.base_index[i]
         k1 = s1_k1[i]
         for j in partition.free_columns:
             if k1 >= 0:
@@ -76,12 +61,12 @@ def all_swap_cut_ranks(partition : GraphPartition, ranks : list[list[int]]) -> N
                     if t2[j]:
                         ranks[i][j] = old_rank + 1
                     else:
-                        if partition.adj_b_inv_adj[j][i] != (partition.adj_b_inverse[j][i] & partition.adj_b_inv_adj[k1][i]):
+                        if (partition.adj_b_inv_adj[j] >> i & 1) != ((partition.adj_b_inverse[j] >> i_index & 1) & (partition.adj_b_inv_adj[k1] >> i & 1)):
                             ranks[i][j] = old_rank + 1
                         else:
                             ranks[i][j] = old_rank
             else:
-                if partition.adj_b_inverse[j][i] == 1:
+                if (partition.adj_b_inverse[j] >> i_index & 1) == 1:
                     if s2[i]:
                         ranks[i][j] = old_rank + 1
                     else:
@@ -96,7 +81,7 @@ def all_swap_cut_ranks(partition : GraphPartition, ranks : list[list[int]]) -> N
                         if t2[j]:
                             ranks[i][j] = old_rank
                         else:
-                            if partition.adj_b_inv_adj[j][i] == 1:
+                            if (partition.adj_b_inv_adj[j] >> i & 1) == 1:
                                 ranks[i][j] = old_rank
                             else:
                                 ranks[i][j] = old_rank - 1
@@ -104,6 +89,7 @@ def all_swap_cut_ranks(partition : GraphPartition, ranks : list[list[int]]) -> N
     # Ranks for i in X^D and j in Y^B
     for i in partition.free_rows:
         for j in partition.base_columns:
+            j_index = partition.base_index[j]
             l1 = t1_l1[j]
             if l1 >= 0:
                 if t2[j]:
@@ -115,12 +101,12 @@ def all_swap_cut_ranks(partition : GraphPartition, ranks : list[list[int]]) -> N
                     if s2[i]:
                         ranks[i][j] = old_rank + 1
                     else:
-                        if partition.adj_b_inv_adj[j][i] != (partition.b_inverse_adj[j][i] & partition.adj_b_inv_adj[j][l1]):
+                        if (partition.adj_b_inv_adj[j] >> i & 1) != ((partition.b_inverse_adj[j_index] >> i & 1) & (partition.adj_b_inv_adj[j] >> l1 & 1)):
                             ranks[i][j] = old_rank + 1
                         else:
                             ranks[i][j] = old_rank
             else:
-                if partition.b_inverse_adj[j][i] == 1:
+                if (partition.b_inverse_adj[j_index] >> i & 1) == 1:
                     if t2[j]:
                         ranks[i][j] = old_rank + 1
                     else:
@@ -135,18 +121,20 @@ def all_swap_cut_ranks(partition : GraphPartition, ranks : list[list[int]]) -> N
                         if s2[i]:
                             ranks[i][j] = old_rank
                         else:
-                            if partition.adj_b_inv_adj[j][i] == 1:
+                            if (partition.adj_b_inv_adj[j] >> i & 1) == 1:
                                 ranks[i][j] = old_rank
                             else:
                                 ranks[i][j] = old_rank - 1
 
     # Ranks for i in X^B and j in Y^B
     for i in partition.base_rows:
+        i_index = partition.base_index[i]
         k1 = s1_k1[i]
         for j in partition.base_columns:
+            j_index = partition.base_index[j]
             l1 = t1_l1[j]
 
-            if partition.base_inverse[j][i] == 1:
+            if (partition.base_inverse[j_index] >> i_index & 1) == 1:
                 # Case 6
 
                 if k1 >= 0 and l1 >= 0:
@@ -160,15 +148,15 @@ def all_swap_cut_ranks(partition : GraphPartition, ranks : list[list[int]]) -> N
                         if t2[j]:
                             ranks[i][j] = old_rank + 1
                         else:
-                            if ((partition.adj_b_inv_adj[k1][i] & partition.adj_b_inv_adj[j][l1]) ^ (partition.adj_b_inv_adj[k1][i] & partition.adj_b_inverse[j][i]) ^ (partition.adj_b_inv_adj[j][l1] & partition.b_inverse_adj[j][i])) != partition.adj_b_inv_adj[j][i]:
+                            if (((partition.adj_b_inv_adj[k1] >> i & 1) & (partition.adj_b_inv_adj[j] >> l1 & 1)) ^ ((partition.adj_b_inv_adj[k1] >> i & 1) & (partition.adj_b_inverse[j] >> i_index & 1)) ^ ((partition.adj_b_inv_adj[j] >> l1 & 1) & (partition.b_inverse_adj[j_index] >> i & 1))) != (partition.adj_b_inv_adj[j] >> i & 1):
                                 ranks[i][j] = old_rank + 1
                             else:
                                 ranks[i][j] = old_rank
 
                 else:
                     # Case 6.2
-                    q4 = q4_952_1[i] if partition.b_inverse_adj[j][i] == 1 else q4_952_0[i]
-                    q5 = q5_952_1[j] if partition.adj_b_inverse[j][i] == 1 else q5_952_0[j]
+                    q4 = q4_952_1[i] if (partition.b_inverse_adj[j_index] >> i & 1) == 1 else q4_952_0[i]
+                    q5 = q5_952_1[j] if (partition.adj_b_inverse[j] >> i_index & 1) == 1 else q5_952_0[j]
                     if q4:
                         if q5:
                             ranks[i][j] = old_rank + 1
@@ -178,7 +166,7 @@ def all_swap_cut_ranks(partition : GraphPartition, ranks : list[list[int]]) -> N
                         if q5:
                             ranks[i][j] = old_rank
                         else:
-                            if partition.adj_b_inv_adj[j][i] != (partition.adj_b_inverse[j][i] & partition.b_inverse_adj[j][i]):
+                            if (partition.adj_b_inv_adj[j] >> i & 1) != ((partition.adj_b_inverse[j] >> i_index & 1) & (partition.b_inverse_adj[j_index] >> i & 1)):
                                 ranks[i][j] = old_rank
                             else:
                                 ranks[i][j] = old_rank - 1
@@ -199,7 +187,7 @@ def all_swap_cut_ranks(partition : GraphPartition, ranks : list[list[int]]) -> N
                                 if t2[j]:
                                     ranks[i][j] = old_rank + 1
                                 else:
-                                    if ((partition.adj_b_inv_adj[k1][i] & partition.adj_b_inverse[j][i]) ^ (partition.adj_b_inv_adj[j][l1] & partition.b_inverse_adj[j][i])) != partition.adj_b_inv_adj[j][i]:
+                                    if (((partition.adj_b_inv_adj[k1] >> i & 1) & (partition.adj_b_inverse[j] >> i_index & 1)) ^ ((partition.adj_b_inv_adj[j] >> l1 & 1) & (partition.b_inverse_adj[j_index] >> i & 1))) != (partition.adj_b_inv_adj[j] >> i & 1):
                                         ranks[i][j] = old_rank + 1
                                     else:
                                         ranks[i][j] = old_rank
@@ -207,7 +195,7 @@ def all_swap_cut_ranks(partition : GraphPartition, ranks : list[list[int]]) -> N
                         else:
                             # Case 7.2
                             if t2[j]:
-                                if partition.b_inverse_adj[j][i] == 1:
+                                if (partition.b_inverse_adj[j_index] >> i & 1) == 1:
                                     ranks[i][j] = old_rank + 1
                                 else:
                                     if s2[i]:
@@ -215,13 +203,13 @@ def all_swap_cut_ranks(partition : GraphPartition, ranks : list[list[int]]) -> N
                                     else:
                                         ranks[i][j] = old_rank
                             else:
-                                if partition.b_inverse_adj[j][i] == 1:
+                                if (partition.b_inverse_adj[j_index] >> i & 1) == 1:
                                     ranks[i][j] = old_rank
                                 else:
                                     if s2[i]:
                                         ranks[i][j] = old_rank
                                     else:
-                                        if (partition.adj_b_inv_adj[k1][i] & partition.adj_b_inverse[j][i]) != partition.adj_b_inv_adj[j][i]:
+                                        if ((partition.adj_b_inv_adj[k1] >> i & 1) & (partition.adj_b_inverse[j] >> i_index & 1)) != (partition.adj_b_inv_adj[j] >> i & 1):
                                             ranks[i][j] = old_rank
                                         else:
                                             ranks[i][j] = old_rank - 1
@@ -231,7 +219,7 @@ def all_swap_cut_ranks(partition : GraphPartition, ranks : list[list[int]]) -> N
                         if l1 >= 0:
                             # Case 7.3
                             if s2[i]:
-                                if partition.adj_b_inverse[j][i] == 1:
+                                if (partition.adj_b_inverse[j] >> i_index & 1) == 1:
                                     ranks[i][j] = old_rank + 1
                                 else:
                                     if t2[j]:
@@ -239,21 +227,21 @@ def all_swap_cut_ranks(partition : GraphPartition, ranks : list[list[int]]) -> N
                                     else:
                                         ranks[i][j] = old_rank
                             else:
-                                if partition.adj_b_inverse[j][i] == 1:
+                                if (partition.adj_b_inverse[j] >> i_index & 1) == 1:
                                     ranks[i][j] = old_rank
                                 else:
                                     if t2[j]:
                                         ranks[i][j] = old_rank
                                     else:
-                                        if (partition.adj_b_inv_adj[j][l1] & partition.b_inverse_adj[j][i]) != partition.adj_b_inv_adj[j][i]:
+                                        if ((partition.adj_b_inv_adj[j] >> l1 & 1) & (partition.b_inverse_adj[j_index] >> i & 1)) != (partition.adj_b_inv_adj[j] >> i & 1):
                                             ranks[i][j] = old_rank
                                         else:
                                             ranks[i][j] = old_rank - 1
 
                         else:
                             # Case 7.4
-                            if partition.adj_b_inverse[j][i] == 1:
-                                if partition.b_inverse_adj[j][i] == 1:
+                            if (partition.adj_b_inverse[j] >> i_index & 1) == 1:
+                                if (partition.b_inverse_adj[j_index] >> i & 1) == 1:
                                     ranks[i][j] = old_rank
                                 else:
                                     if s2[i]:
@@ -261,7 +249,7 @@ def all_swap_cut_ranks(partition : GraphPartition, ranks : list[list[int]]) -> N
                                     else:
                                         ranks[i][j] = old_rank - 1
                             else:
-                                if partition.b_inverse_adj[j][i] == 1:
+                                if (partition.b_inverse_adj[j_index] >> i & 1) == 1:
                                     if t2[j]:
                                         ranks[i][j] = old_rank
                                     else:
@@ -276,12 +264,191 @@ def all_swap_cut_ranks(partition : GraphPartition, ranks : list[list[int]]) -> N
                                         if t2[j]:
                                             ranks[i][j] = old_rank - 1
                                         else:
-                                            if partition.adj_b_inv_adj[j][i] == 1:
+                                            if (partition.adj_b_inv_adj[j] >> i & 1) == 1:
                                                 ranks[i][j] = old_rank - 1
                                             else:
                                                 ranks[i][j] = old_rank - 2
 
 
+def all_swap_rank_deltas(partition : GraphPartition, deltas : np.ndarray = None, rows : list[int] | None = None, columns : list[int] | None = None) -> np.ndarray:
+    """Finds the change in cut-rank for the partitions obtained by swapping any current row and any current column in the given graph partition.
+
+    Gives the same ranks as 'all_swap_cut_ranks', but the preprocessing and the cases are evaluated as NumPy array expressions over whole blocks of rows and columns.
+
+    args:
+        - partition: 'GraphPartition' The graph partition.
+        - deltas: 'np.ndarray' An optional nmb_nodes x nmb_nodes int8 array to store the result in, so the memory can be reused between calls. A new array is created if omitted.
+        - rows: 'list[int]' An optional subset of the current rows, to only evaluate the swaps of these rows. All rows if omitted.
+        - columns: 'list[int]' An optional subset of the current columns, to only evaluate the swaps of these columns. All columns if omitted.
+
+    returns: The int8 array where position [i][j] holds the cut-rank after swapping node i and j minus the current cut-rank. Only positions where i is an evaluated row and j is an evaluated column in the current partition will be affected.
+    """
+
+    if deltas is None:
+        deltas = np.zeros((partition.nmb_nodes, partition.nmb_nodes), dtype=np.int8)
+
+    if rows is None:
+        x_d = partition.free_rows
+        x_b = partition.base_rows
+    else:
+        x_d = [i for i in rows if not partition.base_flag[i]]
+        x_b = [i for i in rows if partition.base_flag[i]]
+    if columns is None:
+        y_d = partition.free_columns
+        y_b = partition.base_columns
+    else:
+        y_d = [j for j in columns if not partition.base_flag[j]]
+        y_b = [j for j in columns if partition.base_flag[j]]
+
+    x_b_index = [partition.base_index[i] for i in x_b]
+    y_b_index = [partition.base_index[j] for j in y_b]
+    nmb_x_d = len(x_d)
+    nmb_y_d = len(y_d)
+
+    row_features = _partition_row_features(partition, x_d, x_b)
+    column_features = _partition_column_features(partition, y_d, y_b)
+
+    # Matrix elements in position (j, i), as |Y| x |X| arrays
+    f_yx = bit_submatrix(partition.adj_b_inv_adj, y_d + y_b, x_d + x_b)
+    d_yb = bit_submatrix(partition.adj_b_inverse, y_d + y_b, x_b_index)
+    e_bx = bit_submatrix(partition.b_inverse_adj, y_b_index, x_d + x_b)
+    c_bb = bit_submatrix(partition.base_inverse, y_b_index, x_b_index)
+
+    deltas[np.ix_(x_d + x_b, y_d + y_b)] = swap_rank_delta_blocks(f_yx, d_yb, e_bx, c_bb, nmb_x_d, nmb_y_d, row_features, column_features)
+    return deltas
+
+
+def _partition_row_features(partition : GraphPartition, x_d : list[int], x_b : list[int]) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+
+    # Preprocessing on the given free and base rows, where k runs over all of X^D
+    f_kx = bit_submatrix(partition.adj_b_inv_adj, partition.free_rows, x_d + x_b)
+    f_kx[[partition.subset_position[i] for i in x_d], range(len(x_d))] = False  # Excludes k2 = i for i in X^D
+    d_kb = bit_submatrix(partition.adj_b_inverse, partition.free_rows, [partition.base_index[i] for i in x_b])
+    return swap_row_features(f_kx, d_kb, len(x_d))
+
+
+def _partition_column_features(partition : GraphPartition, y_d : list[int], y_b : list[int]) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+
+    # Preprocessing on the given free and base columns, where l runs over all of Y^D
+    f_yl = bit_submatrix(partition.adj_b_inv_adj, y_d + y_b, partition.free_columns)
+    f_yl[range(len(y_d)), [partition.subset_position[j] for j in y_d]] = False  # Excludes l2 = j for j in Y^D
+    e_bl = bit_submatrix(partition.b_inverse_adj, [partition.base_index[j] for j in y_b], partition.free_columns)
+    return swap_column_features(f_yl, e_bl, len(y_d))
+
+
+def swap_row_features(f_kx : np.ndarray, d_kb : np.ndarray, nmb_x_d : int) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Finds the row-side quantities of the swap cut-rank formulas for some rows, the free ones first, as used by 'swap_rank_delta_blocks'.
+    The quantities of a row only depend on its column of F and D over the free rows.
+
+    args:
+        - f_kx: 'np.ndarray' The elements of F in the free rows and the given rows, where the element of each free row with itself is False.
+        - d_kb: 'np.ndarray' The elements of D in the free rows and the local indices of the given base rows.
+        - nmb_x_d: 'int' The number of free rows among the given rows.
+
+    returns: The arrays s2 over all the given rows, and s1, f_k1, q4_0 and q4_1 over the base rows.
+    """
+
+    f_kb = f_kx[:, nmb_x_d :]
+    k1_mask = d_kb & (np.cumsum(d_kb, axis=0) == 1)
+    s1 = d_kb.any(axis=0)
+    f_k1 = (f_kb & k1_mask).any(axis=0)
+    q4_0 = f_kb.any(axis=0)
+    q4_1 = (f_kb ^ d_kb).any(axis=0)
+    s2 = f_kx.any(axis=0)
+    s2[nmb_x_d :] = np.where(s1 & f_k1, q4_1, q4_0)
+    return (s2, s1, f_k1, q4_0, q4_1)
+
+
+def swap_column_features(f_yl : np.ndarray, e_bl : np.ndarray, nmb_y_d : int) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Finds the column-side quantities of the swap cut-rank formulas for some columns, the free ones first, as used by 'swap_rank_delta_blocks'.
+    The quantities of a column only depend on its row of F and E over the free columns.
+
+    args:
+        - f_yl: 'np.ndarray' The elements of F in the given columns and the free columns, where the element of each free column with itself is False.
+        - e_bl: 'np.ndarray' The elements of E in the local indices of the given base columns and the free columns.
+        - nmb_y_d: 'int' The number of free columns among the given columns.
+
+    returns: The arrays t2 over all the given columns, and t1, f_l1, q5_0 and q5_1 over the base columns, all as |Y| x 1 arrays.
+    """
+
+    f_bl = f_yl[nmb_y_d :, :]
+    l1_mask = e_bl & (np.cumsum(e_bl, axis=1) == 1)
+    t1 = e_bl.any(axis=1)[:, None]
+    f_l1 = (f_bl & l1_mask).any(axis=1)[:, None]
+    q5_0 = f_bl.any(axis=1)[:, None]
+    q5_1 = (f_bl ^ e_bl).any(axis=1)[:, None]
+    t2 = f_yl.any(axis=1)[:, None]
+    t2[nmb_y_d :] = np.where(t1 & f_l1, q5_1, q5_0)
+    return (t2, t1, f_l1, q5_0, q5_1)
+
+
+def swap_rank_delta_blocks(f_yx : np.ndarray, d_yb : np.ndarray, e_bx : np.ndarray, c_bb : np.ndarray, nmb_x_d : int, nmb_y_d : int,
+                           row_features : tuple, column_features : tuple) -> np.ndarray:
+    """Evaluates the cut-rank changes of swapping some rows and columns, the free ones first in both, from the elements of F, D, E and C^(-1) in position
+    (column, row) and the quantities from 'swap_row_features' and 'swap_column_features'. The quantities may be kept from an earlier state of the partition,
+    as long as their inputs have not changed.
+
+    returns: The int8 array where position [i][j] holds the cut-rank change of swapping the i-th row and the j-th column.
+    """
+
+    (s2, s1, f_k1, q4_0, q4_1) = row_features
+    (t2, t1, f_l1, q5_0, q5_1) = column_features
+    s2_d, s2_b = s2[: nmb_x_d], s2[nmb_x_d :]
+    t2_d, t2_b = t2[: nmb_y_d], t2[nmb_y_d :]
+    one = np.int8(1)
+
+    def ladder(s : np.ndarray, t : np.ndarray, zero_case : np.ndarray) -> np.ndarray:
+        # 2 if s and t, 1 if only one of them, otherwise 1 or 0 from zero_case
+        return s.astype(np.int8) + t.astype(np.int8) + (~(s | t) & zero_case)
+
+    # Ranks for i in X^D and j in Y^D
+    f = f_yx[: nmb_y_d, : nmb_x_d]
+    block_dd = ladder(s2_d, t2_d, f)
+
+    # Ranks for i in X^B and j in Y^D
+    f = f_yx[: nmb_y_d, nmb_x_d :]
+    d = d_yb[: nmb_y_d, :]
+    block_bd = np.where(s1,
+        ladder(s2_b, t2_d, f != (d & f_k1)),
+        np.where(d, s2_b, ladder(s2_b, t2_d, f) - one)).astype(np.int8)
+
+    # Ranks for i in X^D and j in Y^B
+    f = f_yx[nmb_y_d :, : nmb_x_d]
+    e = e_bx[:, : nmb_x_d]
+    block_db = np.where(t1,
+        ladder(s2_d, t2_b, f != (e & f_l1)),
+        np.where(e, t2_b, ladder(s2_d, t2_b, f) - one)).astype(np.int8)
+
+    # Ranks for i in X^B and j in Y^B
+    f = f_yx[nmb_y_d :, nmb_x_d :]
+    d = d_yb[nmb_y_d :, :]
+    e = e_bx[:, nmb_x_d :]
+    k1_l1 = s1 & t1
+
+    # Case 6.1 and 6.2
+    q4 = np.where(e, q4_1, q4_0)
+    q5 = np.where(d, q5_1, q5_0)
+    case_6 = np.where(k1_l1,
+        ladder(s2_b, t2_b, ((f_k1 & f_l1) ^ (f_k1 & d) ^ (f_l1 & e)) != f),
+        ladder(q4, q5, f != (d & e)) - one)
+
+    # Case 7.1, 7.2, 7.3 and 7.4
+    case_7_1 = ladder(s2_b, t2_b, ((f_k1 & d) ^ (f_l1 & e)) != f)
+    case_7_2 = ladder(e | s2_b, t2_b, (f_k1 & d) != f) - one
+    case_7_3 = ladder(s2_b, d | t2_b, (f_l1 & e) != f) - one
+    case_7_4 = np.where(d,
+        np.where(e, 0, s2_b - one),
+        np.where(e, t2_b - one, ladder(s2_b, t2_b, f) - 2 * one))
+    case_7 = np.where(s1, np.where(t1, case_7_1, case_7_2), np.where(t1, case_7_3, case_7_4))
+    block_bb = np.where(c_bb, case_6, case_7).astype(np.int8)
+
+    blocks = np.empty((len(s2), len(t2)), dtype=np.int8)
+    blocks[: nmb_x_d, : nmb_y_d] = block_dd.T
+    blocks[nmb_x_d :, : nmb_y_d] = block_bd.T
+    blocks[: nmb_x_d, nmb_y_d :] = block_db.T
+    blocks[nmb_x_d :, nmb_y_d :] = block_bb.T
+    return blocks
+
 
 def row_swap_cut_ranks(partition : GraphPartition, row : int, ranks : list[int]) -> None:
     """Finds the cut-ranks for the partitions obtained by swapping a specific row and any current column in the given graph partition.
@@ -294,12 +461,15 @@ def row_swap_cut_ranks(partition : GraphPartition, row : int, ranks : list[int])
 
     old_rank = partition.cut_rank
 
+    # Local indices in the compact matrices, only used for base nodes
+    row_index = partition.base_index[row]
+
     if (not partition.base_flag[row]):
 
-        s2 = any(k2 != row and partition.adj_b_inv_adj[k2][row] == 1 for k2 in partition.free_rows)
+        _, s2, _, _ = partition.row_swap_data(row)
         for column in partition.free_columns:
             # row in X^D, column in Y^D
-            t2 = any(l2 != column and partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
+            _, t2, _, _ = partition.column_swap_data(column)
             if s2:
                 if t2:
                     ranks[column] = old_rank + 2
@@ -309,19 +479,16 @@ def row_swap_cut_ranks(partition : GraphPartition, row : int, ranks : list[int])
                 if t2:
                     ranks[column] = old_rank + 1
                 else:
-                    if partition.adj_b_inv_adj[column][row] == 1:
+                    if (partition.adj_b_inv_adj[column] >> row & 1) == 1:
                         ranks[column] = old_rank + 1
                     else:
                         ranks[column] = old_rank
 
         for column in partition.base_columns:
+            column_index = partition.base_index[column]
             # row in X^D, column in Y^B
-            l1 = next((l1 for l1 in partition.free_columns if partition.b_inverse_adj[column][l1] == 1), -1)
+            l1, t2, q5_0, q5_1 = partition.column_swap_data(column)
             if l1 >= 0:
-                if partition.adj_b_inv_adj[column][l1] == 1:
-                    t2 = any(l2 != l1 and partition.adj_b_inv_adj[column][l2] != partition.b_inverse_adj[column][l2] for l2 in partition.free_columns)
-                else:
-                    t2 = any(l2 != l1 and partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
                 if t2:
                     if s2:
                         ranks[column] = old_rank + 2
@@ -331,13 +498,12 @@ def row_swap_cut_ranks(partition : GraphPartition, row : int, ranks : list[int])
                     if s2:
                         ranks[column] = old_rank + 1
                     else:
-                        if partition.adj_b_inv_adj[column][row] != (partition.b_inverse_adj[column][row] & partition.adj_b_inv_adj[column][l1]):
+                        if (partition.adj_b_inv_adj[column] >> row & 1) != ((partition.b_inverse_adj[column_index] >> row & 1) & (partition.adj_b_inv_adj[column] >> l1 & 1)):
                             ranks[column] = old_rank + 1
                         else:
                             ranks[column] = old_rank
             else:
-                t2 = any(partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
-                if partition.b_inverse_adj[column][row] == 1:
+                if (partition.b_inverse_adj[column_index] >> row & 1) == 1:
                     if t2:
                         ranks[column] = old_rank + 1
                     else:
@@ -352,22 +518,18 @@ def row_swap_cut_ranks(partition : GraphPartition, row : int, ranks : list[int])
                         if s2:
                             ranks[column] = old_rank
                         else:
-                            if partition.adj_b_inv_adj[column][row] == 1:
+                            if (partition.adj_b_inv_adj[column] >> row & 1) == 1:
                                 ranks[column] = old_rank
                             else:
                                 ranks[column] = old_rank - 1
 
     else:
 
-        k1 = next((k1 for k1 in partition.free_rows if partition.adj_b_inverse[k1][row] == 1), -1)
-        if k1 >= 0 and partition.adj_b_inv_adj[k1][row] == 1:
-            s2 = any(k2 != k1 and partition.adj_b_inv_adj[k2][row] != partition.adj_b_inverse[k2][row] for k2 in partition.free_rows)
-        else:
-            s2 = any(k2 != k1 and partition.adj_b_inv_adj[k2][row] == 1 for k2 in partition.free_rows)
+        k1, s2, q4_0, q4_1 = partition.row_swap_data(row)
         for column in partition.free_columns:
             # row in X^B, column in Y^D
             if k1 >= 0:
-                t2 = any(l2 != column and partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
+                _, t2, _, _ = partition.column_swap_data(column)
                 if s2:
                     if t2:
                         ranks[column] = old_rank + 2
@@ -377,18 +539,18 @@ def row_swap_cut_ranks(partition : GraphPartition, row : int, ranks : list[int])
                     if t2:
                         ranks[column] = old_rank + 1
                     else:
-                        if partition.adj_b_inv_adj[column][row] != (partition.adj_b_inverse[column][row] & partition.adj_b_inv_adj[k1][row]):
+                        if (partition.adj_b_inv_adj[column] >> row & 1) != ((partition.adj_b_inverse[column] >> row_index & 1) & (partition.adj_b_inv_adj[k1] >> row & 1)):
                             ranks[column] = old_rank + 1
                         else:
                             ranks[column] = old_rank
             else:
-                if partition.adj_b_inverse[column][row] == 1:
+                if (partition.adj_b_inverse[column] >> row_index & 1) == 1:
                     if s2:
                         ranks[column] = old_rank + 1
                     else:
                         ranks[column] = old_rank
                 else:
-                    t2 = any(l2 != column and partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
+                    _, t2, _, _ = partition.column_swap_data(column)
                     if s2:
                         if t2:
                             ranks[column] = old_rank + 1
@@ -398,24 +560,19 @@ def row_swap_cut_ranks(partition : GraphPartition, row : int, ranks : list[int])
                         if t2:
                             ranks[column] = old_rank
                         else:
-                            if partition.adj_b_inv_adj[column][row] == 1:
+                            if (partition.adj_b_inv_adj[column] >> row & 1) == 1:
                                 ranks[column] = old_rank
                             else:
                                 ranks[column] = old_rank - 1
 
-        q4_0 = any(partition.adj_b_inv_adj[k][row] == 1 for k in partition.free_rows)
-        q4_1 = any(partition.adj_b_inv_adj[k][row] != partition.adj_b_inverse[k][row] for k in partition.free_rows)
         for column in partition.base_columns:
+            column_index = partition.base_index[column]
             # row in X^B, column in Y^B
-            l1 = next((l1 for l1 in partition.free_columns if partition.b_inverse_adj[column][l1] == 1), -1)
-            if (partition.base_inverse[column][row] == 1):
+            l1, t2, q5_0, q5_1 = partition.column_swap_data(column)
+            if ((partition.base_inverse[column_index] >> row_index & 1) == 1):
 
                 # Full rank matrix with row and column removed is invertible
                 if k1 >= 0 and l1 >= 0:
-                    if partition.adj_b_inv_adj[column][l1] == 1:
-                        t2 = any(l2 != l1 and partition.adj_b_inv_adj[column][l2] != partition.b_inverse_adj[column][l2] for l2 in partition.free_columns)
-                    else:
-                        t2 = any(l2 != l1 and partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
                     if s2:
                         if t2:
                             ranks[column] = old_rank + 2
@@ -425,14 +582,14 @@ def row_swap_cut_ranks(partition : GraphPartition, row : int, ranks : list[int])
                         if t2:
                             ranks[column] = old_rank + 1
                         else:
-                            if ((partition.adj_b_inv_adj[k1][row] & partition.adj_b_inv_adj[column][l1]) ^ (partition.adj_b_inv_adj[k1][row] & partition.adj_b_inverse[column][row]) ^ (partition.adj_b_inv_adj[column][l1] & partition.b_inverse_adj[column][row])) != partition.adj_b_inv_adj[column][row]:
+                            if (((partition.adj_b_inv_adj[k1] >> row & 1) & (partition.adj_b_inv_adj[column] >> l1 & 1)) ^ ((partition.adj_b_inv_adj[k1] >> row & 1) & (partition.adj_b_inverse[column] >> row_index & 1)) ^ ((partition.adj_b_inv_adj[column] >> l1 & 1) & (partition.b_inverse_adj[column_index] >> row & 1))) != (partition.adj_b_inv_adj[column] >> row & 1):
                                 ranks[column] = old_rank + 1
                             else:
                                 ranks[column] = old_rank
 
                 else:
-                    q4 = q4_1 if partition.b_inverse_adj[column][row] == 1 else q4_0
-                    q5 = any(partition.adj_b_inv_adj[column][l] != (partition.adj_b_inverse[column][row] & partition.b_inverse_adj[column][l]) for l in partition.free_columns)
+                    q4 = q4_1 if (partition.b_inverse_adj[column_index] >> row & 1) == 1 else q4_0
+                    q5 = q5_1 if (partition.adj_b_inverse[column] >> row_index & 1) == 1 else q5_0
                     if q4:
                         if q5:
                             ranks[column] = old_rank + 1
@@ -442,7 +599,7 @@ def row_swap_cut_ranks(partition : GraphPartition, row : int, ranks : list[int])
                         if q5:
                             ranks[column] = old_rank
                         else:
-                            if partition.adj_b_inv_adj[column][row] != (partition.adj_b_inverse[column][row] & partition.b_inverse_adj[column][row]):
+                            if (partition.adj_b_inv_adj[column] >> row & 1) != ((partition.adj_b_inverse[column] >> row_index & 1) & (partition.b_inverse_adj[column_index] >> row & 1)):
                                 ranks[column] = old_rank
                             else:
                                 ranks[column] = old_rank - 1
@@ -455,10 +612,6 @@ def row_swap_cut_ranks(partition : GraphPartition, row : int, ranks : list[int])
                     if l1 >= 0:
 
                         # Case k1 >= 0 and l1 >= 0
-                        if partition.adj_b_inv_adj[column][l1] == 1:
-                            t2 = any(l2 != l1 and partition.adj_b_inv_adj[column][l2] != partition.b_inverse_adj[column][l2] for l2 in partition.free_columns)
-                        else:
-                            t2 = any(l2 != l1 and partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
                         if s2:
                             if t2:
                                 ranks[column] = old_rank + 2
@@ -468,7 +621,7 @@ def row_swap_cut_ranks(partition : GraphPartition, row : int, ranks : list[int])
                             if t2:
                                 ranks[column] = old_rank + 1
                             else:
-                                if ((partition.adj_b_inv_adj[k1][row] & partition.adj_b_inverse[column][row]) ^ (partition.adj_b_inv_adj[column][l1] & partition.b_inverse_adj[column][row])) != partition.adj_b_inv_adj[column][row]:
+                                if (((partition.adj_b_inv_adj[k1] >> row & 1) & (partition.adj_b_inverse[column] >> row_index & 1)) ^ ((partition.adj_b_inv_adj[column] >> l1 & 1) & (partition.b_inverse_adj[column_index] >> row & 1))) != (partition.adj_b_inv_adj[column] >> row & 1):
                                     ranks[column] = old_rank + 1
                                 else:
                                     ranks[column] = old_rank
@@ -476,9 +629,8 @@ def row_swap_cut_ranks(partition : GraphPartition, row : int, ranks : list[int])
                     else:
 
                         # Case k1 >= 0 and l1 < 0
-                        t2 = any(partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
                         if t2:
-                            if partition.b_inverse_adj[column][row] == 1:
+                            if (partition.b_inverse_adj[column_index] >> row & 1) == 1:
                                 ranks[column] = old_rank + 1
                             else:
                                 if s2:
@@ -486,13 +638,13 @@ def row_swap_cut_ranks(partition : GraphPartition, row : int, ranks : list[int])
                                 else:
                                     ranks[column] = old_rank
                         else:
-                            if partition.b_inverse_adj[column][row] == 1:
+                            if (partition.b_inverse_adj[column_index] >> row & 1) == 1:
                                 ranks[column] = old_rank
                             else:
                                 if s2:
                                     ranks[column] = old_rank
                                 else:
-                                    if (partition.adj_b_inv_adj[k1][row] & partition.adj_b_inverse[column][row]) != partition.adj_b_inv_adj[column][row]:
+                                    if ((partition.adj_b_inv_adj[k1] >> row & 1) & (partition.adj_b_inverse[column] >> row_index & 1)) != (partition.adj_b_inv_adj[column] >> row & 1):
                                         ranks[column] = old_rank
                                     else:
                                         ranks[column] = old_rank - 1
@@ -503,29 +655,21 @@ def row_swap_cut_ranks(partition : GraphPartition, row : int, ranks : list[int])
 
                         # Case k1 < 0 and l1 >= 0
                         if s2:
-                            if partition.adj_b_inverse[column][row] == 1:
+                            if (partition.adj_b_inverse[column] >> row_index & 1) == 1:
                                 ranks[column] = old_rank + 1
                             else:
-                                if partition.adj_b_inv_adj[column][l1] == 1:
-                                    t2 = any(l2 != l1 and partition.adj_b_inv_adj[column][l2] != partition.b_inverse_adj[column][l2] for l2 in partition.free_columns)
-                                else:
-                                    t2 = any(l2 != l1 and partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
                                 if t2:
                                     ranks[column] = old_rank + 1
                                 else:
                                     ranks[column] = old_rank
                         else:
-                            if partition.adj_b_inverse[column][row] == 1:
+                            if (partition.adj_b_inverse[column] >> row_index & 1) == 1:
                                 ranks[column] = old_rank
                             else:
-                                if partition.adj_b_inv_adj[column][l1] == 1:
-                                    t2 = any(l2 != l1 and partition.adj_b_inv_adj[column][l2] != partition.b_inverse_adj[column][l2] for l2 in partition.free_columns)
-                                else:
-                                    t2 = any(l2 != l1 and partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
                                 if t2:
                                     ranks[column] = old_rank
                                 else:
-                                    if (partition.adj_b_inv_adj[column][l1] & partition.b_inverse_adj[column][row]) != partition.adj_b_inv_adj[column][row]:
+                                    if ((partition.adj_b_inv_adj[column] >> l1 & 1) & (partition.b_inverse_adj[column_index] >> row & 1)) != (partition.adj_b_inv_adj[column] >> row & 1):
                                         ranks[column] = old_rank
                                     else:
                                         ranks[column] = old_rank - 1
@@ -533,8 +677,8 @@ def row_swap_cut_ranks(partition : GraphPartition, row : int, ranks : list[int])
                     else:
 
                         # Case k1 < 0 and l1 < 0
-                        if partition.adj_b_inverse[column][row] == 1:
-                            if partition.b_inverse_adj[column][row] == 1:
+                        if (partition.adj_b_inverse[column] >> row_index & 1) == 1:
+                            if (partition.b_inverse_adj[column_index] >> row & 1) == 1:
                                 ranks[column] = old_rank
                             else:
                                 if s2:
@@ -542,14 +686,12 @@ def row_swap_cut_ranks(partition : GraphPartition, row : int, ranks : list[int])
                                 else:
                                     ranks[column] = old_rank - 1
                         else:
-                            if partition.b_inverse_adj[column][row] == 1:
-                                t2 = any(partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
+                            if (partition.b_inverse_adj[column_index] >> row & 1) == 1:
                                 if t2:
                                     ranks[column] = old_rank
                                 else:
                                     ranks[column] = old_rank - 1
                             else:
-                                t2 = any(partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
                                 if s2:
                                     if t2:
                                         ranks[column] = old_rank
@@ -559,7 +701,7 @@ def row_swap_cut_ranks(partition : GraphPartition, row : int, ranks : list[int])
                                     if t2:
                                         ranks[column] = old_rank - 1
                                     else:
-                                        if partition.adj_b_inv_adj[column][row] == 1:
+                                        if (partition.adj_b_inv_adj[column] >> row & 1) == 1:
                                             ranks[column] = old_rank - 1
                                         else:
                                             ranks[column] = old_rank - 2
@@ -576,13 +718,17 @@ def single_swap_cut_rank(partition : GraphPartition, row : int, column : int) ->
 
     old_rank = partition.cut_rank
 
+    # Local indices in the compact matrices, only used for base nodes
+    row_index = partition.base_index[row]
+    column_index = partition.base_index[column]
+
     if (not partition.base_flag[column]):
 
         if (not partition.base_flag[row]):
 
             # row in X^D, column in Y^D
-            s2 = any(k2 != row and partition.adj_b_inv_adj[k2][row] == 1 for k2 in partition.free_rows)
-            t2 = any(l2 != column and partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
+            _, s2, _, _ = partition.row_swap_data(row)
+            _, t2, _, _ = partition.column_swap_data(column)
             if s2:
                 if t2:
                     return old_rank + 2
@@ -592,7 +738,7 @@ def single_swap_cut_rank(partition : GraphPartition, row : int, column : int) ->
                 if t2:
                     return old_rank + 1
                 else:
-                    if partition.adj_b_inv_adj[column][row] == 1:
+                    if (partition.adj_b_inv_adj[column] >> row & 1) == 1:
                         return old_rank + 1
                     else:
                         return old_rank
@@ -600,13 +746,9 @@ def single_swap_cut_rank(partition : GraphPartition, row : int, column : int) ->
         else:
 
             # row in X^B, column in Y^D
-            k1 = next((k1 for k1 in partition.free_rows if partition.adj_b_inverse[k1][row] == 1), -1)
+            k1, s2, q4_0, q4_1 = partition.row_swap_data(row)
             if k1 >= 0:
-                if partition.adj_b_inv_adj[k1][row] == 1:
-                    s2 = any(k2 != k1 and partition.adj_b_inv_adj[k2][row] != partition.adj_b_inverse[k2][row] for k2 in partition.free_rows)
-                else:
-                    s2 = any(k2 != k1 and partition.adj_b_inv_adj[k2][row] == 1 for k2 in partition.free_rows)
-                t2 = any(l2 != column and partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
+                _, t2, _, _ = partition.column_swap_data(column)
                 if s2:
                     if t2:
                         return old_rank + 2
@@ -616,19 +758,18 @@ def single_swap_cut_rank(partition : GraphPartition, row : int, column : int) ->
                     if t2:
                         return old_rank + 1
                     else:
-                        if partition.adj_b_inv_adj[column][row] != (partition.adj_b_inverse[column][row] & partition.adj_b_inv_adj[k1][row]):
+                        if (partition.adj_b_inv_adj[column] >> row & 1) != ((partition.adj_b_inverse[column] >> row_index & 1) & (partition.adj_b_inv_adj[k1] >> row & 1)):
                             return old_rank + 1
                         else:
                             return old_rank
             else:
-                s2 = any(partition.adj_b_inv_adj[k2][row] == 1 for k2 in partition.free_rows)
-                if partition.adj_b_inverse[column][row] == 1:
+                if (partition.adj_b_inverse[column] >> row_index & 1) == 1:
                     if s2:
                         return old_rank + 1
                     else:
                         return old_rank
                 else:
-                    t2 = any(l2 != column and partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
+                    _, t2, _, _ = partition.column_swap_data(column)
                     if s2:
                         if t2:
                             return old_rank + 1
@@ -638,7 +779,7 @@ def single_swap_cut_rank(partition : GraphPartition, row : int, column : int) ->
                         if t2:
                             return old_rank
                         else:
-                            if partition.adj_b_inv_adj[column][row] == 1:
+                            if (partition.adj_b_inv_adj[column] >> row & 1) == 1:
                                 return old_rank
                             else:
                                 return old_rank - 1
@@ -648,13 +789,9 @@ def single_swap_cut_rank(partition : GraphPartition, row : int, column : int) ->
         if (not partition.base_flag[row]):
 
             # row in X^D, column in Y^B
-            l1 = next((l1 for l1 in partition.free_columns if partition.b_inverse_adj[column][l1] == 1), -1)
+            l1, t2, q5_0, q5_1 = partition.column_swap_data(column)
             if l1 >= 0:
-                if partition.adj_b_inv_adj[column][l1] == 1:
-                    t2 = any(l2 != l1 and partition.adj_b_inv_adj[column][l2] != partition.b_inverse_adj[column][l2] for l2 in partition.free_columns)
-                else:
-                    t2 = any(l2 != l1 and partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
-                s2 = any(k2 != row and partition.adj_b_inv_adj[k2][row] == 1 for k2 in partition.free_rows)
+                _, s2, _, _ = partition.row_swap_data(row)
                 if t2:
                     if s2:
                         return old_rank + 2
@@ -664,19 +801,18 @@ def single_swap_cut_rank(partition : GraphPartition, row : int, column : int) ->
                     if s2:
                         return old_rank + 1
                     else:
-                        if partition.adj_b_inv_adj[column][row] != (partition.b_inverse_adj[column][row] & partition.adj_b_inv_adj[column][l1]):
+                        if (partition.adj_b_inv_adj[column] >> row & 1) != ((partition.b_inverse_adj[column_index] >> row & 1) & (partition.adj_b_inv_adj[column] >> l1 & 1)):
                             return old_rank + 1
                         else:
                             return old_rank
             else:
-                t2 = any(partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
-                if partition.b_inverse_adj[column][row] == 1:
+                if (partition.b_inverse_adj[column_index] >> row & 1) == 1:
                     if t2:
                         return old_rank + 1
                     else:
                         return old_rank
                 else:
-                    s2 = any(k2 != row and partition.adj_b_inv_adj[k2][row] == 1 for k2 in partition.free_rows)
+                    _, s2, _, _ = partition.row_swap_data(row)
                     if t2:
                         if s2:
                             return old_rank + 1
@@ -686,7 +822,7 @@ def single_swap_cut_rank(partition : GraphPartition, row : int, column : int) ->
                         if s2:
                             return old_rank
                         else:
-                            if partition.adj_b_inv_adj[column][row] == 1:
+                            if (partition.adj_b_inv_adj[column] >> row & 1) == 1:
                                 return old_rank
                             else:
                                 return old_rank - 1
@@ -694,20 +830,12 @@ def single_swap_cut_rank(partition : GraphPartition, row : int, column : int) ->
         else:
 
             # row in X^B, column in Y^B
-            k1 = next((k1 for k1 in partition.free_rows if partition.adj_b_inverse[k1][row] == 1), -1)
-            l1 = next((l1 for l1 in partition.free_columns if partition.b_inverse_adj[column][l1] == 1), -1)
-            if (partition.base_inverse[column][row] == 1):
+            k1, s2, q4_0, q4_1 = partition.row_swap_data(row)
+            l1, t2, q5_0, q5_1 = partition.column_swap_data(column)
+            if ((partition.base_inverse[column_index] >> row_index & 1) == 1):
 
                 # Full rank matrix with row and column removed is invertible
                 if k1 >= 0 and l1 >= 0:
-                    if partition.adj_b_inv_adj[k1][row] == 1:
-                        s2 = any(k2 != k1 and partition.adj_b_inv_adj[k2][row] != partition.adj_b_inverse[k2][row] for k2 in partition.free_rows)
-                    else:
-                        s2 = any(k2 != k1 and partition.adj_b_inv_adj[k2][row] == 1 for k2 in partition.free_rows)
-                    if partition.adj_b_inv_adj[column][l1] == 1:
-                        t2 = any(l2 != l1 and partition.adj_b_inv_adj[column][l2] != partition.b_inverse_adj[column][l2] for l2 in partition.free_columns)
-                    else:
-                        t2 = any(l2 != l1 and partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
                     if s2:
                         if t2:
                             return old_rank + 2
@@ -717,14 +845,14 @@ def single_swap_cut_rank(partition : GraphPartition, row : int, column : int) ->
                         if t2:
                             return old_rank + 1
                         else:
-                            if ((partition.adj_b_inv_adj[k1][row] & partition.adj_b_inv_adj[column][l1]) ^ (partition.adj_b_inv_adj[k1][row] & partition.adj_b_inverse[column][row]) ^ (partition.adj_b_inv_adj[column][l1] & partition.b_inverse_adj[column][row])) != partition.adj_b_inv_adj[column][row]:
+                            if (((partition.adj_b_inv_adj[k1] >> row & 1) & (partition.adj_b_inv_adj[column] >> l1 & 1)) ^ ((partition.adj_b_inv_adj[k1] >> row & 1) & (partition.adj_b_inverse[column] >> row_index & 1)) ^ ((partition.adj_b_inv_adj[column] >> l1 & 1) & (partition.b_inverse_adj[column_index] >> row & 1))) != (partition.adj_b_inv_adj[column] >> row & 1):
                                 return old_rank + 1
                             else:
                                 return old_rank
 
                 else:
-                    q4 = any(partition.adj_b_inv_adj[k][row] != (partition.adj_b_inverse[k][row] & partition.b_inverse_adj[column][row]) for k in partition.free_rows)
-                    q5 = any(partition.adj_b_inv_adj[column][l] != (partition.adj_b_inverse[column][row] & partition.b_inverse_adj[column][l]) for l in partition.free_columns)
+                    q4 = q4_1 if (partition.b_inverse_adj[column_index] >> row & 1) == 1 else q4_0
+                    q5 = q5_1 if (partition.adj_b_inverse[column] >> row_index & 1) == 1 else q5_0
                     if q4:
                         if q5:
                             return old_rank + 1
@@ -734,7 +862,7 @@ def single_swap_cut_rank(partition : GraphPartition, row : int, column : int) ->
                         if q5:
                             return old_rank
                         else:
-                            if partition.adj_b_inv_adj[column][row] != (partition.adj_b_inverse[column][row] & partition.b_inverse_adj[column][row]):
+                            if (partition.adj_b_inv_adj[column] >> row & 1) != ((partition.adj_b_inverse[column] >> row_index & 1) & (partition.b_inverse_adj[column_index] >> row & 1)):
                                 return old_rank
                             else:
                                 return old_rank - 1
@@ -747,14 +875,6 @@ def single_swap_cut_rank(partition : GraphPartition, row : int, column : int) ->
                     if l1 >= 0:
 
                         # Case k1 >= 0 and l1 >= 0
-                        if partition.adj_b_inv_adj[k1][row] == 1:
-                            s2 = any(k2 != k1 and partition.adj_b_inv_adj[k2][row] != partition.adj_b_inverse[k2][row] for k2 in partition.free_rows)
-                        else:
-                            s2 = any(k2 != k1 and partition.adj_b_inv_adj[k2][row] == 1 for k2 in partition.free_rows)
-                        if partition.adj_b_inv_adj[column][l1] == 1:
-                            t2 = any(l2 != l1 and partition.adj_b_inv_adj[column][l2] != partition.b_inverse_adj[column][l2] for l2 in partition.free_columns)
-                        else:
-                            t2 = any(l2 != l1 and partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
                         if s2:
                             if t2:
                                 return old_rank + 2
@@ -764,7 +884,7 @@ def single_swap_cut_rank(partition : GraphPartition, row : int, column : int) ->
                             if t2:
                                 return old_rank + 1
                             else:
-                                if ((partition.adj_b_inv_adj[k1][row] & partition.adj_b_inverse[column][row]) ^ (partition.adj_b_inv_adj[column][l1] & partition.b_inverse_adj[column][row])) != partition.adj_b_inv_adj[column][row]:
+                                if (((partition.adj_b_inv_adj[k1] >> row & 1) & (partition.adj_b_inverse[column] >> row_index & 1)) ^ ((partition.adj_b_inv_adj[column] >> l1 & 1) & (partition.b_inverse_adj[column_index] >> row & 1))) != (partition.adj_b_inv_adj[column] >> row & 1):
                                     return old_rank + 1
                                 else:
                                     return old_rank
@@ -772,31 +892,22 @@ def single_swap_cut_rank(partition : GraphPartition, row : int, column : int) ->
                     else:
 
                         # Case k1 >= 0 and l1 < 0
-                        t2 = any(partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
                         if t2:
-                            if partition.b_inverse_adj[column][row] == 1:
+                            if (partition.b_inverse_adj[column_index] >> row & 1) == 1:
                                 return old_rank + 1
                             else:
-                                if partition.adj_b_inv_adj[k1][row] == 1:
-                                    s2 = any(k2 != k1 and partition.adj_b_inv_adj[k2][row] != partition.adj_b_inverse[k2][row] for k2 in partition.free_rows)
-                                else:
-                                    s2 = any(k2 != k1 and partition.adj_b_inv_adj[k2][row] == 1 for k2 in partition.free_rows)
                                 if s2:
                                     return old_rank + 1
                                 else:
                                     return old_rank
                         else:
-                            if partition.b_inverse_adj[column][row] == 1:
+                            if (partition.b_inverse_adj[column_index] >> row & 1) == 1:
                                 return old_rank
                             else:
-                                if partition.adj_b_inv_adj[k1][row] == 1:
-                                    s2 = any(k2 != k1 and partition.adj_b_inv_adj[k2][row] != partition.adj_b_inverse[k2][row] for k2 in partition.free_rows)
-                                else:
-                                    s2 = any(k2 != k1 and partition.adj_b_inv_adj[k2][row] == 1 for k2 in partition.free_rows)
                                 if s2:
                                     return old_rank
                                 else:
-                                    if (partition.adj_b_inv_adj[k1][row] & partition.adj_b_inverse[column][row]) != partition.adj_b_inv_adj[column][row]:
+                                    if ((partition.adj_b_inv_adj[k1] >> row & 1) & (partition.adj_b_inverse[column] >> row_index & 1)) != (partition.adj_b_inv_adj[column] >> row & 1):
                                         return old_rank
                                     else:
                                         return old_rank - 1
@@ -806,31 +917,22 @@ def single_swap_cut_rank(partition : GraphPartition, row : int, column : int) ->
                     if l1 >= 0:
 
                         # Case k1 < 0 and l1 >= 0
-                        s2 = any(partition.adj_b_inv_adj[k2][row] == 1 for k2 in partition.free_rows)
                         if s2:
-                            if partition.adj_b_inverse[column][row] == 1:
+                            if (partition.adj_b_inverse[column] >> row_index & 1) == 1:
                                 return old_rank + 1
                             else:
-                                if partition.adj_b_inv_adj[column][l1] == 1:
-                                    t2 = any(l2 != l1 and partition.adj_b_inv_adj[column][l2] != partition.b_inverse_adj[column][l2] for l2 in partition.free_columns)
-                                else:
-                                    t2 = any(l2 != l1 and partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
                                 if t2:
                                     return old_rank + 1
                                 else:
                                     return old_rank
                         else:
-                            if partition.adj_b_inverse[column][row] == 1:
+                            if (partition.adj_b_inverse[column] >> row_index & 1) == 1:
                                 return old_rank
                             else:
-                                if partition.adj_b_inv_adj[column][l1] == 1:
-                                    t2 = any(l2 != l1 and partition.adj_b_inv_adj[column][l2] != partition.b_inverse_adj[column][l2] for l2 in partition.free_columns)
-                                else:
-                                    t2 = any(l2 != l1 and partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
                                 if t2:
                                     return old_rank
                                 else:
-                                    if (partition.adj_b_inv_adj[column][l1] & partition.b_inverse_adj[column][row]) != partition.adj_b_inv_adj[column][row]:
+                                    if ((partition.adj_b_inv_adj[column] >> l1 & 1) & (partition.b_inverse_adj[column_index] >> row & 1)) != (partition.adj_b_inv_adj[column] >> row & 1):
                                         return old_rank
                                     else:
                                         return old_rank - 1
@@ -838,25 +940,21 @@ def single_swap_cut_rank(partition : GraphPartition, row : int, column : int) ->
                     else:
 
                         # Case k1 < 0 and l1 < 0
-                        if partition.adj_b_inverse[column][row] == 1:
-                            if partition.b_inverse_adj[column][row] == 1:
+                        if (partition.adj_b_inverse[column] >> row_index & 1) == 1:
+                            if (partition.b_inverse_adj[column_index] >> row & 1) == 1:
                                 return old_rank
                             else:
-                                s2 = any(partition.adj_b_inv_adj[k2][row] == 1 for k2 in partition.free_rows)
                                 if s2:
                                     return old_rank
                                 else:
                                     return old_rank - 1
                         else:
-                            if partition.b_inverse_adj[column][row] == 1:
-                                t2 = any(partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
+                            if (partition.b_inverse_adj[column_index] >> row & 1) == 1:
                                 if t2:
                                     return old_rank
                                 else:
                                     return old_rank - 1
                             else:
-                                s2 = any(partition.adj_b_inv_adj[k2][row] == 1 for k2 in partition.free_rows)
-                                t2 = any(partition.adj_b_inv_adj[column][l2] == 1 for l2 in partition.free_columns)
                                 if s2:
                                     if t2:
                                         return old_rank
@@ -866,7 +964,52 @@ def single_swap_cut_rank(partition : GraphPartition, row : int, column : int) ->
                                     if t2:
                                         return old_rank - 1
                                     else:
-                                        if partition.adj_b_inv_adj[column][row] == 1:
+                                        if (partition.adj_b_inv_adj[column] >> row & 1) == 1:
                                             return old_rank - 1
                                         else:
                                             return old_rank - 2
+
+
+def single_move_cut_rank(partition : GraphPartition, node : int) -> int:
+    """Returns the cut-rank for the partition obtained by moving the given node to the other partition set, see 'move_node' in GraphPartition.
+    Removing a base row v lowers the cut-rank unless a free row k1 can replace it, and the moved node adds an independent column iff s2 holds,
+    so the change is s2 - 1 for a base row without k1 and s2 otherwise, with s2 and k1 from 'row_swap_data'. Columns are handled the same way.
+
+    args:
+        - partition: 'GraphPartition' The graph partition.
+        - node: 'int' The node to be moved, either a row or a column.
+    """
+
+    if partition.row_flag[node]:
+        (first, second, _, _) = partition.row_swap_data(node)
+    else:
+        (first, second, _, _) = partition.column_swap_data(node)
+    if partition.base_flag[node] and first < 0:
+        return partition.cut_rank + int(second) - 1
+    return partition.cut_rank + int(second)
+
+
+def all_move_rank_deltas(partition : GraphPartition, deltas : np.ndarray = None) -> np.ndarray:
+    """Finds the change in cut-rank for the partitions obtained by moving any single node to the other partition set, with the same formula
+    as 'single_move_cut_rank', evaluated as NumPy array expressions from the same row and column features as 'all_swap_rank_deltas'.
+
+    args:
+        - partition: 'GraphPartition' The graph partition.
+        - deltas: 'np.ndarray' An optional int8 array of length nmb_nodes to store the result in. A new array is created if omitted.
+
+    returns: The int8 array where position [v] holds the cut-rank after moving node v minus the current cut-rank.
+    """
+
+    if deltas is None:
+        deltas = np.zeros(partition.nmb_nodes, dtype=np.int8)
+    (s2, s1, _, _, _) = _partition_row_features(partition, partition.free_rows, partition.base_rows)
+    (t2, t1, _, _, _) = _partition_column_features(partition, partition.free_columns, partition.base_columns)
+    t2 = t2[:, 0]
+    t1 = t1[:, 0]
+    s2 = s2.astype(np.int8)
+    s2[len(partition.free_rows) :] -= ~s1 * np.int8(1)
+    t2 = t2.astype(np.int8)
+    t2[len(partition.free_columns) :] -= ~t1 * np.int8(1)
+    deltas[partition.free_rows + partition.base_rows] = s2
+    deltas[partition.free_columns + partition.base_columns] = t2
+    return deltas
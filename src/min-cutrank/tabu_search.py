@@ -0,0 +1,168 @@
+import numpy as np
+import random
+import time
+from graph_partition import GraphPartition
+from swap_rank_calculator import all_swap_rank_deltas
+
+
+class TabuResult:
+
+    """
+    The outcome of 'tabu_search' or 'steepest_descent', with the best partition seen during the search.
+    """
+
+    best_cut_rank : int
+    """The lowest cut-rank reached."""
+
+    best_row_flag : list[bool]
+    """The partition with the lowest cut-rank, see 'row_flag' in GraphPartition. The first reached if several have it."""
+
+    best_iteration : int
+    """The iteration in which the lowest cut-rank was first reached, 0 if it was the cut-rank of the start partition."""
+
+    best_seconds : float
+    """The time from the start of the search until the lowest cut-rank was reached."""
+
+    iterations : int
+    """The number of iterations, each applying one swap."""
+
+    evaluated : int
+    """The number of swaps evaluated in total."""
+
+    seconds : float
+    """The total time of the search."""
+
+    stopped_by_budget : bool
+    """Whether the search was stopped by the iteration or time limit, rather than by reaching the target cut-rank or a local minimum."""
+
+    def __init__(self, cut_rank : int, row_flag : list[bool]):
+        self.best_cut_rank = cut_rank
+        self.best_row_flag = row_flag[:]
+        self.best_iteration = 0
+        self.best_seconds = 0.0
+        self.iterations = 0
+        self.evaluated = 0
+        self.seconds = 0.0
+        self.stopped_by_budget = False
+
+
+def default_tabu_tenure(nmb_nodes : int) -> int:
+    """Returns the default number of iterations that the two nodes of an applied swap may not be swapped again, a tenth of the number of nodes."""
+
+    return max(1, nmb_nodes // 10)
+
+
+def tabu_search(partition : GraphPartition, max_iterations : int, time_limit : float | None = None, tabu_tenure : int | None = None,
+                target_cut_rank : int = -1, log : bool = False, restore_best : bool = False) -> TabuResult:
+    """Searches for a partition of lower cut-rank by tabu search over swaps. In each iteration the cut-rank changes of all swaps are evaluated by
+    'all_swap_rank_deltas', and the swap of lowest cut-rank among the admissible ones is applied, also if it increases the cut-rank. Ties are broken at random.
+    The two nodes of the applied swap are tabu for the following 'tabu_tenure' iterations, and a swap involving a tabu node is only admissible if it
+    gives a lower cut-rank than the best one reached so far (aspiration). If no swap is admissible, the best of all swaps is applied.
+    The partition is left in its last state, the best one seen is returned in the result, unless the partition should be restored to it.
+
+    args:
+        - partition: 'GraphPartition' The start partition, which is updated by the applied swaps.
+        - max_iterations: 'int' The maximum number of iterations.
+        - time_limit: 'float' The time limit in seconds, checked before each iteration. No limit if None.
+        - tabu_tenure: 'int' The number of iterations a swapped node is tabu. If None, 'default_tabu_tenure' of the number of nodes is used.
+        - target_cut_rank: 'int' Stop as soon as this cut-rank or lower is reached. Not used if negative.
+        - log: 'bool' Whether each improvement of the lowest cut-rank should be logged to the console.
+        - restore_best: 'bool' Whether the partition should be restored to the best one seen at the end, from a 'snapshot' taken whenever the lowest
+          cut-rank improves, which takes O(n) time.
+    """
+
+    if tabu_tenure is None:
+        tabu_tenure = default_tabu_tenure(partition.nmb_nodes)
+    start = time.time()
+    deadline = None if time_limit is None else start + time_limit
+    result = TabuResult(partition.cut_rank, partition.row_flag)
+    best_snapshot = partition.snapshot() if restore_best else None
+    deltas = None
+    tabu_until = np.zeros(partition.nmb_nodes, dtype=np.int64)
+    if log:
+        print(f"Starting with cut-rank {partition.cut_rank}")
+    if len(partition.rows) == 0 or len(partition.columns) == 0:
+        # No swap exists when a partition set is empty
+        result.seconds = time.time() - start
+        return result
+
+    while result.best_cut_rank > target_cut_rank:
+        if result.iterations >= max_iterations or (deadline is not None and time.time() >= deadline):
+            result.stopped_by_budget = True
+            break
+        iteration = result.iterations + 1
+
+        deltas = all_swap_rank_deltas(partition, deltas)
+        swap_deltas = deltas[np.ix_(partition.rows, partition.columns)]
+        result.evaluated += swap_deltas.size
+
+        # Swaps of two non-tabu nodes, and swaps reaching a new lowest cut-rank
+        free_rows = tabu_until[partition.rows] < iteration
+        free_columns = tabu_until[partition.columns] < iteration
+        admissible = np.logical_and.outer(free_rows, free_columns)
+        admissible |= swap_deltas < result.best_cut_rank - partition.cut_rank
+        if admissible.any():
+            swap_deltas = np.where(admissible, swap_deltas, np.int8(3))
+        (row, column) = _best_swap(partition, swap_deltas)
+
+        partition.apply_swap(row, column)
+        tabu_until[row] = iteration + tabu_tenure
+        tabu_until[column] = iteration + tabu_tenure
+        result.iterations = iteration
+        if partition.cut_rank < result.best_cut_rank:
+            result.best_cut_rank = partition.cut_rank
+            result.best_row_flag = partition.row_flag[:]
+            result.best_iteration = iteration
+            result.best_seconds = time.time() - start
+            if restore_best:
+                best_snapshot = partition.snapshot()
+            if log:
+                print(f"Cut-rank {partition.cut_rank} reached in iteration {iteration}")
+
+    if restore_best:
+        partition.restore(best_snapshot)
+    result.seconds = time.time() - start
+    return result
+
+
+def steepest_descent(partition : GraphPartition, max_iterations : int | None = None) -> TabuResult:
+    """Applies the swap of lowest cut-rank, chosen at random among ties, as long as it decreases the cut-rank, i.e. until a local minimum is reached.
+
+    args:
+        - partition: 'GraphPartition' The start partition, which is updated by the applied swaps and left in the local minimum.
+        - max_iterations: 'int' The maximum number of iterations. No limit if None.
+    """
+
+    start = time.time()
+    result = TabuResult(partition.cut_rank, partition.row_flag)
+    deltas = None
+
+    while True:
+        if max_iterations is not None and result.iterations >= max_iterations:
+            result.stopped_by_budget = True
+            break
+        if len(partition.rows) == 0 or len(partition.columns) == 0:
+            break
+        deltas = all_swap_rank_deltas(partition, deltas)
+        swap_deltas = deltas[np.ix_(partition.rows, partition.columns)]
+        result.evaluated += swap_deltas.size
+        if swap_deltas.min() >= 0:
+            break
+        (row, column) = _best_swap(partition, swap_deltas)
+        partition.apply_swap(row, column)
+        result.iterations += 1
+
+    result.best_cut_rank = partition.cut_rank
+    result.best_row_flag = partition.row_flag[:]
+    result.best_iteration = result.iterations
+    result.seconds = time.time() - start
+    result.best_seconds = result.seconds
+    return result
+
+
+def _best_swap(partition : GraphPartition, swap_deltas : np.ndarray) -> tuple[int, int]:
+
+    # A random one of the swaps with the lowest cut-rank change, given for partition.rows times partition.columns
+    candidates = np.flatnonzero(swap_deltas == swap_deltas.min())
+    (i, j) = divmod(int(candidates[random.randrange(len(candidates))]), swap_deltas.shape[1])
+    return (partition.rows[i], partition.columns[j])
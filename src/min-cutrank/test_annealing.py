@@ -4,8 +4,9 @@ import time
 import getopt
 import random
 from cut_rank_annealing import cut_rank_annealing_direct, cut_rank_annealing_row_formula
-from test_tools import parse_bool,parse_int, parse_float, graph_from_description, temperatures_from_description, clone_partition
-from partition_builder import random_partition
+from test_tools import parse_bool,parse_int, parse_float, graph_from_description, temperatures_from_description, partition_from_description, clone_partition
+from multilevel_annealing import multilevel_annealing
+from tabu_search import tabu_search
 
 
 def test_annealing_method(annealing_method, name : str, partition, temperatures, log : bool) -> None:
@@ -17,6 +18,25 @@ def test_annealing_method(annealing_method, name : str, partition, temperatures,
     print(f"Annealing method '{name}' completed at cut-rank {partition_copy.cut_rank} in {end - start} sec")
 
 
+def multilevel_annealing_method(partition, temperatures, log : bool) -> None:
+
+    # Runs 'multilevel_annealing' on the graph of the partition with the same set sizes, and restores the partition to the result
+    (result_partition, _) = multilevel_annealing(partition.adjacencies, len(partition.rows) / partition.nmb_nodes, temperatures, log=log)
+    partition.restore(result_partition)
+
+
+def rejection_free_annealing_method(partition, temperatures, log : bool) -> None:
+
+    # Runs 'cut_rank_annealing_row_formula' with the cold phase rejection-free, from the sweep after one that accepted at most as many swaps as there are nodes
+    cut_rank_annealing_row_formula(partition, temperatures, log, rejection_free_limit=partition.nmb_nodes)
+
+
+def tabu_search_method(partition, temperatures, log : bool) -> None:
+
+    # Runs 'tabu_search' for as many iterations as there are nodes, without temperatures, ending in the best partition seen
+    tabu_search(partition, partition.nmb_nodes, log=log, restore_best=True)
+
+
 if __name__=="__main__":
 
     """
@@ -30,10 +50,15 @@ if __name__=="__main__":
     -s N        The random seed. If omited, no seed is set for the random function. Random numbers can be used to build the graph, and are used to select which swaps to apply during the annealing algorithm.
     -g Graph    The graph setup. See 'graph_from_description' for details
     -p P        The size of the first partition set as a portion of the number of all nodes. Default is 0.5.
+    -i Init     The initial partition. See 'partition_from_description'. Default is 'random'
     -t Temp     The temperature setup. See 'temperatures_from_description'. Default is '1e0.1s10', i.e. 10 temperatures on a linear range from 1.0 to 0.1
     -m Methods  Lists the annealing algorithms to be used, separated by comma. The alternatives are
                 'gauss' calculates each swap cut-rank by Gauss-Jordan elimination on the adjacency matrix
                 'formula' calculates the swap cut-ranks for each selected element in the first partition set by one single call to 'row_swap_cut_ranks'
+                'rejection' runs the cold phase rejection-free on a 'SwapGainTable', from the sweep after one that accepted at most as many swaps as there are nodes. It follows a different chain than 'formula' in that phase
+                'multilevel' anneals a coarsened graph and refines the projected partition on each finer level. Only the set sizes of the random partition are used
+                'tabu' runs 'tabu_search' for as many iterations as there are nodes, starting from the same partition. The temperatures are not used.
+                It ends in the best partition seen, restored from a snapshot, while the annealing methods end in their last state
     -l Bool     Whether the rank at the beginning and after each temperature sweep should be logged to the console.
     """
 
@@ -42,13 +67,14 @@ if __name__=="__main__":
     seed = None
     graph_setup = None
     set_portion = 0.5
+    initial_setup = "random"
 
     cut_rank_methods = []
     temperatures = np.linspace(1.0, 0.1, 10)
     log = True
 
-    options = "s:g:p:t:m:l:"
-    long_options = ["seed=", "graph=", "partition_portion=", "temperatures=", "cut_rank_methods=", "log="]
+    options = "s:g:p:i:t:m:l:"
+    long_options = ["seed=", "graph=", "partition_portion=", "initial_partition=", "temperatures=", "cut_rank_methods=", "log="]
 
     try:
         arguments, values = getopt.getopt(opt_arguments, options, long_options)
@@ -61,6 +87,8 @@ if __name__=="__main__":
                 graph_setup = value
             elif argument in ("-p", "--partition_portion"):
                 set_portion = parse_float(value, 0.5)
+            elif argument in ("-i", "--initial_partition"):
+                initial_setup = value
             elif argument in ("-t", "--temperatures"):
                 temperatures = temperatures_from_description(value)
             elif argument in ("-m", "--cut_rank_methods"):
@@ -75,7 +103,7 @@ if __name__=="__main__":
             if seed != None:
                 random.seed(seed)
             graph_adj_matrix = graph_from_description(graph_setup)
-            graph_partition = random_partition(graph_adj_matrix, set_portion)
+            graph_partition = partition_from_description(initial_setup, graph_adj_matrix, set_portion)
 
             seed_algo = random.randint(0, 65535)
             if cut_rank_methods == []:
@@ -90,6 +118,15 @@ if __name__=="__main__":
                     elif cut_rank_m == "formula":
                         test_annealing_method(cut_rank_annealing_row_formula, "Formula for all cut-ranks on row", graph_partition, temperatures, log)
 
+                    elif cut_rank_m == "rejection":
+                        test_annealing_method(rejection_free_annealing_method, "Formula for all cut-ranks on row, rejection-free cold phase", graph_partition, temperatures, log)
+
+                    elif cut_rank_m == "multilevel":
+                        test_annealing_method(multilevel_annealing_method, "Multilevel coarsening, annealing and refinement", graph_partition, temperatures, log)
+
+                    elif cut_rank_m == "tabu":
+                        test_annealing_method(tabu_search_method, "Tabu search over all swaps", graph_partition, temperatures, log)
+
                     else:
                         print(f"Unknown cut-rank annealing method: '{cut_rank_m}'")
 
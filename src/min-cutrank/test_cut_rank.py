@@ -1,7 +1,8 @@
 import sys
 import getopt
 import random
-from test_tools import parse_int, parse_float, graph_from_description, run_greedy_min_rank
+import tempfile
+from test_tools import parse_bool, parse_int, parse_float, graph_from_description, run_greedy_min_rank, check_graph_file_round_trips
 from partition_builder import random_partition
 
 
@@ -24,8 +25,16 @@ if __name__=="__main__":
                 'single' calculates the swap cut-ranks by #(set 1) x #(set 2) separate calls to 'single_swap_cut_rank'
                 'row' calculates the swap cut-ranks by #(set 1) separate calls to 'row_swap_cut_ranks'
                 'all' calculates the swap cut-ranks by one single call to 'all_swap_cut_ranks'
+                'vector' calculates the swap cut-ranks by one single call to 'all_swap_rank_deltas'
+                'batch' calculates the swap cut-ranks by one single call to 'batch_cut_ranks' on the row_flag of every swap
+                'oracle' calculates the swap cut-ranks by 'partition_cut_rank' of a 'CutRankOracle', and checks that the complement of each swap is answered from its cache
+                'table' keeps the swap cut-ranks in a 'SwapGainTable', updated incrementally after each applied swap
                 'apply' calculates the swap cut-ranks by actually applying the swaps to the GraphPartition object
                 'validate' does the same as 'apply', but also validates all the variables of the GraphPartition object after the swap has been applied
+                'rollback' does the same as 'validate', but reverts each swap by 'rollback' and checks that the GraphPartition object is exactly as before the swap
+                'move' calculates the swap cut-ranks by moving the row and then the column to the other partition set by 'move_node', and validates the GraphPartition object after each move
+    -w Bool     Whether the graph, a random bipartition and a random 3-way partition should first be written in every file format of graph_io.py and read back,
+                raising an exception if any of them differ, see 'check_graph_file_round_trips'. The test then runs on the graph read back from the sparse6 file. Default is False.
     """
 
     opt_arguments = sys.argv[1:]
@@ -34,9 +43,10 @@ if __name__=="__main__":
     graph_setup = None
     set_portion = 0.5
     rank_calculation_methods = []
+    round_trips = False
 
-    options = "s:g:p:m:"
-    long_options = ["seed=", "graph=", "partition_portion=", "methods="]
+    options = "s:g:p:m:w:"
+    long_options = ["seed=", "graph=", "partition_portion=", "methods=", "round_trips="]
 
     try:
         arguments, values = getopt.getopt(opt_arguments, options, long_options)
@@ -51,6 +61,8 @@ if __name__=="__main__":
                 set_portion = parse_float(value, 0.5)
             elif argument in ("-m", "--methods"):
                 rank_calculation_methods = value.split(",")
+            elif argument in ("-w", "--round_trips"):
+                round_trips = parse_bool(value, False)
             elif argument in ("-d", "--directly"):
                 ranks_directly = True
             elif argument in ("-a", "--apply"):
@@ -64,6 +76,10 @@ if __name__=="__main__":
             if seed != None:
                 random.seed(seed)
             graph_adj_matrix = graph_from_description(graph_setup)
+            if round_trips:
+                with tempfile.TemporaryDirectory() as directory:
+                    graph_adj_matrix = check_graph_file_round_trips(graph_adj_matrix, directory)
+                print("Graph and partitions read back from all file formats")
             graph_partition = random_partition(graph_adj_matrix, set_portion)
 
             run_greedy_min_rank(graph_partition, rank_calculation_methods)
@@ -0,0 +1,124 @@
+import sys
+import time
+import getopt
+import random
+from test_tools import parse_int, graph_from_description
+from matrix_tools import as_bit_matrix, rank_matrix_positions
+from linear_rank_width import cut_rank_profile, greedy_linear_order, best_insertion_move, linear_rank_width_search
+
+
+def profile_by_elimination(adjacencies : list[int], order : list[int]) -> list[int]:
+
+    # The cut-rank profile of the order by one Gauss-Jordan elimination per prefix
+    return [len(rank_matrix_positions(adjacencies, order[: m], order[m :])[0]) for m in range(len(order) + 1)]
+
+
+def check_profile(adjacencies : list[int], order : list[int]) -> list[int]:
+
+    profile = profile_by_elimination(adjacencies, order)
+    incremental_profile = cut_rank_profile(adjacencies, order)
+    if incremental_profile != profile:
+        print(f"Order: {order}")
+        print(f"   'cut_rank_profile': {incremental_profile}")
+        print(f"   Elimination: {profile}")
+        raise Exception("Cut-rank profile mismatch")
+    return profile
+
+
+def check_best_move(adjacencies : list[int], order : list[int]) -> list[int]:
+
+    # The width and profile sum of the move from 'best_insertion_move' should be those of the new order, and no other move should give a lower pair of them
+    (node, target, width, profile_sum) = best_insertion_move(adjacencies, order)
+    lowest = None
+    for moved in order:
+        for position in range(len(order)):
+            new_order = [n for n in order if n != moved]
+            new_order.insert(position, moved)
+            if new_order != order:
+                profile = profile_by_elimination(adjacencies, new_order)
+                if lowest is None or (max(profile), sum(profile)) < lowest:
+                    lowest = (max(profile), sum(profile))
+    new_order = [n for n in order if n != node]
+    new_order.insert(target, node)
+    profile = check_profile(adjacencies, new_order)
+    if (max(profile), sum(profile)) != (width, profile_sum):
+        print(f"Moving node {node} to position {target} in {order}")
+        print(f"   'best_insertion_move': width {width}, profile sum {profile_sum}")
+        print(f"   Elimination: width {max(profile)}, profile sum {sum(profile)}")
+        raise Exception("Width or profile sum of the move mismatch")
+    if (width, profile_sum) != lowest:
+        print(f"Best move of {order} by elimination has width {lowest[0]} and profile sum {lowest[1]}, not {width} and {profile_sum}")
+        raise Exception("Move from 'best_insertion_move' is not the best")
+    return new_order
+
+
+if __name__=="__main__":
+
+    """
+    Test program for the cut-rank profiles and the insertion moves of the linear rank-width search.
+
+    The program starts with a vertex ordering of a graph and applies the best insertion move from 'best_insertion_move' a given number of times, also if
+    it does not improve the order. The profile of each order from 'cut_rank_profile' is compared with one Gauss-Jordan elimination per prefix, and the
+    width and profile sum of each applied move are compared with the profile of the new order by elimination, and with the best of all moves by elimination.
+    If any of them differ, an exception is raised. Finally 'linear_rank_width_search' is run from the start order.
+    Every move is evaluated by elimination, so the program is meant for graphs of up to a few tens of nodes.
+
+    Parameters:
+    -s N        The random seed. If omited, no seed is set for the random function. Random numbers can be used to build the graph and the start order, and are used to break ties between moves.
+    -g Graph    The graph setup. See 'graph_from_description' for details
+    -o Order    The start order, 'greedy' for 'greedy_linear_order' or 'random' for a random permutation. Default is 'random'
+    -i N        The number of moves to check. Default is 10.
+    """
+
+    opt_arguments = sys.argv[1:]
+
+    seed = None
+    graph_setup = None
+    order_setup = "random"
+    nmb_moves = 10
+
+    options = "s:g:o:i:"
+    long_options = ["seed=", "graph=", "order=", "moves="]
+
+    try:
+        arguments, values = getopt.getopt(opt_arguments, options, long_options)
+
+        for argument, value in arguments:
+
+            if argument in ("-s", "--seed"):
+                seed = parse_int(value, None)
+            elif argument in ("-g", "--graph"):
+                graph_setup = value
+            elif argument in ("-o", "--order"):
+                order_setup = value
+            elif argument in ("-i", "--moves"):
+                nmb_moves = parse_int(value, 10)
+
+        if graph_setup == None:
+            print("Graph setup missing")
+
+        else:
+            if seed != None:
+                random.seed(seed)
+            graph_adj_matrix = as_bit_matrix(graph_from_description(graph_setup))
+            if order_setup == "greedy":
+                start_order = greedy_linear_order(graph_adj_matrix)
+            elif order_setup == "random":
+                start_order = random.sample(range(len(graph_adj_matrix)), len(graph_adj_matrix))
+            else:
+                raise Exception(f"Unknown start order: '{order_setup}'")
+
+            order = start_order[:]
+            profile = check_profile(graph_adj_matrix, order)
+            print(f"Start order has linear rank-width {max(profile)} and profile sum {sum(profile)}")
+            for move in range(nmb_moves if len(order) > 1 else 0):
+                order = check_best_move(graph_adj_matrix, order)
+                profile = cut_rank_profile(graph_adj_matrix, order)
+                print(f"Move {move + 1} gives linear rank-width {max(profile)} and profile sum {sum(profile)}")
+
+            start = time.time()
+            result = linear_rank_width_search(graph_adj_matrix, start_order)
+            print(f"Search reached linear rank-width {result.width} from {result.initial_width} in {result.iterations} moves and {time.time() - start} sec")
+
+    except getopt.error as err:
+        print(str(err))
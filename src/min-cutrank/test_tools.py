@@ -1,10 +1,15 @@
 import numpy as np
+import os
 import time
 import random
 from graph_partition import GraphPartition
-from partition_builder import set_edge, grid_graph, random_graph
-from matrix_tools import create_zero_matrix, copy_matrix, rank_matrix_positions, set_common_matrix_value, insert_zero_matrix, add_matrix, add_product_matrix, is_zero_matrix, is_identity_matrix
-from swap_rank_calculator import all_swap_cut_ranks, row_swap_cut_ranks, single_swap_cut_rank
+from graph_io import read_graph, read_edge_list, write_edge_list, write_matrix_market, write_graph6, write_sparse6, write_partition, read_partition
+from partition_builder import set_edge, grid_graph, random_graph, random_partition, bfs_partition, spectral_partition, greedy_partition
+from matrix_tools import as_bit_matrix, create_zero_matrix, create_zero_bit_matrix, unpack_matrix, copy_matrix, rank_matrix_positions, batch_cut_ranks, set_common_matrix_value, add_matrix, add_product_matrix, is_zero_matrix, position_mask
+from annealing_schedule import AdaptiveSchedule
+from swap_rank_calculator import all_swap_cut_ranks, all_swap_rank_deltas, row_swap_cut_ranks, single_swap_cut_rank, single_move_cut_rank, all_move_rank_deltas
+from fm_refinement import SwapGainTable
+from cut_rank_oracle import CutRankOracle
 
 
 def parse_int(value: str, default: int) -> int:
@@ -38,10 +43,11 @@ def parse_bool(value: str, default: bool) -> bool:
         return default
 
 
-def graph_from_description(description : str) -> list[list[int]]:
+def graph_from_description(description : str) -> list[list[int]] | tuple[np.ndarray, np.ndarray]:
 
     # 'gNxM' for grid with N rows and M colmns, like 'g5x6'
     # 'rN[eP]' for graph with N nodes and random edge probability of P (default 0.5), like 'r20' for graph of 20 nodes with edge probability 0.5, or 'r16P0.3' for graph of 16 nodes with edge probability 0.3
+    # 'fPATH' for graph read from the file PATH by 'read_graph' from graph_io.py, like 'fgraphs/state.g6', in compressed sparse row format
 
     gr_type = description[0]
 
@@ -61,13 +67,19 @@ def graph_from_description(description : str) -> list[list[int]]:
             edge_prob = 0.5
         return random_graph(nodes, edge_prob)
 
+    elif gr_type == "f":
+        return read_graph(description[1 :])
+
     else:
         raise Exception(f"Unknown graph type : {gr_type}")
 
 
-def temperatures_from_description(description : str) -> np.ndarray[float]:
+def temperatures_from_description(description : str) -> np.ndarray[float] | AdaptiveSchedule:
 
     # Temperatures given at format 'BeEsS' for S samples beginning at temperature B and ending at temperature E. Example: '1.0e0.1s10' for 10 samples from 1.0 to 0.1
+    # 'adaptive' gives an AdaptiveSchedule with default settings, which calibrates the temperatures and the number of sweeps from the graph partition
+    if description == "adaptive":
+        return AdaptiveSchedule()
     idx_e = description.index("e")
     idx_s = description.index("s")
     start = float(description[: idx_e])
@@ -76,8 +88,45 @@ def temperatures_from_description(description : str) -> np.ndarray[float]:
     return np.linspace(start, end, samples)
 
 
+def partition_from_description(description : str, adjacency_matrix : list[list[int]], portion : float) -> GraphPartition:
+
+    # 'random' for a random partition, 'bfs' for a split of the breadth-first level structure, 'spectral' for a split by the Fiedler vector,
+    # or 'greedy' for a first set grown by minimal boundary. See partition_builder.py
+    builders = {"random" : random_partition, "bfs" : bfs_partition, "spectral" : spectral_partition, "greedy" : greedy_partition}
+    if description not in builders:
+        raise Exception(f"Unknown initial partition : {description}")
+    return builders[description](adjacency_matrix, portion)
+
+
 def clone_partition(partition : GraphPartition) -> GraphPartition:
-    return GraphPartition(partition.adjacencies, partition.row_flag)
+    return partition.copy()
+
+
+def check_graph_file_round_trips(adjacency_matrix : list[list[int]] | list[int] | tuple[np.ndarray, np.ndarray], directory : str) -> tuple[np.ndarray, np.ndarray]:
+
+    # Writes the graph in every file format of graph_io.py, and a random bipartition and 3-way partition of it, into the directory, reads them back
+    # and raises an exception if any of them differ. Returns the graph as read back from the sparse6 file, in compressed sparse row format
+    expected = as_bit_matrix(adjacency_matrix)
+    nmb_nodes = len(expected)
+    read_back = {}
+    for first_node in (0, 1):
+        path = os.path.join(directory, f"graph_{first_node}.txt")
+        write_edge_list(path, adjacency_matrix, first_node)
+        read_back[f"edge list from {first_node}"] = read_edge_list(path, nmb_nodes, first_node)
+    for (ending, write_method) in ((".mtx", write_matrix_market), (".g6", write_graph6), (".s6", write_sparse6)):
+        path = os.path.join(directory, "graph" + ending)
+        write_method(path, adjacency_matrix)
+        read_back[ending] = read_graph(path)
+    for (name, graph) in read_back.items():
+        if as_bit_matrix(graph) != expected:
+            raise Exception(f"Graph read back from the {name} file differs from the written graph")
+
+    for parts in ([random.random() < 0.5 for _ in range(nmb_nodes)], [random.randrange(3) for _ in range(nmb_nodes)]):
+        path = os.path.join(directory, "partition.txt")
+        write_partition(path, parts)
+        if read_partition(path) != [int(part) for part in parts]:
+            raise Exception("Partition read back from the file differs from the written partition")
+    return read_back[".s6"]
 
 
 class RankCollector:
@@ -92,11 +141,8 @@ class DirectSwapRankCollector(RankCollector):
 
     partition : GraphPartition
 
-    buffer : list[list[int]]
-
     def __init__(self, partition : GraphPartition):
         self.partition = partition
-        self.buffer = create_zero_matrix(partition.nmb_nodes, partition.nmb_nodes)
 
     def collect_ranks(self, cut_ranks : list[list[int]]) -> None:
         rows_copy = self.partition.rows[:]
@@ -106,8 +152,7 @@ class DirectSwapRankCollector(RankCollector):
             for j in range(len(self.partition.columns)):
                 col = self.partition.columns[j]
                 rows_copy[i], cols_copy[j] = col, row
-                copy_matrix(self.partition.adjacencies, self.buffer, rows_copy, cols_copy)
-                base_rows, _ = rank_matrix_positions(self.buffer, rows_copy, cols_copy)
+                base_rows, _ = rank_matrix_positions(self.partition.adjacencies, rows_copy, cols_copy)
                 cut_ranks[row][col] = len(base_rows)
                 rows_copy[i], cols_copy[j] = row, col
 
@@ -144,6 +189,117 @@ class FormulaRankCollector(RankCollector):
         return "Single ranks by formulas" if self.single_ranks else ("Row ranks by formulas" if self.row_ranks else "All ranks by formulas")
 
 
+class VectorizedRankCollector(RankCollector):
+
+    partition : GraphPartition
+
+    deltas : np.ndarray
+
+    def __init__(self, partition : GraphPartition):
+        self.partition = partition
+        self.deltas = np.zeros((partition.nmb_nodes, partition.nmb_nodes), dtype=np.int8)
+
+    def collect_ranks(self, cut_ranks : list[list[int]]) -> None:
+        all_swap_rank_deltas(self.partition, self.deltas)
+        for row in self.partition.rows:
+            for col in self.partition.columns:
+                cut_ranks[row][col] = self.partition.cut_rank + int(self.deltas[row][col])
+
+    def name(self) -> str:
+        return "All ranks by vectorized formulas"
+
+
+class BatchRankCollector(RankCollector):
+
+    partition : GraphPartition
+
+    def __init__(self, partition : GraphPartition):
+        self.partition = partition
+
+    def collect_ranks(self, cut_ranks : list[list[int]]) -> None:
+        # One row_flag per swap, in row major order of the rows and columns, ranked by one call to 'batch_cut_ranks'
+        rows = self.partition.rows
+        columns = self.partition.columns
+        row_flags = np.tile(np.array(self.partition.row_flag, dtype=bool), (len(rows) * len(columns), 1))
+        swaps = np.arange(len(rows) * len(columns))
+        row_flags[swaps, np.repeat(rows, len(columns))] = False
+        row_flags[swaps, np.tile(columns, len(rows))] = True
+        ranks = batch_cut_ranks(self.partition.adjacencies, row_flags)
+        for i, row in enumerate(rows):
+            for j, col in enumerate(columns):
+                cut_ranks[row][col] = int(ranks[i * len(columns) + j])
+
+    def name(self) -> str:
+        return "All ranks by bit-sliced batch elimination"
+
+
+class OracleRankCollector(RankCollector):
+
+    partition : GraphPartition
+
+    oracle : CutRankOracle
+
+    def __init__(self, partition : GraphPartition):
+        self.partition = partition
+        self.oracle = CutRankOracle(partition.adjacencies)
+
+    def collect_ranks(self, cut_ranks : list[list[int]]) -> None:
+        # Each swap is queried by its row_flag, and then by the complement of it, which should be answered from the cache
+        row_flag = self.partition.row_flag[:]
+        for row in self.partition.rows:
+            for col in self.partition.columns:
+                row_flag[row], row_flag[col] = False, True
+                cut_ranks[row][col] = self.oracle.partition_cut_rank(row_flag)
+                hits = self.oracle.hits
+                if self.oracle.partition_cut_rank([not flag for flag in row_flag]) != cut_ranks[row][col] or self.oracle.hits != hits + 1:
+                    raise Exception(f"Complement of the swap of ({row},{col}) is not answered from the cache with the same cut-rank")
+                row_flag[row], row_flag[col] = True, False
+
+    def name(self) -> str:
+        return "All ranks by cached cut-rank oracle"
+
+
+class GainTableRankCollector(RankCollector):
+
+    partition : GraphPartition
+
+    table : SwapGainTable
+
+    def __init__(self, partition : GraphPartition):
+        self.partition = partition
+        self.table = SwapGainTable(partition.copy())
+
+    def collect_ranks(self, cut_ranks : list[list[int]]) -> None:
+        # Follows the swap applied to the tested partition since the last call with an incremental update of the table
+        table_partition = self.table.partition
+        moved = [n for n in self.partition.nodes if self.partition.row_flag[n] != table_partition.row_flag[n]]
+        if len(moved) == 2:
+            (row, column) = moved if table_partition.row_flag[moved[0]] else (moved[1], moved[0])
+            self.table.apply_swap(row, column)
+        elif len(moved) != 0:
+            raise Exception("Gain table can only follow one swap at a time")
+        self._compare_buckets()
+        for row in self.partition.rows:
+            for col in self.partition.columns:
+                cut_ranks[row][col] = table_partition.cut_rank + int(self.table.deltas[row][col])
+
+    def _compare_buckets(self) -> None:
+
+        # The gain buckets of each row should count the swaps of the row by cut-rank change, as recalculated from all swaps. All nodes are active
+        table_partition = self.table.partition
+        deltas = all_swap_rank_deltas(table_partition)
+        expected = np.zeros((table_partition.nmb_nodes, 5), dtype=np.int64)
+        if len(table_partition.rows) > 0 and len(table_partition.columns) > 0:
+            block = deltas[np.ix_(table_partition.rows, table_partition.columns)].astype(np.int64) + 2
+            expected[table_partition.rows] = (block[:, :, None] == np.arange(5)).sum(axis=1)
+        wrong_rows = np.flatnonzero((self.table.row_buckets != expected).any(axis=1))
+        if len(wrong_rows) > 0:
+            raise Exception(f"Gain buckets of rows {wrong_rows.tolist()} differ from the counts of the recalculated swap cut-rank changes")
+
+    def name(self) -> str:
+        return "All ranks by incrementally updated gain table"
+
+
 def print_base_matrices(heading : str, partition : GraphPartition):
     print()
     print(heading)
@@ -152,9 +308,9 @@ def print_base_matrices(heading : str, partition : GraphPartition):
     print_matrix("E = C^(-1) * A_XB:", partition.b_inverse_adj)
     print_matrix("F = A^YB * C^(-1) * A_XB + A:", partition.adj_b_inv_adj)
 
-def print_matrix(heading : str, matrix : list[list[int]]):
+def print_matrix(heading : str, matrix : list[int]):
     print(heading)
-    for r in matrix:
+    for r in unpack_matrix(matrix, len(matrix)):
         row = "   "
         for n in r:
             row += str(n)
@@ -166,67 +322,61 @@ class ApplySwapRankCollector(RankCollector):
 
     validate : bool
 
-    row_flag : list[bool]
-
-    rows : list[int]
-
-    columns : list[int]
-
-    base_flag : list[bool]
-
-    cut_rank : int
-
-    base_rows : list[int]
+    rollback : bool
 
-    base_columns : list[int]
-
-    free_rows : list[int]
-
-    free_columns : list[int]
-
-    base_inverse : list[list[int]]
-
-    adj_b_inverse: list[list[int]]
-
-    b_inverse_adj: list[list[int]]
-
-    adj_b_inv_adj: list[list[int]]
+    snapshot : GraphPartition
 
     buffer_flag : list[bool]
 
-    def __init__(self, partition : GraphPartition, validate : bool):
+    def __init__(self, partition : GraphPartition, validate : bool, rollback : bool = False):
         self.partition = partition
         self.validate = validate
-        self.base_inverse = create_zero_matrix(partition.nmb_nodes, partition.nmb_nodes)
-        self.adj_b_inverse = create_zero_matrix(partition.nmb_nodes, partition.nmb_nodes)
-        self.b_inverse_adj = create_zero_matrix(partition.nmb_nodes, partition.nmb_nodes)
-        self.adj_b_inv_adj = create_zero_matrix(partition.nmb_nodes, partition.nmb_nodes)
-        self.row_flag = [False] * partition.nmb_nodes
-        self.base_flag = [False] * partition.nmb_nodes
-        self.rows = [0] * len(partition.rows)
-        self.columns = [0] * len(partition.columns)
+        self.rollback = rollback
         self.buffer_flag = [False] * partition.nmb_nodes
 
     def collect_ranks(self, cut_ranks : list[list[int]]) -> None:
-        self._backup()
-        for row in self.rows:
-            for col in self.columns:
+        self.snapshot = self.partition.snapshot()
+        if self.rollback:
+            self.partition.start_journal()
+        for row in self.snapshot.rows:
+            for col in self.snapshot.columns:
                 self.partition.apply_swap(row, col)
                 cut_ranks[row][col] = self.partition.cut_rank
                 if self.validate:
                     self._validate_partition()
-                self._restore()
+                if self.rollback:
+                    self.partition.rollback()
+                    self._compare_with_snapshot()
+                else:
+                    self.partition.restore(self.snapshot)
+        if self.rollback:
+            self.partition.stop_journal()
 
     def name(self) -> str:
+        if self.rollback:
+            return "Apply swap and roll back"
         return "Apply swap with validation" if self.validate else "Apply swap without validation"
 
+    def _compare_with_snapshot(self) -> None:
+
+        # Rolling back a swap should give exactly the same state as before the swap
+        p = self.partition
+        s = self.snapshot
+        if (p.row_flag != s.row_flag or p.rows != s.rows or p.columns != s.columns or p.base_flag != s.base_flag or p.cut_rank != s.cut_rank
+                or p.base_rows != s.base_rows or p.base_columns != s.base_columns or p.free_rows != s.free_rows or p.free_columns != s.free_columns
+                or p.position != s.position or p.subset_position != s.subset_position
+                or p.free_rows_mask != s.free_rows_mask or p.free_columns_mask != s.free_columns_mask
+                or p.base_index != s.base_index or p.free_row_indices != s.free_row_indices or p.free_column_indices != s.free_column_indices):
+            raise Exception("Partition sets differ after rollback")
+        if p.base_inverse != s.base_inverse or p.adj_b_inverse != s.adj_b_inverse or p.b_inverse_adj != s.b_inverse_adj or p.adj_b_inv_adj != s.adj_b_inv_adj:
+            raise Exception("Matrices differ after rollback")
+
     def _validate_partition(self) -> None:
 
         # Test partition sets: Every node occurs exactly once in exactly one of the four partition sets
         # Nodes have row and base flag set according to the set they are in
         # Equally many base rows and base columns
         p = self.partition
-        buffer = p.buffer
         for n in p.base_rows:
             if not p.base_flag[n] or not p.row_flag[n]:
                 raise Exception("Unexpected element in base_rows")
@@ -260,32 +410,56 @@ class ApplySwapRankCollector(RankCollector):
         for n in p.nodes:
             self.buffer_flag[n] = False
 
+        # Test position indexes and free node masks
+        for nodes in (p.rows, p.columns):
+            if any(p.position[n] != pos for pos, n in enumerate(nodes)):
+                raise Exception("Wrong position of node in rows or columns")
+        for subset in (p.base_rows, p.base_columns, p.free_rows, p.free_columns):
+            if any(p.subset_position[n] != pos for pos, n in enumerate(subset)):
+                raise Exception("Wrong position of node in base or free nodes")
+        if p.free_rows_mask != sum(1 << n for n in p.free_rows) or p.free_columns_mask != sum(1 << n for n in p.free_columns):
+            raise Exception("Wrong mask of free nodes")
+
+        # Test local indices: each base row and each base column has its own index, and the other indices are free
+        row_indices = [p.base_index[n] for n in p.base_rows]
+        col_indices = [p.base_index[n] for n in p.base_columns]
+        if sorted(row_indices + p.free_row_indices) != p.nodes or sorted(col_indices + p.free_column_indices) != p.nodes:
+            raise Exception("Wrong local indices of base nodes")
+
+        # Test that the compact matrices are 0 outside the local indices of the base nodes
+        row_mask = position_mask(row_indices)
+        if any(p.adj_b_inverse[n] & ~row_mask for n in p.nodes):
+            raise Exception("A^(YB) * C^(-1) is not 0 outside XB")
+        if any(p.base_inverse[n] & ~row_mask for n in col_indices) or any(p.base_inverse[n] or p.b_inverse_adj[n] for n in p.free_column_indices):
+            raise Exception("C^(-1) or C^(-1) * A_(XB) is not 0 outside YB")
+
         # Test C * C^(-1) = Id
-        insert_zero_matrix(buffer, p.base_rows, p.base_rows)
-        add_product_matrix(p.adjacencies, p.base_inverse, buffer, p.base_rows, p.base_columns, p.base_rows)
-        if not is_identity_matrix(buffer, p.base_rows):
+        buffer = create_zero_bit_matrix(p.nmb_nodes)
+        add_product_matrix(p.adjacencies, p.base_inverse, buffer, p.base_rows, p.base_columns, row_indices, fac2_rows=col_indices)
+        if any(buffer[n] != 1 << p.base_index[n] for n in p.base_rows):
             raise Exception("Wrong inverse of rank matrix")
 
         # Test D-matrix in base set
-        copy_matrix(p.adj_b_inverse, buffer, p.nodes, p.base_rows)
-        add_product_matrix(p.adjacencies, p.base_inverse, buffer, p.nodes, p.base_columns, p.base_rows)
-        if not is_zero_matrix(buffer, p.nodes, p.base_rows):
+        buffer = p.adj_b_inverse[:]
+        add_product_matrix(p.adjacencies, p.base_inverse, buffer, p.nodes, p.base_columns, row_indices, fac2_rows=col_indices)
+        if any(buffer):
             raise Exception("Wrong value of A^(YB) * C^(-1)")
-        if not is_identity_matrix(p.adj_b_inverse, p.base_rows):
+        if any(p.adj_b_inverse[n] != 1 << p.base_index[n] for n in p.base_rows):
             raise Exception("XB x XB submatrix of A^(YB) * C^(-1) is not identity")
 
         # Test E-matrix in base set
-        copy_matrix(p.b_inverse_adj, buffer, p.base_columns, p.nodes)
-        add_product_matrix(p.base_inverse, p.adjacencies, buffer, p.base_columns, p.base_rows, p.nodes)
-        if not is_zero_matrix(buffer, p.nodes, p.base_rows):
+        buffer = p.b_inverse_adj[:]
+        add_product_matrix(p.base_inverse, p.adjacencies, buffer, col_indices, row_indices, p.nodes, fac2_rows=p.base_rows)
+        if any(buffer):
             raise Exception("Wrong value of C^(-1) * A_(XB)")
-        if not is_identity_matrix(p.b_inverse_adj, p.base_columns):
+        col_mask = position_mask(p.base_columns)
+        if any(p.b_inverse_adj[p.base_index[n]] & col_mask != 1 << n for n in p.base_columns):
             raise Exception("YB x YB submatrix of C^(-1) * A_(XB) is not identity")
 
         # Test F-matrix in base set
-        copy_matrix(p.adj_b_inv_adj, buffer, p.nodes, p.nodes)
+        buffer = p.adj_b_inv_adj[:]
         add_matrix(p.adjacencies, buffer, p.nodes, p.nodes)
-        add_product_matrix(p.adj_b_inverse, p.adjacencies, buffer, p.nodes, p.base_rows, p.nodes)
+        add_product_matrix(p.adj_b_inverse, p.adjacencies, buffer, p.nodes, row_indices, p.nodes, fac2_rows=p.base_rows)
         if not is_zero_matrix(buffer, p.nodes, p.nodes):
             raise Exception("Wrong value of A^(YB) * C^(-1) * A_(XB) + A")
         if not is_zero_matrix(p.adj_b_inv_adj, p.base_rows, p.nodes):
@@ -294,46 +468,45 @@ class ApplySwapRankCollector(RankCollector):
             raise Exception("YB columns of A^(YB) * C^(-1) * A_(XB) + A is not zero")
 
         # Test that all other rows and columns in adjacency matrix between partition sets is generated by C
+        buffer = create_zero_bit_matrix(p.nmb_nodes)
         copy_matrix(p.adjacencies, buffer, p.free_rows, p.free_columns)
-        insert_zero_matrix(buffer, p.free_rows, p.base_rows)
-        add_product_matrix(p.adjacencies, p.base_inverse, buffer, p.free_rows, p.base_columns, p.base_rows)
-        add_product_matrix(buffer, p.adjacencies, buffer, p.free_rows, p.base_rows, p.free_columns)
+        product = create_zero_bit_matrix(p.nmb_nodes)
+        add_product_matrix(p.adjacencies, p.base_inverse, product, p.free_rows, p.base_columns, row_indices, fac2_rows=col_indices)
+        add_product_matrix(product, p.adjacencies, buffer, p.free_rows, row_indices, p.free_columns, fac2_rows=p.base_rows)
         if not is_zero_matrix(buffer, p.free_rows, p.free_columns):
             raise Exception("Not a full rank matrix")
 
-    def _copy_list(self, from_l : list, to_l : list) -> None:
-        for i in range(len(from_l)):
-            to_l[i] = from_l[i]
-
-    def _backup(self) -> None:
-        copy_matrix(self.partition.base_inverse, self.base_inverse, self.partition.nodes, self.partition.nodes)
-        copy_matrix(self.partition.adj_b_inverse, self.adj_b_inverse, self.partition.nodes, self.partition.nodes)
-        copy_matrix(self.partition.b_inverse_adj, self.b_inverse_adj, self.partition.nodes, self.partition.nodes)
-        copy_matrix(self.partition.adj_b_inv_adj, self.adj_b_inv_adj, self.partition.nodes, self.partition.nodes)
-        self._copy_list(self.partition.row_flag, self.row_flag)
-        self._copy_list(self.partition.base_flag, self.base_flag)
-        self._copy_list(self.partition.rows, self.rows)
-        self._copy_list(self.partition.columns, self.columns)
-        self.cut_rank = self.partition.cut_rank
-        self.base_rows = self.partition.base_rows
-        self.base_columns = self.partition.base_columns
-        self.free_rows = self.partition.free_rows
-        self.free_columns = self.partition.free_columns
-
-    def _restore(self) -> None:
-        copy_matrix(self.base_inverse, self.partition.base_inverse, self.partition.nodes, self.partition.nodes)
-        copy_matrix(self.adj_b_inverse, self.partition.adj_b_inverse, self.partition.nodes, self.partition.nodes)
-        copy_matrix(self.b_inverse_adj, self.partition.b_inverse_adj, self.partition.nodes, self.partition.nodes)
-        copy_matrix(self.adj_b_inv_adj, self.partition.adj_b_inv_adj, self.partition.nodes, self.partition.nodes)
-        self._copy_list(self.row_flag, self.partition.row_flag)
-        self._copy_list(self.base_flag, self.partition.base_flag)
-        self._copy_list(self.rows, self.partition.rows)
-        self._copy_list(self.columns, self.partition.columns)
-        self.partition.cut_rank = self.cut_rank
-        self.partition.base_rows = self.base_rows
-        self.partition.base_columns = self.base_columns
-        self.partition.free_rows = self.free_rows
-        self.partition.free_columns = self.free_columns
+class MoveRankCollector(ApplySwapRankCollector):
+
+    # Calculates the swap cut-ranks by moving the row to the columns and then the column to the rows with 'move_node', validating after each move,
+    # and comparing the cut-rank reached by each move with 'single_move_cut_rank' and 'all_move_rank_deltas'
+
+    def __init__(self, partition : GraphPartition):
+        super().__init__(partition, True)
+
+    def collect_ranks(self, cut_ranks : list[list[int]]) -> None:
+        self.snapshot = self.partition.snapshot()
+        for row in self.snapshot.rows:
+            for col in self.snapshot.columns:
+                self._move_and_compare(row)
+                self._move_and_compare(col)
+                cut_ranks[row][col] = self.partition.cut_rank
+                self.partition.restore(self.snapshot)
+
+    def _move_and_compare(self, node : int) -> None:
+        cut_rank = self.partition.cut_rank
+        single_cut_rank = single_move_cut_rank(self.partition, node)
+        vectorized_cut_rank = cut_rank + int(all_move_rank_deltas(self.partition)[node])
+        self.partition.move_node(node)
+        self._validate_partition()
+        if single_cut_rank != self.partition.cut_rank:
+            raise Exception(f"Cut-rank {single_cut_rank} from 'single_move_cut_rank' differs from {self.partition.cut_rank} after moving node {node}")
+        if vectorized_cut_rank != self.partition.cut_rank:
+            raise Exception(f"Cut-rank {vectorized_cut_rank} from 'all_move_rank_deltas' differs from {self.partition.cut_rank} after moving node {node}")
+
+    def name(self) -> str:
+        return "Two node moves with validation"
+
 
 class CutRankCalculatorComparer:
 
@@ -434,10 +607,22 @@ def rank_collector_from_name(method_name : str, partition : GraphPartition) -> R
         return FormulaRankCollector(partition, False, True)
     elif method_name == "all":
         return FormulaRankCollector(partition, False, False)
+    elif method_name == "vector":
+        return VectorizedRankCollector(partition)
+    elif method_name == "batch":
+        return BatchRankCollector(partition)
+    elif method_name == "oracle":
+        return OracleRankCollector(partition)
+    elif method_name == "table":
+        return GainTableRankCollector(partition)
     elif method_name == "apply":
         return ApplySwapRankCollector(partition, False)
     elif method_name == "validate":
         return ApplySwapRankCollector(partition, True)
+    elif method_name == "rollback":
+        return ApplySwapRankCollector(partition, True, True)
+    elif method_name == "move":
+        return MoveRankCollector(partition)
     else:
         raise Exception(f"Unknown cut-rank calculation method: '{method_name}'")
 